@@ -53,9 +53,16 @@ from polyaxon.processing.data_providers import (
     DatasetDataProvider,
     ParallelDatasetProvider
 )
-from polyaxon.rl.environments import EnvSpec, GymEnvironment
+from polyaxon.rl.environments import EnvSpec, GymEnvironment, VectorEnvironment
 from polyaxon.rl.environments import Environment
-from polyaxon.rl.memories import Memory, BatchMemory
+from polyaxon.rl.memories import (
+    Memory,
+    BatchMemory,
+    FrameMemory,
+    PrioritizedMemory,
+    MemmapMemory,
+    PrioritizedMemmapMemory
+)
 from polyaxon.rl import utils as rl_utils
 
 ROOT = 'http://polyaxon.com/docs/'
@@ -129,6 +136,13 @@ PAGES = [
             agents.Agent.run_episode,
         ]
     },
+    {
+        'page': 'agents/async_agent.md',
+        'classes': [agents.AsyncAgent],
+        'classes_functions': [
+            agents.AsyncAgent.train,
+        ]
+    },
     {
         'page': 'agents/pg_agent.md',
         'classes': [agents.PGAgent],
@@ -466,7 +480,7 @@ PAGES = [
     # RL
     {
         'page': 'rl/environments.md',
-        'classes': [EnvSpec, Environment, GymEnvironment],
+        'classes': [EnvSpec, Environment, GymEnvironment, VectorEnvironment],
     },
     {
         'page': 'rl/explorations.md',
@@ -474,7 +488,8 @@ PAGES = [
     },
     {
         'page': 'rl/memories.md',
-        'classes': [Memory, BatchMemory],
+        'classes': [Memory, BatchMemory, FrameMemory, PrioritizedMemory, MemmapMemory,
+                    PrioritizedMemmapMemory],
     },
     {
         'page': 'rl/utils.md',
@@ -7,6 +7,14 @@ from polyaxon.datasets.converters import (
     PNGNumpyImageReader,
     JPGNumpyImageReader,
     JPEGImageReader,
-    ImagesToTFExampleConverter
+    NumpyImageReader,
+    PillowImageReader,
+    PNGPillowImageReader,
+    JPEGPillowImageReader,
+    RawImageReader,
+    ImagesToTFExampleConverter,
+    get_shard_filenames,
+    shard_parallel_text
 )
+from polyaxon.datasets.statistics import DatasetStatistics
 from polyaxon.datasets import cifar10, flowers17, mnist
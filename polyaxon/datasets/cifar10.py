@@ -11,11 +11,13 @@ import tensorflow as tf
 from six.moves import xrange
 
 from polyaxon import Modes
-from polyaxon.datasets.converters import ImagesToTFExampleConverter, PNGNumpyImageReader
+from polyaxon.datasets.converters import ImagesToTFExampleConverter, PNGPillowImageReader
 from polyaxon.datasets.utils import (
     download_datasets,
     make_dataset_dir,
-    count_tfrecord_file_content,
+    shards_exist,
+    count_tfrecord_shards_content,
+    get_meta_data_statistics,
     create_dataset_input_fn,
     create_dataset_predict_input_fn
 )
@@ -37,6 +39,10 @@ _IMAGE_COLORSPACE = 'RGB'
 
 _FOLDS = 10
 
+_NUM_SHARDS = {Modes.TRAIN: 8, Modes.EVAL: 2, Modes.PREDICT: 2}
+
+_CHUNK_SIZE = 1000
+
 MEAT_DATA_FILENAME_FORMAT = '{}/meta_data.json'
 
 RECORD_FILE_NAME_FORMAT = '{}/cifar_{}.tfrecord'
@@ -51,29 +57,36 @@ def _extract_data(filename):
             # Python2
             data = pickle.load(f)
 
-    images = data['data']
-    num_images = images.shape[0]
+    return np.asarray(data['labels'], dtype=np.int64), data['data']
 
-    images = images.reshape((num_images, 3, 32, 32))
-    images = [np.squeeze(image).transpose((1, 2, 0)) for image in images]
-    labels = data['labels']
 
-    return labels, images
+def _iter_chunks(filenames, chunk_size=_CHUNK_SIZE):
+    """Reads the data batches by chunks, only a data batch is unpickled at a time.
+
+    Returns:
+        A generator of `(images, labels)` numpy arrays of shapes
+        `[chunk_size, height, width, channels]` and `[chunk_size]`.
+    """
+    for filename in filenames:
+        labels, images = _extract_data(filename)
+        for start in xrange(0, len(labels), chunk_size):
+            chunk_images = images[start:start + chunk_size].reshape(
+                (-1, _NUM_CHANNELS, _IMAGE_SIZE, _IMAGE_SIZE))
+            # (N, C, H, W) -> (N, H, W, C), copied to release the data batch once converted
+            chunk_images = np.ascontiguousarray(chunk_images.transpose((0, 2, 3, 1)))
+            yield chunk_images, labels[start:start + chunk_size]
 
 
 def prepare_dataset(converter, dataset_dir, data_name, filenames):
+    """Converts the data batches to shards and returns the shards meta data."""
     filename = RECORD_FILE_NAME_FORMAT.format(dataset_dir, data_name)
-    if tf.gfile.Exists(filename):
+    if shards_exist(filename, _NUM_SHARDS[data_name]):
         print('`{}` Dataset files already exist. '
               'Exiting without re-creating them.'.format(filename))
-        return
+        return count_tfrecord_shards_content(filename, _NUM_SHARDS[data_name])
 
-    with tf.python_io.TFRecordWriter(filename) as tfrecord_writer:
-        with tf.Session('') as session:
-            for filename in filenames:
-                labels, images = _extract_data(filename)
-                converter.convert(session=session, writer=tfrecord_writer, images=images,
-                                  labels=labels, total_num_items=len(images))
+    return converter.convert_chunks(output_prefix=filename, chunks=_iter_chunks(filenames),
+                                    num_shards=_NUM_SHARDS[data_name])
 
 
 def prepare(dataset_dir):
@@ -86,7 +99,7 @@ def prepare(dataset_dir):
 
     download_datasets(dataset_dir, _DATA_URL, [_FILENAME], uncompress=True)
 
-    image_reader = PNGNumpyImageReader(shape=(_IMAGE_SIZE, _IMAGE_SIZE, _NUM_CHANNELS))
+    image_reader = PNGPillowImageReader(shape=(_IMAGE_SIZE, _IMAGE_SIZE, _NUM_CHANNELS))
     classes = [
         'airplane', 'automobile', 'bird', 'cat', 'deer', 'dog', 'frog', 'horse', 'ship', 'truck'
     ]
@@ -94,24 +107,24 @@ def prepare(dataset_dir):
         classes=classes, colorspace=_IMAGE_COLORSPACE, image_format=_IMAGE_FORMAT,
         channels=_NUM_CHANNELS, image_reader=image_reader, height=_IMAGE_SIZE, width=_IMAGE_SIZE)
 
-    prepare_dataset(converter, dataset_dir, Modes.TRAIN,
-                    [_DATA_BATCH_FILENAME_FORMAT.format(dataset_dir, i) for i in xrange(1, 5)])
-    prepare_dataset(converter, dataset_dir, Modes.EVAL,
-                    [_DATA_BATCH_FILENAME_FORMAT.format(dataset_dir, 5)])
-    prepare_dataset(converter, dataset_dir, Modes.PREDICT,
-                    [_TEST_DATA_BATCH_FILENAME.format(dataset_dir)])
+    shards = {
+        Modes.TRAIN: prepare_dataset(
+            converter, dataset_dir, Modes.TRAIN,
+            [_DATA_BATCH_FILENAME_FORMAT.format(dataset_dir, i) for i in xrange(1, 5)]),
+        Modes.EVAL: prepare_dataset(
+            converter, dataset_dir, Modes.EVAL,
+            [_DATA_BATCH_FILENAME_FORMAT.format(dataset_dir, 5)]),
+        Modes.PREDICT: prepare_dataset(
+            converter, dataset_dir, Modes.PREDICT,
+            [_TEST_DATA_BATCH_FILENAME.format(dataset_dir)])
+    }
 
     # Finally, write the meta data:
     with open(MEAT_DATA_FILENAME_FORMAT.format(dataset_dir), 'w') as meta_data_file:
         meta_data = converter.get_meta_data()
-        meta_data['num_samples'] = {
-            Modes.TRAIN: count_tfrecord_file_content(
-                RECORD_FILE_NAME_FORMAT.format(dataset_dir, Modes.TRAIN)),
-            Modes.EVAL: count_tfrecord_file_content(
-                RECORD_FILE_NAME_FORMAT.format(dataset_dir, Modes.EVAL)),
-            Modes.PREDICT: count_tfrecord_file_content(
-                RECORD_FILE_NAME_FORMAT.format(dataset_dir, Modes.PREDICT))
-        }
+        meta_data['num_samples'] = {mode: sum(shards[mode]['num_samples']) for mode in shards}
+        meta_data['statistics'] = get_meta_data_statistics(shards)
+        meta_data['shards'] = shards
         meta_data['items_to_descriptions'] = {
             'image': 'A image of colorspace {} resized to {}.'.format(
                 _IMAGE_COLORSPACE, _IMAGE_SIZE),
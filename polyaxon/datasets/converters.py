@@ -1,24 +1,139 @@
 # -*- coding: utf-8 -*-
 from __future__ import absolute_import, division, print_function
 
+import io
+import multiprocessing
 import os
+import six
 import sys
+import threading
 
 from collections import Mapping
-from six.moves import xrange
+from six.moves import queue, xrange
 
+import numpy as np
 import tensorflow as tf
 
+from PIL import Image
+
+from polyaxon.datasets.statistics import (
+    DatasetStatistics,
+    get_statistics_filename,
+    merge_shards_statistics,
+    write_statistics
+)
+from polyaxon.processing.buckets import count_tokens
+from polyaxon.processing.tfrecord_index import IndexedTFRecordWriter, get_index_filename
+
+SHARD_FILE_NAME_FORMAT = '{}-{:05d}-of-{:05d}'
+
+
+def get_shard_filenames(prefix, num_shards):
+    """Returns the names of the shard files `prefix-00000-of-0000N`."""
+    return [SHARD_FILE_NAME_FORMAT.format(prefix, i, num_shards) for i in xrange(num_shards)]
+
+
+def get_shard_ranges(num_items, num_shards):
+    """Splits `num_items` into `num_shards` contiguous ranges differing by at most 1 item."""
+    bounds = [i * num_items // num_shards for i in xrange(num_shards + 1)]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def _iter_lines(filenames):
+    for filename in filenames:
+        with tf.gfile.GFile(filename, 'rb') as f:
+            for line in f:
+                yield line
+
+
+def shard_parallel_text(source_files, target_files, output_dir, num_shards,
+                        source_prefix='source', target_prefix='target', source_delimiter=None,
+                        target_delimiter=None):
+    """Splits parallel (line-by-line aligned) text files into `num_shards` pairs of
+    aligned shard files in a streaming pass.
+
+    The line `i` is written to the source and target shards `i % num_shards`, so the shard
+    files are aligned file by file and can be read in parallel, see `ParallelTextPipeline`
+    with `aligned_files`.
+
+    Args:
+        source_files: `list`. The source text files.
+        target_files: `list`. The target text files aligned with the source files, can be None.
+        output_dir: `str`. The directory of the shard files.
+        num_shards: `int`. The number of pairs of shard files to write.
+        source_prefix: `str`. The prefix of the source shard files.
+        target_prefix: `str`. The prefix of the target shard files.
+        source_delimiter: `str`. If provided, the histogram of the number of tokens of the
+            source lines, split with this delimiter, is computed, see `count_tokens`.
+        target_delimiter: `str`. Same as `source_delimiter` but for the target lines.
+
+    Returns:
+        `dict` with the `source_files`, the `target_files`, the `num_samples` of the shards,
+        and the `statistics` with the `source_len` and `target_len` length histograms.
+
+    Raises:
+        ValueError: if the source and target files don't have the same number of lines.
+    """
+    if num_shards < 1:
+        raise ValueError('`num_shards` must be positive, received `{}`'.format(num_shards))
+
+    prefixes = [source_prefix] if target_files is None else [source_prefix, target_prefix]
+    lines = [_iter_lines(source_files)]
+    if target_files is not None:
+        lines.append(_iter_lines(target_files))
+    shard_filenames = [get_shard_filenames(os.path.join(output_dir, prefix), num_shards)
+                       for prefix in prefixes]
+    writers = [[tf.gfile.GFile(filename, 'wb') for filename in filenames]
+               for filenames in shard_filenames]
+    num_samples = [0] * num_shards
+    statistics = DatasetStatistics()
+    delimiters = [source_delimiter, target_delimiter]
+    try:
+        for i, aligned_lines in enumerate(six.moves.zip_longest(*lines)):
+            if None in aligned_lines:
+                raise ValueError('The source and target files are not aligned, '
+                                 'they have a different number of lines.')
+            for prefix, delimiter, line in zip(prefixes, delimiters, aligned_lines):
+                if delimiter is not None:
+                    statistics.update_length('{}_len'.format(prefix),
+                                             count_tokens(line.rstrip(b'\r\n'), delimiter))
+            for shard_writers, line in zip(writers, aligned_lines):
+                if not line.endswith(b'\n'):
+                    line += b'\n'
+                shard_writers[i % num_shards].write(line)
+            num_samples[i % num_shards] += 1
+    finally:
+        for shard_writers in writers:
+            for writer in shard_writers:
+                writer.close()
+
+    return {
+        'source_files': shard_filenames[0],
+        'target_files': shard_filenames[1] if target_files is not None else None,
+        'num_samples': num_samples,
+        'statistics': statistics.to_dict()
+    }
+
 
 class ImageReader(object):
     """Base ImageReader class that provides an operation to read/encode/decode an image."""
+    requires_session = True
+
     def __init__(self, channels=3):
+        self._channels = channels
         self._placeholder = tf.placeholder(dtype=tf.string)
         self._image = self.decoder(channels)
 
     def decoder(self, channels):
         raise NotImplementedError
 
+    def get_config(self):
+        return {'channels': self._channels}
+
+    def copy(self):
+        """Creates a new reader with the same config in the current default graph."""
+        return self.__class__(**self.get_config())
+
     def read(self, session, image_data, processing_fn=None):
         _image = self._image
         if processing_fn:
@@ -36,12 +151,16 @@ class PNGNumpyImageReader(ImageReader):
     """A numpy png image class reader"""
     
     def __init__(self, shape=None):
+        self._shape = shape
         self._placeholder = tf.placeholder(dtype=tf.uint8, shape=shape)
         self._image = tf.image.encode_png(self._placeholder)
 
     def decoder(self, channels):
         pass
 
+    def get_config(self):
+        return {'shape': self._shape}
+
     def read(self, session, image_data, processing_fn=None):
         _, image = super(PNGNumpyImageReader, self).read(session, image_data, processing_fn)
         return image, image
@@ -50,12 +169,16 @@ class PNGNumpyImageReader(ImageReader):
 class JPGNumpyImageReader(ImageReader):
     """A jpeg numpy image class reader"""
     def __init__(self, shape=None):
+        self._shape = shape
         self._placeholder = tf.placeholder(dtype=tf.uint8, shape=shape)
         self._image = tf.image.encode_jpeg(self._placeholder)
 
     def decoder(self, channels):
         pass
 
+    def get_config(self):
+        return {'shape': self._shape}
+
     def read(self, session, image_data, processing_fn=None):
         _, image = super(JPGNumpyImageReader, self).read(session, image_data, processing_fn)
         return image, image
@@ -67,6 +190,91 @@ class JPEGImageReader(ImageReader):
         return tf.image.decode_jpeg(self._placeholder, channels=channels)
 
 
+class NumpyImageReader(ImageReader):
+    """Base class for readers encoding numpy images directly, without a graph or a session.
+
+    The codecs release the GIL, so the images can be encoded in a pool of threads.
+    The `processing_fn` is applied to the numpy image before the encoding.
+
+    Args:
+        shape: `tuple`. If provided, the shape the images must have.
+    """
+    requires_session = False
+
+    def __init__(self, shape=None):
+        self._shape = shape
+
+    def decoder(self, channels):
+        pass
+
+    def get_config(self):
+        return {'shape': self._shape}
+
+    def encode(self, image):
+        raise NotImplementedError
+
+    def read(self, session, image_data, processing_fn=None):
+        image = image_data
+        if processing_fn:
+            image = processing_fn(session, image)
+        image = np.asarray(image, dtype=np.uint8)
+        if self._shape is not None and image.shape != tuple(self._shape):
+            raise ValueError('Expected an image of shape `{}`, received `{}`.'.format(
+                tuple(self._shape), image.shape))
+        return self.encode(image), image
+
+
+class PillowImageReader(NumpyImageReader):
+    """Base class for readers encoding numpy images with Pillow."""
+    image_format = None
+
+    def get_save_params(self):
+        return {}
+
+    def encode(self, image):
+        if image.ndim == 3 and image.shape[2] == 1:
+            image = image[:, :, 0]
+        buffer = io.BytesIO()
+        Image.fromarray(image).save(buffer, format=self.image_format, **self.get_save_params())
+        return buffer.getvalue()
+
+
+class PNGPillowImageReader(PillowImageReader):
+    """A numpy png image class reader based on Pillow"""
+    image_format = 'PNG'
+
+
+class JPEGPillowImageReader(PillowImageReader):
+    """A numpy jpeg image class reader based on Pillow
+
+    Args:
+        shape: `tuple`. If provided, the shape the images must have.
+        quality: `int`. The quality of the encoding, from 0 to 100.
+    """
+    image_format = 'JPEG'
+
+    def __init__(self, shape=None, quality=95):
+        super(JPEGPillowImageReader, self).__init__(shape=shape)
+        self._quality = quality
+
+    def get_config(self):
+        config = super(JPEGPillowImageReader, self).get_config()
+        config['quality'] = self._quality
+        return config
+
+    def get_save_params(self):
+        return {'quality': self._quality}
+
+
+class RawImageReader(NumpyImageReader):
+    """A numpy image class reader storing the uncompressed uint8 bytes.
+
+    The images are decoded with a reshape, they must therefore have a fixed shape.
+    """
+    def encode(self, image):
+        return np.ascontiguousarray(image).tobytes()
+
+
 class ImagesToTFExampleConverter(object):
     """Converts images to a TFRecords of TF-Example protos.
 
@@ -76,7 +284,9 @@ class ImagesToTFExampleConverter(object):
         classes: `dict` or `list`. The data classes.
             e.g. ['zero', 'one', 'two', ...] or {0: 'cats', 1: 'dogs'}
         colorspace: `str`. The color space of the images, 'rgb', 'grayscale' ...
-        image_format: `str`. The format of the images, 'png', 'jpeg'.
+        image_format: `str`. The format of the images, 'png', 'jpeg' or 'raw'.
+            'raw' images are stored as uncompressed uint8 bytes and require
+            the `height` and `width`.
         channels: `int`. The number of channels of the images, e.g. 1, 3.
         image_reader: `ImageReader` instance. If `None` an image reader is created automatically
             based on the `image_format`.
@@ -95,6 +305,11 @@ class ImagesToTFExampleConverter(object):
                 self.image_reader = PNGImageReader(channels=channels)
             elif image_format == 'jpeg':
                 self.image_reader = JPEGImageReader(channels=channels)
+            elif image_format == 'raw':
+                self.image_reader = RawImageReader(shape=(height, width, channels))
+
+        if image_format == 'raw' and not (height and width):
+            raise ValueError('The `raw` format requires the `height` and `width` of the images.')
 
         if isinstance(classes, Mapping):
             self.classes = list(classes.values())
@@ -210,22 +425,305 @@ class ImagesToTFExampleConverter(object):
 
         return tf.train.Example(features=tf.train.Features(feature=features))
 
-    def convert(self, session, writer, images, labels, total_num_items, start_index=0,
-                filenames=None, processing_fn=None, post_processing_fn=None):
-
+    def _check_filenames(self, filenames):
         if self.store_filenames and not filenames:
             raise ValueError('`filenames` is required to store the filename in TF-Example.'
                              'Either provide a list of `filenames` or '
                              'set `store_filenames` to `False`')
 
-        for i in xrange(start_index, len(images)):
-            sys.stdout.write('\r>> Converting image %d/%d' % (i + 1, total_num_items))
-            sys.stdout.flush()
+    def _convert_range(self, session, writer, image_reader, images, labels, start, end,
+                       total_num_items, filenames=None, processing_fn=None,
+                       post_processing_fn=None, statistics=None):
+        for i in xrange(start, end):
+            if total_num_items:
+                sys.stdout.write('\r>> Converting image %d/%d' % (i + 1, total_num_items))
+                sys.stdout.flush()
 
-            image_data, encoded_image = self.image_reader.read(
+            image_data, encoded_image = image_reader.read(
                 session=session, image_data=images[i], processing_fn=processing_fn)
             if post_processing_fn:
                 _, image_data = post_processing_fn(session, encoded_image)
             example = self.create_example(image_data, encoded_image, labels[i],
                                           filenames[i] if self.store_filenames else None)
             writer.write(example.SerializeToString())
+            if statistics is not None:
+                # The statistics of the pixels are computed when the reader decodes the images.
+                if hasattr(encoded_image, 'shape'):
+                    statistics.update_image(encoded_image)
+                statistics.update_label(labels[i])
+
+    def convert(self, session, writer, images, labels, total_num_items, start_index=0,
+                filenames=None, processing_fn=None, post_processing_fn=None):
+        self._check_filenames(filenames)
+        self._convert_range(session=session, writer=writer, image_reader=self.image_reader,
+                            images=images, labels=labels, start=start_index, end=len(images),
+                            total_num_items=total_num_items, filenames=filenames,
+                            processing_fn=processing_fn, post_processing_fn=post_processing_fn)
+
+    def _requires_session(self, post_processing_fn):
+        if self.image_reader.requires_session or post_processing_fn is None:
+            return self.image_reader.requires_session
+        return getattr(getattr(post_processing_fn, '__self__', None), 'requires_session', True)
+
+    def _run_worker(self, write_fn, post_processing_fn, results, use_session=True, **kwargs):
+        """Runs `write_fn(session, image_reader, post_processing_fn, results, **kwargs)`,
+        in a new graph and session if `use_session`."""
+        try:
+            if not use_session:
+                write_fn(None, self.image_reader, post_processing_fn, results, **kwargs)
+                return
+
+            with tf.Graph().as_default():
+                # The readers' ops belong to the graph they were created in, they are recreated.
+                image_reader = self.image_reader.copy()
+                if isinstance(getattr(post_processing_fn, '__self__', None), ImageReader):
+                    post_processing_fn = post_processing_fn.__self__.copy().read
+
+                with tf.Session('') as session:
+                    write_fn(session, image_reader, post_processing_fn, results, **kwargs)
+        except Exception as e:
+            results.put((None, '{}: {}'.format(type(e).__name__, e)))
+            raise
+
+    @staticmethod
+    def _open_shard(shard_filename):
+        # Shards are written to temporary files renamed once complete,
+        # so interrupted runs are not picked up.
+        return IndexedTFRecordWriter('{}.tmp'.format(shard_filename),
+                                     index_path='{}.tmp'.format(get_index_filename(shard_filename)))
+
+    @staticmethod
+    def _close_shard(writer, shard_filename, statistics):
+        writer.close()
+        index_filename = get_index_filename(shard_filename)
+        statistics_filename = get_statistics_filename(shard_filename)
+        write_statistics('{}.tmp'.format(statistics_filename), statistics)
+        tf.gfile.Rename('{}.tmp'.format(statistics_filename), statistics_filename,
+                        overwrite=True)
+        tf.gfile.Rename('{}.tmp'.format(index_filename), index_filename, overwrite=True)
+        tf.gfile.Rename('{}.tmp'.format(shard_filename), shard_filename, overwrite=True)
+
+    def _write_shards(self, session, image_reader, post_processing_fn, results, shards, images,
+                      labels, filenames, processing_fn):
+        """Converts a list of `(shard_filename, start, end)`."""
+        for shard_filename, start, end in shards:
+            writer = self._open_shard(shard_filename)
+            statistics = DatasetStatistics()
+            self._convert_range(
+                session=session, writer=writer, image_reader=image_reader,
+                images=images, labels=labels, start=start, end=end,
+                total_num_items=len(images), filenames=filenames,
+                processing_fn=processing_fn, post_processing_fn=post_processing_fn,
+                statistics=statistics)
+            self._close_shard(writer, shard_filename, statistics)
+            results.put((shard_filename, end - start))
+
+    def _write_streamed_shards(self, session, image_reader, post_processing_fn, results,
+                               shard_filenames, tasks, processing_fn):
+        """Converts the `(shard_filename, images, labels, filenames)` tasks until a `None` task,
+        the records are appended to the shard files as they are received."""
+        writers = {shard_filename: self._open_shard(shard_filename)
+                   for shard_filename in shard_filenames}
+        statistics = {shard_filename: DatasetStatistics() for shard_filename in shard_filenames}
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            shard_filename, images, labels, filenames = task
+            self._convert_range(
+                session=session, writer=writers[shard_filename], image_reader=image_reader,
+                images=images, labels=labels, start=0, end=len(images), total_num_items=None,
+                filenames=filenames, processing_fn=processing_fn,
+                post_processing_fn=post_processing_fn, statistics=statistics[shard_filename])
+
+        for shard_filename in shard_filenames:
+            writer = writers[shard_filename]
+            self._close_shard(writer, shard_filename, statistics[shard_filename])
+            results.put((shard_filename, writer.num_records))
+
+    def _start_workers(self, num_workers, use_processes, kwargs_by_worker):
+        # Process workers are forked and inherit their arguments, they're never pickled.
+        worker_class = multiprocessing.Process if use_processes else threading.Thread
+        workers = [worker_class(target=self._run_worker, kwargs=kwargs_by_worker[i])
+                   for i in xrange(num_workers)]
+        for worker in workers:
+            worker.daemon = True
+            worker.start()
+        return workers
+
+    @staticmethod
+    def _check_workers(output_prefix, workers, results, use_processes, block=True):
+        """Returns the next `(shard_filename, count)` result of the workers, None if there's
+        none yet, and raises a `RuntimeError` if a worker failed."""
+        def stop(message):
+            if use_processes:
+                for worker in workers:
+                    worker.terminate()
+            raise RuntimeError('Failed converting `{}`: {}'.format(output_prefix, message))
+
+        try:
+            shard_filename, count = results.get(timeout=1) if block else results.get_nowait()
+        except queue.Empty:
+            if use_processes and any(worker.exitcode not in (None, 0) for worker in workers):
+                stop('a worker exited unexpectedly.')
+            if not use_processes and not any(worker.is_alive() for worker in workers):
+                stop('the workers stopped before converting all shards.')
+            return None
+        if shard_filename is None:
+            stop(count)
+        return shard_filename, count
+
+    def _wait_workers(self, output_prefix, workers, results, use_processes, shard_filenames,
+                      counts=None):
+        """Waits for the results of all the shards, `counts` are the results already received."""
+        counts = dict(counts or {})
+        while len(counts) < len(shard_filenames):
+            result = self._check_workers(output_prefix, workers, results, use_processes)
+            if result is not None:
+                counts[result[0]] = result[1]
+
+        for worker in workers:
+            worker.join()
+
+        return {
+            'files': [os.path.basename(shard_filename) for shard_filename in shard_filenames],
+            'num_samples': [counts[shard_filename] for shard_filename in shard_filenames],
+            'statistics': merge_shards_statistics(shard_filenames)
+        }
+
+    def convert_sharded(self, output_prefix, images, labels, num_shards, num_workers=None,
+                        filenames=None, processing_fn=None, post_processing_fn=None):
+        """Converts the images to `num_shards` balanced TFRecord files using a pool of workers.
+
+        The shard files are named `output_prefix-00000-of-0000N`, each with an index
+        sidecar `output_prefix-00000-of-0000N.index` of its records' offsets and lengths,
+        and a sidecar `output_prefix-00000-of-0000N.statistics.json` of the statistics
+        accumulated while writing the records.
+        If the readers require a session, the workers are processes encoding
+        their shards in their own graph and session, otherwise the workers are threads.
+
+        Args:
+            output_prefix: `str`. The prefix of the shard files.
+            images: `list`. The images to convert.
+            labels: `list`. The labels of the images.
+            num_shards: `int`. The number of shard files to write.
+            num_workers: `int`. The number of workers to use,
+                defaults to `min(num_shards, cpu_count)`. If 1, the conversion runs in process.
+            filenames: `list`. The filenames of the images, required if `store_filenames`.
+            processing_fn: `function`. A function to apply to the image before the encoding,
+                called within the worker's graph, or on the numpy image for `NumpyImageReader`s.
+            post_processing_fn: `function`. A function to re-encode the image.
+                If it's the `read` method of an `ImageReader`,
+                the reader is recreated in the worker's graph.
+
+        Returns:
+            `dict` with the shard `files` basenames, their `num_samples`, and the
+            `statistics` of the images and labels, see `DatasetStatistics`.
+        """
+        self._check_filenames(filenames)
+        if num_shards < 1:
+            raise ValueError('`num_shards` must be positive, received `{}`'.format(num_shards))
+
+        num_workers = num_workers or min(num_shards, multiprocessing.cpu_count())
+        num_workers = min(num_workers, num_shards)
+        use_session = self._requires_session(post_processing_fn)
+        use_processes = use_session and num_workers > 1
+        shard_filenames = get_shard_filenames(output_prefix, num_shards)
+        shards = [(shard_filename, start, end) for shard_filename, (start, end) in
+                  zip(shard_filenames, get_shard_ranges(len(images), num_shards))]
+
+        results = multiprocessing.Queue() if use_processes else queue.Queue()
+        kwargs_by_worker = [
+            dict(write_fn=self._write_shards, post_processing_fn=post_processing_fn,
+                 results=results, use_session=use_session, shards=shards[i::num_workers],
+                 images=images, labels=labels, filenames=filenames, processing_fn=processing_fn)
+            for i in xrange(num_workers)]
+        workers = self._start_workers(num_workers, use_processes, kwargs_by_worker)
+        return self._wait_workers(output_prefix, workers, results, use_processes, shard_filenames)
+
+    def convert_chunks(self, output_prefix, chunks, num_shards, num_workers=None,
+                       processing_fn=None, post_processing_fn=None, max_pending_chunks=2):
+        """Converts a stream of chunks of images to `num_shards` balanced TFRecord files
+        using a pool of workers, with a memory bounded by `max_pending_chunks` chunks.
+
+        The images are assigned round robin to the shards, and the records are written as
+        they are converted, the number of images doesn't need to be known in advance. Every
+        worker owns a set of shard files, see `convert_sharded` for the files and the workers.
+
+        Args:
+            output_prefix: `str`. The prefix of the shard files.
+            chunks: An iterable of `(images, labels)` or `(images, labels, filenames)` chunks,
+                the images and labels are lists or numpy arrays.
+            num_shards: `int`. The number of shard files to write.
+            num_workers: `int`. The number of workers to use,
+                defaults to `min(num_shards, cpu_count)`.
+            processing_fn: `function`. A function to apply to the image before the encoding,
+                see `convert_sharded`.
+            post_processing_fn: `function`. A function to re-encode the image,
+                see `convert_sharded`.
+            max_pending_chunks: `int`. The number of chunks queued for a worker before
+                reading the next chunks blocks.
+
+        Returns:
+            `dict` with the shard `files` basenames, their `num_samples`, and the
+            `statistics` of the images and labels, see `DatasetStatistics`.
+        """
+        if num_shards < 1:
+            raise ValueError('`num_shards` must be positive, received `{}`'.format(num_shards))
+
+        num_workers = num_workers or min(num_shards, multiprocessing.cpu_count())
+        num_workers = min(num_workers, num_shards)
+        use_session = self._requires_session(post_processing_fn)
+        use_processes = use_session and num_workers > 1
+        shard_filenames = get_shard_filenames(output_prefix, num_shards)
+        queue_class = multiprocessing.Queue if use_processes else queue.Queue
+
+        results = queue_class()
+        max_tasks = max_pending_chunks * -(-num_shards // num_workers)
+        tasks = [queue_class(max_tasks) for _ in xrange(num_workers)]
+        kwargs_by_worker = [
+            dict(write_fn=self._write_streamed_shards, post_processing_fn=post_processing_fn,
+                 results=results, use_session=use_session,
+                 shard_filenames=shard_filenames[i::num_workers], tasks=tasks[i],
+                 processing_fn=processing_fn)
+            for i in xrange(num_workers)]
+        workers = self._start_workers(num_workers, use_processes, kwargs_by_worker)
+
+        # The results received while the tasks are queued, a worker can finish
+        # its shards before the other workers are given their last task.
+        counts = {}
+
+        def put(worker_index, task):
+            while True:
+                try:
+                    tasks[worker_index].put(task, timeout=1)
+                    return
+                except queue.Full:
+                    result = self._check_workers(output_prefix, workers, results,
+                                                 use_processes, block=False)
+                    if result is not None:
+                        counts[result[0]] = result[1]
+
+        num_items = 0
+        for chunk in chunks:
+            images, labels = chunk[0], chunk[1]
+            filenames = chunk[2] if len(chunk) > 2 else None
+            self._check_filenames(filenames)
+            for shard_index in xrange(num_shards):
+                # The item `num_items + i` belongs to the shard `(num_items + i) % num_shards`
+                start = (shard_index - num_items) % num_shards
+                if start >= len(images):
+                    continue
+                put(shard_index % num_workers, (
+                    shard_filenames[shard_index],
+                    images[start::num_shards],
+                    labels[start::num_shards],
+                    filenames[start::num_shards] if filenames is not None else None))
+            num_items += len(images)
+            sys.stdout.write('\r>> Converted %d images' % num_items)
+            sys.stdout.flush()
+
+        for worker_index in xrange(num_workers):
+            put(worker_index, None)
+        return self._wait_workers(output_prefix, workers, results, use_processes, shard_filenames,
+                                  counts=counts)
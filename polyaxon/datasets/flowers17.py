@@ -17,8 +17,10 @@ from polyaxon.datasets.converters import (
 )
 from polyaxon.datasets.utils import (
     download_datasets,
-    delete_datasets,
     make_dataset_dir,
+    shards_exist,
+    count_tfrecord_shards_content,
+    get_meta_data_statistics,
     create_dataset_input_fn,
     create_dataset_predict_input_fn
 )
@@ -38,6 +40,10 @@ _IMAGE_COLORSPACE = 'RGB'
 
 _FOLDS = 10
 
+_NUM_SHARDS = {Modes.TRAIN: 4, Modes.EVAL: 1, Modes.PREDICT: 1}
+
+_CHUNK_SIZE = 100
+
 MEAT_DATA_FILENAME_FORMAT = '{}/meta_data.json'
 
 RECORD_FILE_NAME_FORMAT = '{}/flowers_{}.tfrecord'
@@ -67,16 +73,27 @@ def filenames_by_classes(dataset_dir, num_images, folds):
             Modes.PREDICT: test_filenames_by_classes}
 
 
-def convert_images(session, writer, converter, filesnames_by_classes):
-    images = []
-    labels = []
-    image_filenames = []
-    for class_id in filesnames_by_classes:
-        for image_filename in filesnames_by_classes[class_id]:
-            images.append(tf.gfile.FastGFile(image_filename, 'rb').read())
+def _iter_chunks(filesnames_by_classes, chunk_size=_CHUNK_SIZE):
+    """Reads the images by chunks of `chunk_size` files.
+
+    Returns:
+        A generator of `(images, labels, filenames)` lists.
+    """
+    items = [(image_filename, class_id) for class_id in filesnames_by_classes
+             for image_filename in filesnames_by_classes[class_id]]
+    for start in xrange(0, len(items), chunk_size):
+        images = []
+        labels = []
+        image_filenames = []
+        for image_filename, class_id in items[start:start + chunk_size]:
+            with tf.gfile.FastGFile(image_filename, 'rb') as f:
+                images.append(f.read())
             labels.append(class_id)
             image_filenames.append(image_filename)
+        yield images, labels, image_filenames
 
+
+def convert_images(converter, output_prefix, num_shards, filesnames_by_classes):
     image_encoder = JPGNumpyImageReader(shape=(_IMAGE_SIZE, _IMAGE_SIZE, _NUM_CHANNELS))
 
     def processing_fn(session, image):
@@ -84,44 +101,34 @@ def convert_images(session, writer, converter, filesnames_by_classes):
         image.set_shape((_IMAGE_SIZE, _IMAGE_SIZE, _NUM_CHANNELS))
         return image
 
-    converter.convert(session=session, writer=writer, images=images, labels=labels,
-                      total_num_items=len(images), filenames=image_filenames,
-                      processing_fn=processing_fn, post_processing_fn=image_encoder.read)
+    return converter.convert_chunks(
+        output_prefix=output_prefix, chunks=_iter_chunks(filesnames_by_classes),
+        num_shards=num_shards, processing_fn=processing_fn,
+        post_processing_fn=image_encoder.read)
 
 
 def prepare_dataset(converter, dataset_dir, num_images, folds):
-    train_filename = RECORD_FILE_NAME_FORMAT.format(dataset_dir, Modes.TRAIN)
-    eval_filename = RECORD_FILE_NAME_FORMAT.format(dataset_dir, Modes.EVAL)
-    test_filename = RECORD_FILE_NAME_FORMAT.format(dataset_dir, Modes.PREDICT)
+    """Converts the images to shards and returns the shards meta data by mode."""
+    prefixes = {mode: RECORD_FILE_NAME_FORMAT.format(dataset_dir, mode)
+                for mode in [Modes.TRAIN, Modes.EVAL, Modes.PREDICT]}
 
-    filenames = [train_filename, eval_filename, test_filename]
-    files_exist = [tf.gfile.Exists(f) for f in filenames]
+    files_exist = [shards_exist(prefixes[mode], _NUM_SHARDS[mode]) for mode in prefixes]
     if all(files_exist):
         print('Dataset files already exist. Exiting without re-creating them.')
-        return
+        return {mode: count_tfrecord_shards_content(prefixes[mode], _NUM_SHARDS[mode])
+                for mode in prefixes}
 
     if any(files_exist):
         print('Some Dataset files already exist but not all of them. Re-creating them.')
-        delete_datasets('.', filenames)
 
     filesnames_by_classes = filenames_by_classes(dataset_dir, num_images, folds)
 
-    with tf.python_io.TFRecordWriter(train_filename) as tfrecord_writer:
-        with tf.Session('') as session:
-            print('converting {} images.'.format(Modes.TRAIN))
-            convert_images(
-                session, tfrecord_writer, converter, filesnames_by_classes[Modes.TRAIN])
-
-    with tf.python_io.TFRecordWriter(eval_filename) as tfrecord_writer:
-        with tf.Session('') as session:
-            print('converting {} images.'.format(Modes.EVAL))
-            convert_images(
-                session, tfrecord_writer, converter, filesnames_by_classes[Modes.EVAL])
-
-    with tf.python_io.TFRecordWriter(test_filename) as tfrecord_writer:
-        with tf.Session('') as session:
-            print('converting test images.')
-            convert_images(session, tfrecord_writer, converter, filesnames_by_classes[Modes.PREDICT])
+    shards = {}
+    for mode in prefixes:
+        print('converting {} images.'.format(mode))
+        shards[mode] = convert_images(
+            converter, prefixes[mode], _NUM_SHARDS[mode], filesnames_by_classes[mode])
+    return shards
 
 
 def prepare(dataset_dir):
@@ -139,14 +146,14 @@ def prepare(dataset_dir):
         classes=list(range(17)), colorspace=_IMAGE_COLORSPACE, image_format=_IMAGE_FORMAT,
         channels=_NUM_CHANNELS, image_reader=image_reader, height=_IMAGE_SIZE, width=_IMAGE_SIZE)
 
-    prepare_dataset(converter, dataset_dir, 1360, folds=_FOLDS)
+    shards = prepare_dataset(converter, dataset_dir, 1360, folds=_FOLDS)
 
     # Finally, write the meta data:
     with open(MEAT_DATA_FILENAME_FORMAT.format(dataset_dir), 'w') as meta_data_file:
         meta_data = converter.get_meta_data()
-        meta_data['num_samples'] = {Modes.TRAIN: 1360 - 2 * (1360 // _FOLDS),
-                                    Modes.EVAL: 1360 // _FOLDS,
-                                    Modes.PREDICT: 1360 // _FOLDS}
+        meta_data['num_samples'] = {mode: sum(shards[mode]['num_samples']) for mode in shards}
+        meta_data['statistics'] = get_meta_data_statistics(shards)
+        meta_data['shards'] = shards
         meta_data['items_to_descriptions'] = {
             'image': 'A image of colorspace {} resized to {}.'.format(
                 _IMAGE_COLORSPACE, _IMAGE_SIZE),
@@ -6,14 +6,18 @@ import json
 import os
 
 import numpy as np
-import tensorflow as tf
+
+from six.moves import xrange
 
 from polyaxon import Modes
-from polyaxon.datasets.converters import ImagesToTFExampleConverter, PNGNumpyImageReader
+from polyaxon.datasets.converters import ImagesToTFExampleConverter, PNGPillowImageReader
 from polyaxon.datasets.utils import (
     download_datasets,
     delete_datasets,
     make_dataset_dir,
+    shards_exist,
+    count_tfrecord_shards_content,
+    get_meta_data_statistics,
     create_dataset_input_fn,
     create_dataset_predict_input_fn
 )
@@ -31,53 +35,53 @@ RECORD_FILE_NAME_FORMAT = '{}/mnist_{}.tfrecord'
 _IMAGE_SIZE = 28
 _NUM_CHANNELS = 1
 
+_NUM_SHARDS = {Modes.TRAIN: 10, Modes.EVAL: 2, Modes.PREDICT: 2}
 
-def _extract_images(filename, num_images):
-    """Extract the images into a numpy array.
-
-    Args:
-        filename: The path to an MNIST images file.
-        num_images: The number of images in the file.
-
-    Returns:
-        A numpy array of shape [number_of_images, height, width, channels].
-    """
-    print('Extracting images from: ', filename)
-    with gzip.open(filename) as bytestream:
-        bytestream.read(16)
-        buf = bytestream.read(_IMAGE_SIZE * _IMAGE_SIZE * num_images * _NUM_CHANNELS)
-        data = np.frombuffer(buf, dtype=np.uint8)
-        data = data.reshape(num_images, _IMAGE_SIZE, _IMAGE_SIZE, _NUM_CHANNELS)
-    return data
+_CHUNK_SIZE = 1000
 
 
-def _extract_labels(filename, num_labels):
-    """Extract the labels into a vector of int64 label IDs.
+def _iter_chunks(data_filename, labels_filename, start, end, chunk_size=_CHUNK_SIZE):
+    """Reads the images `[start, end)` and their labels by chunks, only a chunk of
+    the gz files is in memory at a time.
 
     Args:
-        filename: The path to an MNIST labels file.
-        num_labels: The number of labels in the file.
+        data_filename: The path to an MNIST images file.
+        labels_filename: The path to an MNIST labels file.
+        start: The index of the first image.
+        end: The index after the last image.
+        chunk_size: The number of images per chunk.
 
     Returns:
-        A numpy array of shape [number_of_labels]
+        A generator of `(images, labels)` numpy arrays of shapes
+        `[chunk_size, height, width, channels]` and `[chunk_size]`.
     """
-    print('Extracting labels from: ', filename)
-    with gzip.open(filename) as bytestream:
-        bytestream.read(8)
-        buf = bytestream.read(1 * num_labels)
-        labels = np.frombuffer(buf, dtype=np.uint8).astype(np.int64)
-    return labels
+    print('Extracting images from: ', data_filename)
+    image_size = _IMAGE_SIZE * _IMAGE_SIZE * _NUM_CHANNELS
+    with gzip.open(data_filename) as images_stream, gzip.open(labels_filename) as labels_stream:
+        images_stream.seek(16 + start * image_size)
+        labels_stream.seek(8 + start)
+        for chunk_start in xrange(start, end, chunk_size):
+            num_images = min(chunk_size, end - chunk_start)
+            images = np.frombuffer(images_stream.read(image_size * num_images), dtype=np.uint8)
+            images = images.reshape(num_images, _IMAGE_SIZE, _IMAGE_SIZE, _NUM_CHANNELS)
+            labels = np.frombuffer(labels_stream.read(num_images), dtype=np.uint8)
+            yield images, labels.astype(np.int64)
 
 
 def prepare_dataset(converter, dataset_dir, data_name, num_images, num_eval=0):
+    """Converts the data to shards and returns the shards meta data by mode."""
     filename = RECORD_FILE_NAME_FORMAT.format(dataset_dir, data_name)
     if num_eval:
         eval_filename = RECORD_FILE_NAME_FORMAT.format(dataset_dir, Modes.EVAL)
 
-    if tf.gfile.Exists(filename):
+    if shards_exist(filename, _NUM_SHARDS[data_name]):
         print('`{}` Dataset files already exist. '
               'Exiting without re-creating them.'.format(filename))
-        return
+        shards = {data_name: count_tfrecord_shards_content(filename, _NUM_SHARDS[data_name])}
+        if num_eval:
+            shards[Modes.EVAL] = count_tfrecord_shards_content(
+                eval_filename, _NUM_SHARDS[Modes.EVAL])
+        return shards
 
     if data_name == Modes.TRAIN:
         filenames = [_TRAIN_DATA_FILENAME, _TRAIN_LABELS_FILENAME]
@@ -93,24 +97,20 @@ def prepare_dataset(converter, dataset_dir, data_name, num_images, num_eval=0):
         data_filename = os.path.join(dataset_dir, _TEST_DATA_FILENAME)
         labels_filename = os.path.join(dataset_dir, _TEST_LABELS_FILENAME)
 
-    images = _extract_images(data_filename, num_images)
-    labels = _extract_labels(labels_filename, num_images)
-    if num_eval:
-        images, eval_images = images[num_eval:], images[:num_eval]
-        labels, eval_labels = labels[num_eval:], labels[:num_eval]
-
-    with tf.python_io.TFRecordWriter(filename) as tfrecord_writer:
-        with tf.Session('') as session:
-            converter.convert(session=session, writer=tfrecord_writer, images=images,
-                              labels=labels, total_num_items=len(images))
+    # The first `num_eval` images are the evaluation data.
+    shards = {data_name: converter.convert_chunks(
+        output_prefix=filename,
+        chunks=_iter_chunks(data_filename, labels_filename, num_eval, num_images),
+        num_shards=_NUM_SHARDS[data_name])}
 
     if num_eval:
-        with tf.python_io.TFRecordWriter(eval_filename) as tfrecord_writer:
-            with tf.Session('') as session:
-                converter.convert(session=session, writer=tfrecord_writer, images=eval_images,
-                                  labels=eval_labels, total_num_items=len(eval_images))
+        shards[Modes.EVAL] = converter.convert_chunks(
+            output_prefix=eval_filename,
+            chunks=_iter_chunks(data_filename, labels_filename, 0, num_eval),
+            num_shards=_NUM_SHARDS[Modes.EVAL])
 
     delete_datasets(dataset_dir, filenames)
+    return shards
 
 
 def prepare(dataset_dir):
@@ -121,21 +121,21 @@ def prepare(dataset_dir):
     """
     make_dataset_dir(dataset_dir)
 
-    image_reader = PNGNumpyImageReader(shape=(_IMAGE_SIZE, _IMAGE_SIZE, _NUM_CHANNELS))
+    image_reader = PNGPillowImageReader(shape=(_IMAGE_SIZE, _IMAGE_SIZE, _NUM_CHANNELS))
     classes = ['zero', 'one', 'two', 'three', 'four', 'five', 'size', 'seven', 'eight', 'nine']
     converter = ImagesToTFExampleConverter(
         classes=classes, colorspace='grayscale', image_format='png',
         channels=_NUM_CHANNELS, image_reader=image_reader, height=_IMAGE_SIZE, width=_IMAGE_SIZE)
 
-    prepare_dataset(converter, dataset_dir, Modes.TRAIN, 60000, num_eval=10000)
-    prepare_dataset(converter, dataset_dir, Modes.PREDICT, 10000)
+    shards = prepare_dataset(converter, dataset_dir, Modes.TRAIN, 60000, num_eval=10000)
+    shards.update(prepare_dataset(converter, dataset_dir, Modes.PREDICT, 10000))
 
     # Finally, write the meta data:
     with open(MEAT_DATA_FILENAME_FORMAT.format(dataset_dir), 'w') as meta_data_file:
         meta_data = converter.get_meta_data()
-        meta_data['num_samples'] = {Modes.TRAIN: 50000,
-                                    Modes.EVAL: 10000,
-                                    Modes.PREDICT: 10000}
+        meta_data['num_samples'] = {mode: sum(shards[mode]['num_samples']) for mode in shards}
+        meta_data['statistics'] = get_meta_data_statistics(shards)
+        meta_data['shards'] = shards
         meta_data['items_to_descriptions'] = {
             'image': 'A image of fixed size 28.',
             'label': 'A single integer between 0 and 9',
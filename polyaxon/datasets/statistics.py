@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, print_function
+
+import json
+
+from collections import Counter
+
+import numpy as np
+import tensorflow as tf
+
+STATISTICS_FILE_NAME_FORMAT = '{}.statistics.json'
+
+
+def get_statistics_filename(tfrecord_filename):
+    """Returns the name of the statistics sidecar of a TFRecord file."""
+    return STATISTICS_FILE_NAME_FORMAT.format(tfrecord_filename)
+
+
+class DatasetStatistics(object):
+    """Accumulates the statistics of a dataset in a single streaming pass, e.g. while
+    writing its records.
+
+    * The per channel mean and standard deviation of the images' pixels, updated
+      with the parallel variant of Welford's algorithm.
+    * The histogram of the classes.
+    * The histograms of sequence lengths, by feature.
+
+    The statistics of several parts of a dataset, e.g. its shards, are combined with `merge`.
+    """
+    def __init__(self):
+        self.num_images = 0
+        self.num_pixels = 0
+        self.channel_mean = None
+        self._channel_m2 = None
+        self.class_histogram = Counter()
+        self.length_histograms = {}
+
+    def _update_moments(self, num_pixels, mean, m2):
+        if num_pixels == 0:
+            return
+        if self.num_pixels == 0:
+            self.num_pixels, self.channel_mean, self._channel_m2 = num_pixels, mean, m2
+            return
+
+        total = self.num_pixels + num_pixels
+        delta = mean - self.channel_mean
+        self.channel_mean = self.channel_mean + delta * num_pixels / total
+        self._channel_m2 = (self._channel_m2 + m2 +
+                            delta ** 2 * self.num_pixels * num_pixels / total)
+        self.num_pixels = total
+
+    def update_image(self, image):
+        """Updates the channels moments with an image of shape `[height, width, channels]`."""
+        image = np.asarray(image, dtype=np.float64)
+        pixels = image.reshape((-1, image.shape[-1] if image.ndim > 2 else 1))
+        mean = pixels.mean(axis=0)
+        self._update_moments(len(pixels), mean, ((pixels - mean) ** 2).sum(axis=0))
+        self.num_images += 1
+
+    def update_label(self, label):
+        self.class_histogram[int(label)] += 1
+
+    def update_length(self, feature, length):
+        self.length_histograms.setdefault(feature, Counter())[int(length)] += 1
+
+    @property
+    def channel_std(self):
+        if self.num_pixels == 0:
+            return None
+        return np.sqrt(self._channel_m2 / self.num_pixels)
+
+    def merge(self, statistics):
+        """Combines the statistics of another part of the dataset."""
+        self._update_moments(statistics.num_pixels, statistics.channel_mean,
+                             statistics._channel_m2)
+        self.num_images += statistics.num_images
+        self.class_histogram.update(statistics.class_histogram)
+        for feature, histogram in statistics.length_histograms.items():
+            self.length_histograms.setdefault(feature, Counter()).update(histogram)
+        return self
+
+    def to_dict(self):
+        def to_list(histogram):
+            values = [0] * (max(histogram) + 1 if histogram else 0)
+            for value, count in histogram.items():
+                values[value] = count
+            return values
+
+        return {
+            'num_images': self.num_images,
+            'num_pixels': self.num_pixels,
+            'channel_mean': self.channel_mean.tolist() if self.num_pixels else None,
+            'channel_std': self.channel_std.tolist() if self.num_pixels else None,
+            'class_histogram': {str(label): count
+                                for label, count in sorted(self.class_histogram.items())},
+            'length_histograms': {feature: to_list(histogram)
+                                  for feature, histogram in self.length_histograms.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, values):
+        statistics = cls()
+        statistics.num_images = values.get('num_images', 0)
+        statistics.num_pixels = values.get('num_pixels', 0)
+        if statistics.num_pixels:
+            statistics.channel_mean = np.asarray(values['channel_mean'], dtype=np.float64)
+            channel_std = np.asarray(values['channel_std'], dtype=np.float64)
+            statistics._channel_m2 = channel_std ** 2 * statistics.num_pixels
+        statistics.class_histogram = Counter(
+            {int(label): count for label, count in values.get('class_histogram', {}).items()})
+        statistics.length_histograms = {
+            feature: Counter({length: count for length, count in enumerate(histogram) if count})
+            for feature, histogram in values.get('length_histograms', {}).items()}
+        return statistics
+
+
+def write_statistics(statistics_filename, statistics):
+    with tf.gfile.GFile(statistics_filename, 'w') as f:
+        f.write(json.dumps(statistics.to_dict()))
+
+
+def read_statistics(statistics_filename):
+    with tf.gfile.GFile(statistics_filename, 'r') as f:
+        return DatasetStatistics.from_dict(json.loads(f.read()))
+
+
+def merge_shards_statistics(shard_filenames):
+    """Returns the merged statistics of the shard files as a `dict`, None if a shard
+    has no statistics sidecar."""
+    statistics = DatasetStatistics()
+    for shard_filename in shard_filenames:
+        statistics_filename = get_statistics_filename(shard_filename)
+        if not tf.gfile.Exists(statistics_filename):
+            return None
+        statistics.merge(read_statistics(statistics_filename))
+    return statistics.to_dict()
@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 from __future__ import absolute_import, division, print_function
 
+import json
 import os
 import sys
 import tarfile
@@ -13,8 +14,11 @@ from six.moves import urllib
 from tensorflow.python.framework.errors_impl import NotFoundError
 
 from polyaxon import Modes
+from polyaxon.datasets.converters import get_shard_filenames
+from polyaxon.datasets.statistics import merge_shards_statistics
 from polyaxon.libs.configs import PipelineConfig
 from polyaxon.processing import create_input_data_fn
+from polyaxon.processing.tfrecord_index import count_records
 
 
 def make_dataset_dir(dataset_dir):
@@ -70,7 +74,37 @@ def delete_datasets(dataset_dir, filenames):
 
 
 def count_tfrecord_file_content(tfrecord_filename):
-    return len([_ for _ in tf.python_io.tf_record_iterator(tfrecord_filename)])
+    """Counts the records of a TFRecord file, from its index sidecar if it has one."""
+    return count_records(tfrecord_filename)
+
+
+def shards_exist(prefix, num_shards):
+    return all(tf.gfile.Exists(f) for f in get_shard_filenames(prefix, num_shards))
+
+
+def count_tfrecord_shards_content(prefix, num_shards):
+    """Returns the shards meta data, as returned by `convert_sharded`, of existing shards."""
+    shard_filenames = get_shard_filenames(prefix, num_shards)
+    return {
+        'files': [os.path.basename(f) for f in shard_filenames],
+        'num_samples': [count_tfrecord_file_content(f) for f in shard_filenames],
+        'statistics': merge_shards_statistics(shard_filenames)
+    }
+
+
+def get_meta_data_statistics(shards):
+    """Moves the statistics of the shards meta data, by mode, to a `dict` of statistics by mode.
+    """
+    return {mode: shards[mode].pop('statistics', None) for mode in shards}
+
+
+def get_data_files(dataset_dir, record_file_name_format, meta_data_filename, mode):
+    """Returns the shard files of the mode listed in the meta data, or the single record file."""
+    with open(meta_data_filename) as meta_data_file:
+        shards = json.load(meta_data_file).get('shards', {})
+    if mode in shards:
+        return [os.path.join(dataset_dir, f) for f in shards[mode]['files']]
+    return record_file_name_format.format(dataset_dir, mode)
 
 
 def verify_tfrecord_image(dataset_dir, create_input_fn, channels=3):
@@ -103,9 +137,11 @@ def verify_tfrecord_image(dataset_dir, create_input_fn, channels=3):
 def create_dataset_input_fn(dataset_dir, prepare_fn, record_file_name_format,
                             meta_data_file_name_format):
     prepare_fn(dataset_dir)
-    train_data_file = record_file_name_format.format(dataset_dir, Modes.TRAIN)
-    eval_data_file = record_file_name_format.format(dataset_dir, Modes.EVAL)
     meta_data_filename = meta_data_file_name_format.format(dataset_dir)
+    train_data_file = get_data_files(
+        dataset_dir, record_file_name_format, meta_data_filename, Modes.TRAIN)
+    eval_data_file = get_data_files(
+        dataset_dir, record_file_name_format, meta_data_filename, Modes.EVAL)
     train_input_fn = create_input_data_fn(
         mode=Modes.TRAIN,
         pipeline_config=PipelineConfig(module='TFRecordImagePipeline', dynamic_pad=False,
@@ -124,8 +160,9 @@ def create_dataset_input_fn(dataset_dir, prepare_fn, record_file_name_format,
 def create_dataset_predict_input_fn(dataset_dir, prepare_fn, record_file_name_format,
                                     meta_data_file_name_format):
     prepare_fn(dataset_dir)
-    test_data_file = record_file_name_format.format(dataset_dir, Modes.PREDICT)
     meta_data_filename = meta_data_file_name_format.format(dataset_dir)
+    test_data_file = get_data_files(
+        dataset_dir, record_file_name_format, meta_data_filename, Modes.PREDICT)
     test_input_fn = create_input_data_fn(
         mode=Modes.PREDICT,
         pipeline_config=PipelineConfig(module='TFRecordImagePipeline', dynamic_pad=False,
@@ -5,7 +5,7 @@ from collections import OrderedDict
 
 from polyaxon.estimators.estimator_spec import EstimatorSpec
 from polyaxon.estimators.estimator import Estimator
-from polyaxon.estimators.agents import BaseAgent, Agent, PGAgent, TRPOAgent
+from polyaxon.estimators.agents import BaseAgent, Agent, AsyncAgent, PGAgent, TRPOAgent
 from polyaxon.estimators.hooks import HOOKS
 
 
@@ -15,6 +15,7 @@ ESTIMATORS = OrderedDict([
 
 AGENTS = OrderedDict([
     ('Agent', Agent),
+    ('AsyncAgent', AsyncAgent),
     ('PGAgent', PGAgent),
     ('TRPOAgent', TRPOAgent)
 ])
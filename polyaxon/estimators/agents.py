@@ -1,9 +1,16 @@
 # -*- coding: utf-8 -*-
 from __future__ import absolute_import, division, print_function
 
+import multiprocessing
+import os
+import threading
+import time
+
 import numpy as np
 import tensorflow as tf
 
+from six.moves import queue
+
 from tensorflow.contrib.framework import load_variable
 from tensorflow.python.framework import ops, random_seed
 from tensorflow.python.platform import tf_logging as logging
@@ -18,10 +25,11 @@ from polyaxon import Modes
 from polyaxon.estimators import Estimator
 from polyaxon.estimators import hooks as plx_hooks
 from polyaxon.libs.utils import EPSILON
-from polyaxon.rl.environments import Environment
-from polyaxon.rl.memories import BatchMemory
-from polyaxon.rl.stats import Stats
+from polyaxon.rl.environments import Environment, VectorEnvironment
+from polyaxon.rl.memories import BatchMemory, MemmapMemory, PrioritizedMemory
+from polyaxon.rl.stats import Stats, WindowStats
 from polyaxon.rl.utils import (
+    get_global_timestep,
     get_or_create_global_episode,
     get_or_create_global_timestep,
     conjugate_gradient,
@@ -36,6 +44,14 @@ class BaseAgent(Estimator):
         super(BaseAgent, self).__init__(
             model_fn=model_fn, model_dir=model_dir, config=config, params=params)
         self.memory = memory
+        self._vector_stats = None
+        self._vector_episodes = None
+        # Statistics of the total rewards of the last episodes.
+        self._episode_stats = WindowStats(window_size=100)
+        self._act_fn_cache = None
+        if isinstance(memory, MemmapMemory) and memory.directory is None:
+            # Keep the memory with the checkpoints so that training can resume with it.
+            memory.directory = os.path.join(self.model_dir, 'memory')
 
     def _prepare_train(self, episodes=None, steps=None,
                        hooks=None, max_steps=None, max_episodes=None):
@@ -56,6 +72,55 @@ class BaseAgent(Estimator):
 
         return hooks
 
+    def _record_episode(self, stats):
+        """Adds the total reward of a finished episode to the windowed statistics."""
+        self._episode_stats.update(stats.total())
+
+    def _avg_episode_reward(self):
+        return self._episode_stats.avg() if self._episode_stats.count else 0.
+
+    def _get_act_fn(self, sess, state, fetches, batch_size=1):
+        """Returns a low overhead function running `fetches` for a batch of states.
+
+        Acting runs with `no_run_hooks`, so the hooks of the monitored session are bypassed,
+        and `fetches` are run with a callable of the underlying `tf.Session`, fed with a
+        preallocated states buffer. The function is cached as long as the session,
+        the fetches and the batch size don't change.
+
+        Args:
+            sess: `MonitoredTrainingSession` or `tf.Session` instance.
+            state: The state placeholder.
+            fetches: `list` of tensors or ops to run.
+            batch_size: `int`. The number of states the function is called with.
+
+        Returns:
+            A function taking the states, or a single state if `batch_size` is 1,
+            and returning the values of `fetches`.
+        """
+        # pylint: disable=protected-access
+        session = sess._tf_sess() if hasattr(sess, '_tf_sess') else sess
+        key = (session, tuple(fetches), batch_size)
+        if self._act_fn_cache is not None and self._act_fn_cache[0] == key:
+            return self._act_fn_cache[1]
+
+        buffer = np.zeros([batch_size] + state.get_shape().as_list()[1:],
+                          dtype=state.dtype.as_numpy_dtype)
+        if hasattr(session, 'make_callable'):
+            run_fn = session.make_callable(fetches, feed_list=[state])
+        else:
+            def run_fn(states):
+                return session.run(fetches, feed_dict={state: states})
+
+        def act_fn(states):
+            if batch_size == 1:
+                buffer[0] = states
+            else:
+                buffer[:] = states
+            return run_fn(buffer)
+
+        self._act_fn_cache = (key, act_fn)
+        return act_fn
+
 
 class Agent(BaseAgent):
     """Agent class is a reinforcement learning Q model trainer/evaluator.
@@ -155,7 +220,8 @@ class Agent(BaseAgent):
                 pass
 
         hooks = self._prepare_train(
-            first_update, update_frequency, steps, hooks, max_steps, max_episodes)
+            first_update=first_update, update_frequency=update_frequency, episodes=episodes,
+            steps=steps, hooks=hooks, max_steps=max_steps, max_episodes=max_episodes)
         loss = self._train_model(env=env, first_update=first_update,
                                  update_frequency=update_frequency, hooks=hooks)
         logging.info('Loss for final step: %s.', loss)
@@ -180,6 +246,7 @@ class Agent(BaseAgent):
             dtype=tf.float32, shape=[None, env.num_states], name='state')}
 
         if Modes.is_train(mode) or Modes.is_eval(mode):
+            reward = tf.placeholder(dtype=tf.float32, shape=(None,), name='reward')
             return (
                 features,
                 {
@@ -187,8 +254,11 @@ class Agent(BaseAgent):
                         dtype=tf.float32 if env.is_continuous else tf.int64,
                         shape=(None, env.num_actions) if env.is_continuous else (None, ),
                         name='action'),
-                    'reward': tf.placeholder(dtype=tf.float32, shape=(None,), name='reward'),
+                    'reward': reward,
                     'done': tf.placeholder(dtype=tf.bool, shape=(None,), name='done'),
+                    # Only fed when sampling from a `PrioritizedMemory`.
+                    'importance_weights': tf.placeholder_with_default(
+                        tf.ones_like(reward), shape=(None,), name='importance_weights'),
                     'max_reward': tf.placeholder(
                         dtype=tf.float32, shape=(), name='max_reward'),
                     'min_reward': tf.placeholder(
@@ -197,6 +267,8 @@ class Agent(BaseAgent):
                         dtype=tf.float32, shape=(), name='avg_reward'),
                     'total_reward': tf.placeholder(
                         dtype=tf.float32, shape=(), name='total_reward'),
+                    'avg_episode_reward': tf.placeholder_with_default(
+                        np.float32(0.), shape=(), name='avg_episode_reward'),
                 }
             )
         if Modes.is_infer(mode):
@@ -214,8 +286,11 @@ class Agent(BaseAgent):
                     labels['max_reward']: stats.max(),
                     labels['min_reward']: stats.min(),
                     labels['avg_reward']: stats.avg(),
-                    labels['total_reward']: stats.total()
+                    labels['total_reward']: stats.total(),
+                    labels['avg_episode_reward']: self._avg_episode_reward(),
                 }
+            if from_memory and 'importance_weights' in env_spec:
+                feed_dict[labels['importance_weights']] = env_spec['importance_weights']
         return feed_dict
 
     def run_episode(self, env, sess, features, labels, no_run_hooks, global_step,
@@ -240,37 +315,132 @@ class Agent(BaseAgent):
         Returns:
             statistics about episode.
         """
+        if isinstance(env, VectorEnvironment):
+            return self.run_vector_episode(
+                env=env, sess=sess, features=features, labels=labels,
+                no_run_hooks=no_run_hooks, global_step=global_step,
+                update_episode_op=update_episode_op, update_timestep_op=update_timestep_op,
+                first_update=first_update, update_frequency=update_frequency,
+                estimator_spec=estimator_spec)
+
         env_spec = env.reset()
         stats = Stats()
         loss = None
         episode_done = False
+        act_fn = self._get_act_fn(
+            sess, features['state'], [update_timestep_op, estimator_spec.predictions['results']])
         while not env_spec.done:
-            _, step, timestep, action = sess.run(
-                [no_run_hooks, global_step, update_timestep_op, estimator_spec.predictions['results']],
-                feed_dict=self._prepare_feed_dict('act', features, labels, env_spec.to_dict()))
+            timestep, action = act_fn(env_spec.next_state)
 
             env_spec = env.step(action, env_spec.next_state)
 
             self.memory.step(**env_spec.to_dict())
-            stats.rewards.append(env_spec.reward)
+            stats.update(env_spec.reward)
 
             if env_spec.done:  # TODO: max timestep by episode should also update the episode
                 #  Increment episode number to trigger EpisodeHooks (logging, summary, checkpoint)
                 episode_done = True
+                self._record_episode(stats)
                 sess.run([no_run_hooks, update_episode_op])
+                if isinstance(self.memory, MemmapMemory):
+                    self.memory.flush()
 
             if (timestep > first_update and timestep % update_frequency == 0) or episode_done:
-                if self.memory.can_sample():
-                    feed_dict = self._prepare_feed_dict(
-                        'observe', features, labels, self.memory.sample(), stats, from_memory=True)
-                    _, loss = sess.run(
-                        [estimator_spec.train_op, estimator_spec.loss], feed_dict=feed_dict)
-                else:
-                    feed_dict = self._prepare_feed_dict(
-                        'observe', features, labels, env_spec.to_dict(), stats)
-                    # no operation since we don't have any data.
-                    # but we need to call the hooks to update counters
-                    sess.run([], feed_dict=feed_dict)
+                update_loss = self._update_model(
+                    sess, features, labels, env_spec, stats, estimator_spec)
+                if update_loss is not None:
+                    loss = update_loss
+        return loss
+
+    def _update_model(self, sess, features, labels, env_spec, stats, estimator_spec):
+        """Runs the `train_op` on a sample from the memory if it has enough data.
+
+        Returns:
+            The loss, or `None` if the memory could not be sampled.
+        """
+        if not self.memory.can_sample():
+            feed_dict = self._prepare_feed_dict(
+                'observe', features, labels, env_spec.to_dict(), stats)
+            # no operation since we don't have any data.
+            # but we need to call the hooks to update counters
+            sess.run([], feed_dict=feed_dict)
+            return None
+
+        sample = self.memory.sample()
+        feed_dict = self._prepare_feed_dict(
+            'observe', features, labels, sample, stats, from_memory=True)
+        if isinstance(self.memory, PrioritizedMemory):
+            _, loss, td_errors = sess.run(
+                [estimator_spec.train_op, estimator_spec.loss,
+                 estimator_spec.predictions['td_errors']], feed_dict=feed_dict)
+            self.memory.update_priorities(sample['indices'], td_errors)
+        else:
+            _, loss = sess.run(
+                [estimator_spec.train_op, estimator_spec.loss], feed_dict=feed_dict)
+        return loss
+
+    def run_vector_episode(self, env, sess, features, labels, no_run_hooks, global_step,
+                           update_episode_op, update_timestep_op, first_update,
+                           update_frequency, estimator_spec):
+        """Runs the copies of a `VectorEnvironment` until at least one of them is done.
+
+        The agent acts for all the copies with a single session run,
+        the `global_timestep` is incremented by the number of copies at every step,
+        and the model is updated every time the timestep crosses a multiple
+        of `update_frequency`. The copies keep running across calls.
+
+        Args:
+            env: `VectorEnvironment` instance.
+            sess: `MonitoredTrainingSession` instance.
+            first_update: The first timestep we should invoke the train_op and update
+                the model loss.
+            update_frequency: The frequency of calculating the loss of the model.
+            estimator_spec: `EstimatorSpec` instance.
+
+        Returns:
+            statistics about episode.
+        """
+        if env.states is None:
+            env.reset()
+        if self._vector_stats is None:
+            self._vector_stats = [Stats() for _ in range(env.num_envs)]
+
+        loss = None
+        episode_done = False
+        act_fn = self._get_act_fn(
+            sess, features['state'], [update_timestep_op, estimator_spec.predictions['results']],
+            batch_size=env.num_envs)
+        while not episode_done:
+            states = env.states
+            timestep, actions = act_fn(states)
+
+            env_spec = env.step(actions, states)
+            env_specs = env.unstack(env_spec)
+            for i, sub_env_spec in enumerate(env_specs):
+                self.memory.step(**sub_env_spec.to_dict())
+                self._vector_stats[i].update(sub_env_spec.reward)
+
+            done_indices = np.flatnonzero(env_spec.done)
+            for i in done_indices:
+                self._record_episode(self._vector_stats[i])
+                sess.run([no_run_hooks, update_episode_op])
+            if done_indices.size:
+                episode_done = True
+                if isinstance(self.memory, MemmapMemory):
+                    self.memory.flush()
+
+            index = done_indices[0] if episode_done else 0
+            previous_timestep = timestep - env.num_envs
+            if ((timestep > first_update and
+                    timestep // update_frequency != previous_timestep // update_frequency) or
+                    episode_done):
+                update_loss = self._update_model(sess, features, labels, env_specs[index],
+                                                 self._vector_stats[index], estimator_spec)
+                if update_loss is not None:
+                    loss = update_loss
+
+            for i in done_indices:
+                self._vector_stats[i] = Stats()
         return loss
 
     def _train_model(self, env, first_update, update_frequency, hooks):
@@ -282,7 +452,7 @@ class Agent(BaseAgent):
             global_episode = get_or_create_global_episode(g)
             global_timestep = get_or_create_global_timestep(g)
             update_episode_op = tf.assign_add(global_episode, 1)
-            update_timestep_op = tf.assign_add(global_timestep, 1)
+            update_timestep_op = self._build_update_timestep_op(global_timestep, env)
             no_run_hooks = tf.no_op(name='no_run_hooks')
             with ops.device('/cpu:0'):
                 features, labels = self._prepare_input_fn(Modes.TRAIN, env)
@@ -299,6 +469,7 @@ class Agent(BaseAgent):
                         'max_reward': labels['max_reward'],
                         'min_reward': labels['min_reward'],
                         'total_reward': labels['total_reward'],
+                        'avg_episode_reward': labels['avg_episode_reward'],
                     },
                     every_n_iter=100)
             ])
@@ -322,6 +493,7 @@ class Agent(BaseAgent):
                         'max_reward': labels['max_reward'],
                         'min_reward': labels['min_reward'],
                         'total_reward': labels['total_reward'],
+                        'avg_episode_reward': labels['avg_episode_reward'],
                     },
                     every_n_episodes=1),  # TODO: save every episode?
                 plx_hooks.EpisodeCounterHook(output_dir=self.model_dir)
@@ -363,23 +535,288 @@ class Agent(BaseAgent):
                     save_checkpoint_secs=0,  # Saving checkpoint is handled by a hook.
                     save_summaries_steps=0,  # Saving summaries is handled by a hook.
                     config=self._session_config) as mon_sess:
-                loss = None
-                while not mon_sess.should_stop():
-                    loss = self.run_episode(
-                        env=env,
-                        sess=mon_sess,
-                        features=features,
-                        labels=labels,
-                        no_run_hooks=no_run_hooks,
-                        global_step=global_step,
-                        update_episode_op=update_episode_op,
-                        update_timestep_op=update_timestep_op,
-                        first_update=first_update,
-                        update_frequency=update_frequency,
-                        estimator_spec=estimator_spec)
+                loss = self._run_training(
+                    env=env,
+                    sess=mon_sess,
+                    features=features,
+                    labels=labels,
+                    no_run_hooks=no_run_hooks,
+                    global_step=global_step,
+                    update_episode_op=update_episode_op,
+                    update_timestep_op=update_timestep_op,
+                    first_update=first_update,
+                    update_frequency=update_frequency,
+                    estimator_spec=estimator_spec)
             summary_io.SummaryWriterCache.clear()
             return loss
 
+    def _build_update_timestep_op(self, global_timestep, env):
+        return tf.assign_add(
+            global_timestep, env.num_envs if isinstance(env, VectorEnvironment) else 1)
+
+    def _run_training(self, env, sess, features, labels, no_run_hooks, global_step,
+                      update_episode_op, update_timestep_op, first_update, update_frequency,
+                      estimator_spec):
+        """Runs episodes until the monitored session requests to stop."""
+        loss = None
+        while not sess.should_stop():
+            loss = self.run_episode(
+                env=env,
+                sess=sess,
+                features=features,
+                labels=labels,
+                no_run_hooks=no_run_hooks,
+                global_step=global_step,
+                update_episode_op=update_episode_op,
+                update_timestep_op=update_timestep_op,
+                first_update=first_update,
+                update_frequency=update_frequency,
+                estimator_spec=estimator_spec)
+        return loss
+
+
+class AsyncAgent(Agent):
+    """AsyncAgent class is a reinforcement learning Q model trainer with asynchronous
+    actors and a learner.
+
+    `num_actors` actor processes act each in its own copy of the environment, with their own
+    session running the model graph, and push the transitions to the learner through a queue.
+    A feeder thread of the learner stores the transitions in the memory,
+    while the learner runs the `train_op` continuously on samples from the memory.
+
+    Every `sync_frequency` training steps, the learner sends the values of its trainable
+    variables, and of the `global_timestep` driving the exploration, to the actors.
+
+    Constructs an `AsyncAgent` instance.
+
+    Args:
+        model_fn: Model function, see `Agent`.
+        memory: An instance of a subclass of `Memory`.
+        num_actors: `int`. The number of actor processes.
+        sync_frequency: `int`. The number of training steps between two weights syncs.
+        transitions_per_put: `int`. The maximum number of transitions an actor
+            accumulates before pushing them to the learner.
+        queue_size: `int`. The maximum number of transitions batches waiting in the queue.
+        model_dir: Directory to save model parameters, graph and etc. This can
+            also be used to load checkpoints from the directory into a estimator to
+            continue training a previously saved model.
+        config: Configuration object.
+        params: `dict` of hyper parameters that will be passed into `model_fn`.
+                  Keys are names of parameters, values are basic python types.
+    Raises:
+        ValueError: parameters of `model_fn` don't match `params`.
+    """
+    def __init__(self, model_fn, memory, num_actors=4, sync_frequency=100,
+                 transitions_per_put=32, queue_size=1000, model_dir=None, config=None,
+                 params=None):
+        super(AsyncAgent, self).__init__(
+            model_fn=model_fn, memory=memory, model_dir=model_dir, config=config, params=params)
+        self._num_actors = num_actors
+        self._sync_frequency = sync_frequency
+        self._transitions_per_put = transitions_per_put
+        self._queue_size = queue_size
+        self._timestep_delta = None
+        self._transitions_queue = None
+        self._weights_queues = None
+        self._stop_actors = None
+
+    def _train_model(self, env, first_update, update_frequency, hooks):
+        if isinstance(env, VectorEnvironment):
+            raise TypeError("`AsyncAgent` does not support `VectorEnvironment`.")
+
+        # The actors are forked before the learner creates its graph and session.
+        self._transitions_queue = multiprocessing.Queue(maxsize=self._queue_size)
+        self._weights_queues = [multiprocessing.Queue() for _ in range(self._num_actors)]
+        self._stop_actors = multiprocessing.Event()
+        actors = []
+        for actor_id in range(self._num_actors):
+            actor = multiprocessing.Process(target=self._run_actor, args=(actor_id, env))
+            actor.daemon = True
+            actor.start()
+            actors.append(actor)
+
+        try:
+            return super(AsyncAgent, self)._train_model(
+                env=env, first_update=first_update, update_frequency=update_frequency,
+                hooks=hooks)
+        finally:
+            self._stop_actors.set()
+            for actor in actors:
+                actor.join(timeout=10)
+                if actor.is_alive():
+                    actor.terminate()
+
+    def _build_update_timestep_op(self, global_timestep, env):
+        # The timestep is incremented by the number of transitions received from the actors.
+        self._timestep_delta = tf.placeholder(dtype=tf.int64, shape=(), name='timestep_delta')
+        return tf.assign_add(global_timestep, self._timestep_delta)
+
+    def _run_actor(self, actor_id, env):
+        """Acts in the environment and pushes the transitions to the learner."""
+        np.random.seed()
+        graph = ops.Graph()
+        with graph.as_default() as g:
+            if self._config.tf_random_seed is not None:
+                random_seed.set_random_seed(self._config.tf_random_seed + actor_id)
+            training.get_or_create_global_step(g)
+            get_or_create_global_episode(g)
+            global_timestep = get_or_create_global_timestep(g)
+            update_timestep_op = tf.assign_add(global_timestep, 1)
+            features, labels = self._prepare_input_fn(Modes.TRAIN, env)
+            estimator_spec = self._call_model_fn(features, labels, Modes.TRAIN)
+
+            variables = tf.trainable_variables() + [global_timestep]
+            placeholders = {v.op.name: tf.placeholder(dtype=v.dtype.base_dtype,
+                                                      shape=v.get_shape())
+                            for v in variables}
+            assign_op = tf.group(*[v.assign(placeholders[v.op.name]) for v in variables])
+            init_op = tf.global_variables_initializer()
+
+        weights_queue = self._weights_queues[actor_id]
+        with tf.Session(graph=graph, config=self._session_config) as sess:
+            def assign_weights(weights):
+                sess.run(assign_op, feed_dict={placeholders[name]: value
+                                               for name, value in weights.items()})
+
+            sess.run(init_op)
+            # Wait for the first weights of the learner.
+            while not self._stop_actors.is_set():
+                try:
+                    assign_weights(weights_queue.get(timeout=1))
+                    break
+                except queue.Empty:
+                    continue
+
+            env_spec = env.reset()
+            transitions = []
+            rewards = []
+            act_fn = self._get_act_fn(
+                sess, features['state'], [update_timestep_op, estimator_spec.predictions['results']])
+            while not self._stop_actors.is_set():
+                try:
+                    assign_weights(weights_queue.get_nowait())
+                except queue.Empty:
+                    pass
+
+                _, action = act_fn(env_spec.next_state)
+                env_spec = env.step(action, env_spec.next_state)
+                transitions.append(env_spec.to_dict())
+                rewards.append(env_spec.reward)
+
+                if env_spec.done or len(transitions) >= self._transitions_per_put:
+                    # The rewards are only sent with the last transitions of an episode.
+                    self._put_transitions(transitions, rewards if env_spec.done else None)
+                    transitions = []
+                    if env_spec.done:
+                        rewards = []
+                        env_spec = env.reset()
+
+        # Do not wait for the queue to be flushed, the learner might have stopped reading it.
+        self._transitions_queue.cancel_join_thread()
+
+    def _put_transitions(self, transitions, rewards):
+        while not self._stop_actors.is_set():
+            try:
+                self._transitions_queue.put((transitions, rewards), timeout=1)
+                return
+            except queue.Full:
+                continue
+
+    def _sync_actors(self, sess, no_run_hooks, variables):
+        """Sends the current values of `variables` to the actors, replacing stale values."""
+        _, values = sess.run([no_run_hooks, variables])
+        weights = {v.op.name: value for v, value in zip(variables, values)}
+        for weights_queue in self._weights_queues:
+            try:
+                while True:
+                    weights_queue.get_nowait()
+            except queue.Empty:
+                pass
+            weights_queue.put(weights)
+
+    def _feed_memory(self, lock, stop_event, received):
+        """Stores the transitions pushed by the actors in the memory."""
+        while not stop_event.is_set():
+            try:
+                transitions, rewards = self._transitions_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+            with lock:
+                for transition in transitions:
+                    self.memory.step(**transition)
+                received['timesteps'] += len(transitions)
+                if rewards is not None:
+                    received['episodes'].append(rewards)
+
+    def _run_training(self, env, sess, features, labels, no_run_hooks, global_step,
+                      update_episode_op, update_timestep_op, first_update, update_frequency,
+                      estimator_spec):
+        """Runs the learner until the monitored session requests to stop.
+
+        The `train_op` runs as soon as the `global_timestep` is larger than `first_update`
+        and the memory can be sampled, `update_frequency` is not used since the learner
+        does not wait for the actors.
+        """
+        variables = tf.trainable_variables() + [get_global_timestep()]
+        lock = threading.Lock()
+        stop_event = threading.Event()
+        received = {'timesteps': 0, 'episodes': []}
+        feeder = threading.Thread(target=self._feed_memory, args=(lock, stop_event, received))
+        feeder.daemon = True
+        feeder.start()
+
+        self._sync_actors(sess, no_run_hooks, variables)
+        # Rewards of the last episode finished by an actor.
+        stats = Stats()
+        stats.update(0.)
+        loss = None
+        train_steps = 0
+        try:
+            while not sess.should_stop():
+                with lock:
+                    timesteps, received['timesteps'] = received['timesteps'], 0
+                    episodes, received['episodes'] = received['episodes'], []
+                _, timestep = sess.run([no_run_hooks, update_timestep_op],
+                                       feed_dict={self._timestep_delta: timesteps})
+
+                for rewards in episodes:
+                    stats = Stats()
+                    stats.extend(rewards)
+                    self._record_episode(stats)
+                    sess.run([no_run_hooks, update_episode_op])
+                if episodes and isinstance(self.memory, MemmapMemory):
+                    with lock:
+                        self.memory.flush()
+
+                with lock:
+                    sample = None
+                    if timestep > first_update and self.memory.can_sample():
+                        sample = self.memory.sample()
+                if sample is None:
+                    time.sleep(0.01)
+                    continue
+
+                feed_dict = self._prepare_feed_dict(
+                    'observe', features, labels, sample, stats, from_memory=True)
+                if isinstance(self.memory, PrioritizedMemory):
+                    _, loss, td_errors = sess.run(
+                        [estimator_spec.train_op, estimator_spec.loss,
+                         estimator_spec.predictions['td_errors']], feed_dict=feed_dict)
+                    with lock:
+                        self.memory.update_priorities(sample['indices'], td_errors)
+                else:
+                    _, loss = sess.run(
+                        [estimator_spec.train_op, estimator_spec.loss], feed_dict=feed_dict)
+
+                train_steps += 1
+                if train_steps % self._sync_frequency == 0:
+                    self._sync_actors(sess, no_run_hooks, variables)
+        finally:
+            stop_event.set()
+            feeder.join()
+        return loss
+
 
 class PGAgent(BaseAgent):
     """PGAgent class is the basic reinforcement learning policy gradient model trainer/evaluator.
@@ -520,6 +957,8 @@ class PGAgent(BaseAgent):
                         dtype=tf.float32, shape=(), name='avg_reward'),
                     'total_reward': tf.placeholder(
                         dtype=tf.float32, shape=(), name='total_reward'),
+                    'avg_episode_reward': tf.placeholder_with_default(
+                        np.float32(0.), shape=(), name='avg_episode_reward'),
                 }
             )
         if Modes.is_infer(mode):
@@ -539,7 +978,8 @@ class PGAgent(BaseAgent):
                 labels['max_reward']: stats.max(),
                 labels['min_reward']: stats.min(),
                 labels['avg_reward']: stats.avg(),
-                labels['total_reward']: stats.total()
+                labels['total_reward']: stats.total(),
+                labels['avg_episode_reward']: self._avg_episode_reward(),
             }
         return feed_dict
 
@@ -561,32 +1001,101 @@ class PGAgent(BaseAgent):
         Returns:
             statistics about episode.
         """
+        if isinstance(env, VectorEnvironment):
+            return self.run_vector_episode(
+                env=env, sess=sess, features=features, labels=labels,
+                no_run_hooks=no_run_hooks, global_step=global_step,
+                update_episode_op=update_episode_op, update_timestep_op=update_timestep_op,
+                estimator_spec=estimator_spec)
+
         env_spec = env.reset()
         stats = Stats()
         loss = None
+        act_fn = self._get_act_fn(
+            sess, features['state'], [update_timestep_op, estimator_spec.predictions['results']])
         while not env_spec.done:
-            _, step, timestep, action = sess.run(
-                [no_run_hooks, global_step, update_timestep_op,
-                 estimator_spec.predictions['results']],
-                feed_dict=self._prepare_feed_dict('act', features, labels, env_spec.to_dict()))
+            timestep, action = act_fn(env_spec.next_state)
 
             env_spec = env.step(action, env_spec.next_state)
 
             self.memory.step(**env_spec.to_dict())
-            stats.rewards.append(env_spec.reward)
+            stats.update(env_spec.reward)
 
-            if self.memory.can_sample() and env_spec.done:
-                logging.info('Updating model.')
-                sess.run([no_run_hooks, update_episode_op])
-                feed_dict = self._prepare_feed_dict(
-                    'observe', features, labels, self.memory.sample(), stats, from_memory=True)
-                _, _, loss = sess.run([no_run_hooks, estimator_spec.train_op, estimator_spec.loss],
-                                      feed_dict=feed_dict)
+            if env_spec.done:
+                loss = self._end_episode(sess, features, labels, no_run_hooks,
+                                         update_episode_op, stats, estimator_spec)
+        return loss
 
-            elif env_spec.done:
-                last_in_memory = self.memory.get_by_index(-1)
-                sess.run([update_episode_op], feed_dict=self._prepare_feed_dict(
-                    'observe', features, labels, last_in_memory, stats))
+    def _end_episode(self, sess, features, labels, no_run_hooks, update_episode_op, stats,
+                     estimator_spec):
+        """Increments the episode, and updates the model if the memory has enough data.
+
+        Returns:
+            The loss, or `None` if the memory could not be sampled.
+        """
+        self._record_episode(stats)
+        if self.memory.can_sample():
+            logging.info('Updating model.')
+            sess.run([no_run_hooks, update_episode_op])
+            feed_dict = self._prepare_feed_dict(
+                'observe', features, labels, self.memory.sample(), stats, from_memory=True)
+            _, _, loss = sess.run([no_run_hooks, estimator_spec.train_op, estimator_spec.loss],
+                                  feed_dict=feed_dict)
+            return loss
+
+        last_in_memory = self.memory.get_by_index(-1)
+        sess.run([update_episode_op], feed_dict=self._prepare_feed_dict(
+            'observe', features, labels, last_in_memory, stats))
+        return None
+
+    def run_vector_episode(self, env, sess, features, labels, no_run_hooks, global_step,
+                           update_episode_op, update_timestep_op, estimator_spec):
+        """Runs the copies of a `VectorEnvironment` until at least one of them is done.
+
+        The agent acts for all the copies with a single session run. The transitions
+        of every copy are kept apart until its episode is done, so that every episode
+        is stored contiguously in the memory for the discounted rewards.
+        The copies keep running across calls.
+
+        Args:
+            env: `VectorEnvironment` instance.
+            sess: `MonitoredTrainingSession` instance.
+            estimator_spec: `EstimatorSpec` instance.
+
+        Returns:
+            statistics about episode.
+        """
+        if env.states is None:
+            env.reset()
+        if self._vector_stats is None:
+            self._vector_stats = [Stats() for _ in range(env.num_envs)]
+            self._vector_episodes = [[] for _ in range(env.num_envs)]
+
+        loss = None
+        episode_done = False
+        act_fn = self._get_act_fn(
+            sess, features['state'], [update_timestep_op, estimator_spec.predictions['results']],
+            batch_size=env.num_envs)
+        while not episode_done:
+            states = env.states
+            _, actions = act_fn(states)
+
+            env_spec = env.step(actions, states)
+            for i, sub_env_spec in enumerate(env.unstack(env_spec)):
+                self._vector_episodes[i].append(sub_env_spec)
+                self._vector_stats[i].update(sub_env_spec.reward)
+
+            for i in np.flatnonzero(env_spec.done):
+                episode_done = True
+                for sub_env_spec in self._vector_episodes[i]:
+                    self.memory.step(**sub_env_spec.to_dict())
+                update_loss = self._end_episode(sess, features, labels, no_run_hooks,
+                                                update_episode_op, self._vector_stats[i],
+                                                estimator_spec)
+                if update_loss is not None:
+                    loss = update_loss
+                self._vector_episodes[i] = []
+                self._vector_stats[i] = Stats()
         return loss
 
     def _train_model(self, env, hooks):
@@ -598,7 +1107,8 @@ class PGAgent(BaseAgent):
             global_episode = get_or_create_global_episode(g)
             global_timestep = get_or_create_global_timestep(g)
             update_episode_op = tf.assign_add(global_episode, 1)
-            update_timestep_op = tf.assign_add(global_timestep, 1)
+            update_timestep_op = tf.assign_add(
+                global_timestep, env.num_envs if isinstance(env, VectorEnvironment) else 1)
             no_run_hooks = tf.no_op(name='no_run_hooks')
             with ops.device('/cpu:0'):
                 features, labels = self._prepare_input_fn(Modes.TRAIN, env)
@@ -615,6 +1125,7 @@ class PGAgent(BaseAgent):
                         'max_reward': labels['max_reward'],
                         'min_reward': labels['min_reward'],
                         'total_reward': labels['total_reward'],
+                        'avg_episode_reward': labels['avg_episode_reward'],
                     },
                     every_n_iter=100)
             ])
@@ -638,6 +1149,7 @@ class PGAgent(BaseAgent):
                         'max_reward': labels['max_reward'],
                         'min_reward': labels['min_reward'],
                         'total_reward': labels['total_reward'],
+                        'avg_episode_reward': labels['avg_episode_reward'],
                     },
                     every_n_episodes=100),  # TODO: save every episode?
                 plx_hooks.EpisodeCounterHook(output_dir=self.model_dir)
@@ -735,6 +1247,11 @@ class TRPOAgent(PGAgent):
                 * `(features, labels, mode, params, config, model_dir)`
 
         memory: An instance of a subclass of `BatchMemory`.
+        optimizer_params: `dict`. The discount, the trust region and the conjugate gradient
+            and line search parameters. If `in_graph_update` is `True` (default),
+            the conjugate gradient iterations run in graph with a single session run.
+            The sampled batch is fed once per update and cached in graph, the line search
+            only assigns the candidate parameters and evaluates the loss.
         model_dir: Directory to save model parameters, graph and etc. This can
             also be used to load checkpoints from the directory into a estimator to
             continue training a previously saved model.
@@ -744,6 +1261,9 @@ class TRPOAgent(PGAgent):
     Raises:
         ValueError: parameters of `model_fn` don't match `params`.
     """
+    # The collection of the op caching the fed batch in graph.
+    BATCH_CACHE = 'batch_cache'
+
     def __init__(self, model_fn, memory, optimizer_params=None, model_dir=None, config=None,
                  params=None):
 
@@ -754,6 +1274,7 @@ class TRPOAgent(PGAgent):
             'cg_iterations': 20,
             'line_search_iterations': 20,
             'override_line_search': False,
+            'in_graph_update': True,
         }
         super(TRPOAgent, self).__init__(
             model_fn=model_fn, memory=memory, optimizer_params=optimizer_params,
@@ -774,39 +1295,62 @@ class TRPOAgent(PGAgent):
             raise TypeError("`env` must be an instance of `Environment`, "
                             "got `{}`".format(type(env)))
 
-        features = {'state': tf.placeholder(
-            dtype=tf.float32, shape=[None, env.num_states], name='state')}
+        if not (Modes.is_train(mode) or Modes.is_eval(mode)):
+            return {'state': tf.placeholder(
+                dtype=tf.float32, shape=[None, env.num_states], name='state')}, None
 
-        if Modes.is_train(mode) or Modes.is_eval(mode):
-            return (
-                features,
-                {
-                    'action': tf.placeholder(
-                        dtype=tf.float32 if env.is_continuous else tf.int64,
-                        shape=(None, env.num_actions) if env.is_continuous else (None,),
-                        name='action'),
-                    'reward': tf.placeholder(dtype=tf.float32, shape=(None,), name='reward'),
-                    'discount_reward': tf.placeholder(dtype=tf.float32, shape=(None,), name='discount_reward'),
-                    'done': tf.placeholder(dtype=tf.bool, shape=(None,), name='done'),
-                    'dist_values': tf.placeholder(
-                        dtype=tf.float32,
-                        shape=(None, env.num_actions * 2) if env.is_continuous else (None, env.num_actions),
-                        name='dist_values'),
-                    'tangents': tf.placeholder(dtype=tf.float32, shape=(None,), name='tangents'),
-                    'theta': tf.placeholder(dtype=tf.float32, shape=(None,), name='theta'),
+        # The observed batch is cached in graph when it's fed with the `batch_cache` op,
+        # the line search then evaluates the loss without feeding the batch again.
+        batch_cache_ops = []
 
-                    'max_reward': tf.placeholder(
-                        dtype=tf.float32, shape=(), name='max_reward'),
-                    'min_reward': tf.placeholder(
-                        dtype=tf.float32, shape=(), name='min_reward'),
-                    'avg_reward': tf.placeholder(
-                        dtype=tf.float32, shape=(), name='avg_reward'),
-                    'total_reward': tf.placeholder(
-                        dtype=tf.float32, shape=(), name='total_reward'),
-                }
-            )
-        if Modes.is_infer(mode):
-            return features, None
+        def batch_placeholder(dtype, shape, name):
+            initial_value = tf.zeros([0 if dim is None else dim for dim in shape], dtype=dtype)
+            cache = tf.Variable(initial_value, trainable=False, validate_shape=False,
+                                collections=[tf.GraphKeys.LOCAL_VARIABLES],
+                                name='{}_cache'.format(name))
+            placeholder = tf.placeholder_with_default(cache.value(), shape=shape, name=name)
+            batch_cache_ops.append(tf.assign(cache, placeholder, validate_shape=False))
+            return placeholder
+
+        features = {'state': batch_placeholder(
+            dtype=tf.float32, shape=[None, env.num_states], name='state')}
+        labels = {
+            'action': batch_placeholder(
+                dtype=tf.float32 if env.is_continuous else tf.int64,
+                shape=(None, env.num_actions) if env.is_continuous else (None,),
+                name='action'),
+            'reward': batch_placeholder(dtype=tf.float32, shape=(None,), name='reward'),
+            'discount_reward': batch_placeholder(dtype=tf.float32, shape=(None,), name='discount_reward'),
+            'done': batch_placeholder(dtype=tf.bool, shape=(None,), name='done'),
+            'dist_values': batch_placeholder(
+                dtype=tf.float32,
+                shape=(None, env.num_actions * 2) if env.is_continuous else (None, env.num_actions),
+                name='dist_values'),
+            'tangents': tf.placeholder(dtype=tf.float32, shape=(None,), name='tangents'),
+            'theta': tf.placeholder(dtype=tf.float32, shape=(None,), name='theta'),
+            'cg_damping': tf.placeholder_with_default(
+                np.float32(self.optimizer_params['cg_damping']), shape=(),
+                name='cg_damping'),
+            'cg_iterations': tf.placeholder_with_default(
+                np.int32(self.optimizer_params['cg_iterations']), shape=(),
+                name='cg_iterations'),
+            'max_kl_divergence': tf.placeholder_with_default(
+                np.float32(self.optimizer_params['max_kl_divergence']), shape=(),
+                name='max_kl_divergence'),
+
+            'max_reward': batch_placeholder(
+                dtype=tf.float32, shape=(), name='max_reward'),
+            'min_reward': batch_placeholder(
+                dtype=tf.float32, shape=(), name='min_reward'),
+            'avg_reward': batch_placeholder(
+                dtype=tf.float32, shape=(), name='avg_reward'),
+            'total_reward': batch_placeholder(
+                dtype=tf.float32, shape=(), name='total_reward'),
+            'avg_episode_reward': batch_placeholder(
+                dtype=tf.float32, shape=(), name='avg_episode_reward'),
+        }
+        tf.add_to_collection(self.BATCH_CACHE, tf.group(*batch_cache_ops, name='batch_cache'))
+        return features, labels
 
     def _prepare_feed_dict(self, mode, features, labels, data, stats=None, from_memory=False):
         """Creates a feed_dict depending on the agents behavior: `act` or `observe`"""
@@ -823,7 +1367,8 @@ class TRPOAgent(PGAgent):
                 labels['max_reward']: stats.max(),
                 labels['min_reward']: stats.min(),
                 labels['avg_reward']: stats.avg(),
-                labels['total_reward']: stats.total()
+                labels['total_reward']: stats.total(),
+                labels['avg_episode_reward']: self._avg_episode_reward(),
             }
         return feed_dict
 
@@ -845,6 +1390,9 @@ class TRPOAgent(PGAgent):
         Returns:
             statistics about episode.
         """
+        if isinstance(env, VectorEnvironment):
+            raise TypeError("`TRPOAgent` does not support `VectorEnvironment`.")
+
         env_spec = env.reset()
         last_in_memory = self.memory.get_by_index(-1)
         if last_in_memory is not None:
@@ -853,50 +1401,67 @@ class TRPOAgent(PGAgent):
             dist_values = [0] * 2 * env.num_actions if env.is_continuous else [0] * env.num_actions
         stats = Stats()
         loss = None
+        batch_cache = sess.graph.get_collection(self.BATCH_CACHE)[0]
+        act_fn = self._get_act_fn(
+            sess, features['state'],
+            [update_timestep_op, estimator_spec.predictions['results'],
+             estimator_spec.predictions['dist_values']])
         while not env_spec.done:
-            data = env_spec.to_dict()
-            data['dist_values'] = dist_values
-            _, step, timestep, action, next_dist_values = sess.run(
-                [no_run_hooks, global_step, update_timestep_op,
-                 estimator_spec.predictions['results'], estimator_spec.predictions['dist_values']],
-                feed_dict=self._prepare_feed_dict('act', features, labels, data))
+            timestep, action, next_dist_values = act_fn(env_spec.next_state)
 
             env_spec = env.step(action, env_spec.next_state)
 
             self.memory.step(dist_values=dist_values, **env_spec.to_dict())
             dist_values = next_dist_values[0]
-            stats.rewards.append(env_spec.reward)
+            stats.update(env_spec.reward)
 
             if self.memory.can_sample():
                 logging.info('Updating model.')
                 feed_dict = self._prepare_feed_dict(
                     'observe', features, labels, self.memory.sample(), stats, from_memory=True)
-                _, policy_gradient = sess.run([no_run_hooks, estimator_spec.predictions['policy_gradient']], feed_dict=feed_dict)
-
-                if np.allclose(policy_gradient, np.zeros_like(policy_gradient)):
-                    logging.debug('Gradient zero, skipping update')
-                    return
-
-                # TODO: move logic to from tensorflow.contrib.solvers.python.ops.linear_equations import conjugate_gradient
-                def fisher_vector_product(p):
-                    feed_dict[labels['tangents']] = p
-                    _, fvp = sess.run([no_run_hooks, estimator_spec.predictions['fisher_vector_product']], feed_dict)
-                    return fvp + self.optimizer_params['cg_damping'] * p
-
-                direction = conjugate_gradient(fisher_vector_product, -policy_gradient, self.optimizer_params['cg_iterations'])
-                shs = 0.5 * direction.dot(fisher_vector_product(direction))  # theta
-                lagrange_multiplier = np.sqrt(shs / self.optimizer_params['max_kl_divergence'])
-                update_step = direction / (lagrange_multiplier + EPSILON)
-                negative_gradient_direction = -policy_gradient.dot(direction)
-                _, previous_theta = sess.run([no_run_hooks, estimator_spec.extra_ops['get_theta']])
+                if (self.optimizer_params.get('in_graph_update', True) and
+                        'update_step' in estimator_spec.extra_ops):
+                    # A single session run for the policy gradient and the conjugate gradient,
+                    # the batch is cached for the line search.
+                    _, _, policy_gradient, update_step, expected_improve_rate, previous_theta = (
+                        sess.run([no_run_hooks,
+                                  batch_cache,
+                                  estimator_spec.predictions['policy_gradient'],
+                                  estimator_spec.extra_ops['update_step'],
+                                  estimator_spec.extra_ops['expected_improve_rate'],
+                                  estimator_spec.extra_ops['get_theta']], feed_dict=feed_dict))
+
+                    if np.allclose(policy_gradient, np.zeros_like(policy_gradient)):
+                        logging.debug('Gradient zero, skipping update')
+                        return
+                else:
+                    _, _, policy_gradient = sess.run(
+                        [no_run_hooks, batch_cache, estimator_spec.predictions['policy_gradient']],
+                        feed_dict=feed_dict)
+
+                    if np.allclose(policy_gradient, np.zeros_like(policy_gradient)):
+                        logging.debug('Gradient zero, skipping update')
+                        return
+
+                    def fisher_vector_product(p):
+                        feed_dict[labels['tangents']] = p
+                        _, fvp = sess.run([no_run_hooks, estimator_spec.predictions['fisher_vector_product']], feed_dict)
+                        return fvp + self.optimizer_params['cg_damping'] * p
+
+                    direction = conjugate_gradient(fisher_vector_product, -policy_gradient, self.optimizer_params['cg_iterations'])
+                    shs = 0.5 * direction.dot(fisher_vector_product(direction))  # theta
+                    lagrange_multiplier = np.sqrt(shs / self.optimizer_params['max_kl_divergence'])
+                    update_step = direction / (lagrange_multiplier + EPSILON)
+                    expected_improve_rate = -policy_gradient.dot(direction) / (lagrange_multiplier + EPSILON)
+                    _, previous_theta = sess.run([no_run_hooks, estimator_spec.extra_ops['get_theta']])
 
                 def compute_loss(theta):
                     sess.run([no_run_hooks, estimator_spec.extra_ops['set_theta']], feed_dict={labels['theta']: theta})
-                    return sess.run([no_run_hooks, estimator_spec.loss], feed_dict=feed_dict)[1]
+                    # The loss is evaluated on the cached batch, it's not fed again.
+                    return sess.run([no_run_hooks, estimator_spec.loss])[1]
 
                 improved, theta = line_search(
-                    compute_loss, previous_theta, update_step,
-                    negative_gradient_direction / (lagrange_multiplier + EPSILON),
+                    compute_loss, previous_theta, update_step, expected_improve_rate,
                     self.optimizer_params['line_search_iterations'])
 
                 if improved:
@@ -910,9 +1475,10 @@ class TRPOAgent(PGAgent):
                 else:
                     logging.debug('No update.')
 
-                loss = sess.run([estimator_spec.loss], feed_dict=feed_dict)[0]
+                loss = sess.run([estimator_spec.loss])[0]
 
             if env_spec.done:
+                self._record_episode(stats)
                 last_in_memory = self.memory.get_by_index(-1)
                 sess.run([update_episode_op], feed_dict=self._prepare_feed_dict(
                     'observe', features, labels, last_in_memory, stats))
@@ -17,21 +17,32 @@ from tensorflow.python.client import session as tf_session
 from tensorflow.python.estimator.export.export import (build_all_signature_defs,
                                                        get_timestamped_export_dir)
 from tensorflow.python.estimator.model_fn import MetricKeys
-from tensorflow.python.framework import ops, random_seed
-from tensorflow.python.ops import control_flow_ops
+from tensorflow.python.framework import (
+    constant_op,
+    dtypes,
+    ops,
+    random_seed,
+    sparse_tensor,
+    tensor_shape,
+    tensor_util
+)
+from tensorflow.python.ops import array_ops, control_flow_ops, data_flow_ops, math_ops
 from tensorflow.python.platform import gfile
 from tensorflow.python.platform import tf_logging as logging
 from tensorflow.python.saved_model import builder as saved_model_builder
 from tensorflow.python.saved_model import tag_constants
+from tensorflow.python.summary import summary
 from tensorflow.python.training import (
+    basic_session_run_hooks,
     evaluation,
     monitored_session,
+    queue_runner,
     saver,
     summary_io,
     training
 )
 from tensorflow.python.training.session_run_hook import SessionRunHook
-from tensorflow.python.util import compat
+from tensorflow.python.util import compat, nest
 
 from polyaxon import Modes
 from polyaxon.estimators.estimator_spec import EstimatorSpec
@@ -570,18 +581,33 @@ class Estimator(object):
         with self._graph.as_default() as g, g.device(self._device_fn):
             random_seed.set_random_seed(self._config.tf_random_seed)
             global_step = training.get_or_create_global_step(g)
+            iterations_per_loop = self._config.iterations_per_loop
             with ops.device('/cpu:0'):
                 features, labels = input_fn()
-            estimator_spec = self._call_model_fn(features, labels, Modes.TRAIN)
-            ops.add_to_collection(ops.GraphKeys.LOSSES, estimator_spec.loss)
+                if iterations_per_loop > 1:
+                    dequeue_inputs_fn = self._stage_inputs(features, labels,
+                                                           capacity=2 * iterations_per_loop)
+            if iterations_per_loop > 1:
+                estimator_spec, loss, iterations, step = self._build_train_loop(
+                    dequeue_inputs_fn, global_step)
+                train_op = loss.op
+                stop_hooks = [h for h in hooks
+                              if isinstance(h, basic_session_run_hooks.StopAtStepHook)]
+                all_hooks.append(plx_hooks.StepsPerLoopHook(
+                    iterations, iterations_per_loop, step,
+                    stop_hook=stop_hooks[0] if stop_hooks else None))
+            else:
+                estimator_spec = self._call_model_fn(features, labels, Modes.TRAIN)
+                train_op, loss = estimator_spec.train_op, estimator_spec.loss
+            ops.add_to_collection(ops.GraphKeys.LOSSES, loss)
             all_hooks.extend([
-                plx_hooks.NanTensorHook(estimator_spec.loss),
+                plx_hooks.NanTensorHook(loss),
                 plx_hooks.StepLoggingTensorHook(
                     {
-                        'loss': estimator_spec.loss,
+                        'loss': loss,
                         'step': global_step
                     },
-                    every_n_iter=100)
+                    every_n_iter=max(100 // iterations_per_loop, 1))
             ])
             all_hooks.extend(hooks)
             all_hooks.extend(estimator_spec.training_hooks)
@@ -633,11 +659,124 @@ class Estimator(object):
                     save_checkpoint_secs=0,  # Saving checkpoint is handled by a hook.
                     save_summaries_steps=0,  # Saving summaries is handled by a hook.
                     config=self._session_config) as mon_sess:
-                loss = None
+                loss_value = None
                 while not mon_sess.should_stop():
-                    _, loss = mon_sess.run([estimator_spec.train_op, estimator_spec.loss])
+                    _, loss_value = mon_sess.run([train_op, loss])
             summary_io.SummaryWriterCache.clear()
-            return loss
+            return loss_value
+
+    @staticmethod
+    def _stage_inputs(features, labels, capacity):
+        """Stages the input batches in a queue filled by a queue runner, so that every step
+        of an in-graph training loop dequeues a new batch.
+
+        Returns:
+            A function dequeuing the `features` and `labels` of a step.
+        """
+        flat_inputs = nest.flatten((features, labels))
+        tensors = [tensor for tensor in flat_inputs if tensor is not None]
+        if any(isinstance(tensor, sparse_tensor.SparseTensor) for tensor in tensors):
+            raise ValueError('Sparse inputs are not supported with `iterations_per_loop` > 1.')
+
+        queue = data_flow_ops.FIFOQueue(capacity, [tensor.dtype for tensor in tensors],
+                                        name='loop_inputs_queue')
+        queue_runner.add_queue_runner(queue_runner.QueueRunner(queue, [queue.enqueue(tensors)]))
+
+        def dequeue_inputs_fn():
+            values = queue.dequeue()
+            values = list(values) if isinstance(values, (list, tuple)) else [values]
+            for value, tensor in zip(values, tensors):
+                value.set_shape(tensor.get_shape())
+            values = iter(values)
+            return nest.pack_sequence_as(
+                (features, labels),
+                [next(values) if tensor is not None else None for tensor in flat_inputs])
+
+        return dequeue_inputs_fn
+
+    def _build_train_loop(self, dequeue_inputs_fn, global_step):
+        """Builds a `tf.while_loop` running up to `iterations_per_loop` train steps in
+        a single session run.
+
+        The model is built in the body of the loop, and every step trains on a batch dequeued
+        with `dequeue_inputs_fn`. The hooks run once per loop, the summaries of the model
+        cannot be fetched outside of the loop: the values of its scalar summaries are returned
+        by the loop and summarized for the last step, the other summaries are dropped with a
+        warning. For the same reason, the `EstimatorSpec` cannot return `training_hooks`,
+        `training_chief_hooks`, or a `scaffold` with ops other than its `saver`.
+
+        Returns:
+            The `EstimatorSpec` of a step, the loss of the last step, the number of
+            steps of the loop to feed, and the global step after the loop.
+        """
+        estimator_specs = []
+        summaries = list(ops.get_collection(ops.GraphKeys.SUMMARIES))
+        iterations = array_ops.placeholder_with_default(
+            constant_op.constant(self._config.iterations_per_loop), shape=[],
+            name='iterations_per_loop')
+
+        scalar_tags = []
+        dropped_summaries = []
+
+        def get_tag(loop_summary, loop_scope):
+            tag = tensor_util.constant_value(loop_summary.op.inputs[0])
+            if tag is None:
+                return loop_summary.op.name
+            tag = compat.as_str(tag)
+            return tag[len(loop_scope):] if tag.startswith(loop_scope) else tag
+
+        def body(i, unused_loss, unused_scalar_values):
+            features, labels = dequeue_inputs_fn()
+            estimator_spec = self._call_model_fn(features, labels, Modes.TRAIN)
+            estimator_specs.append(estimator_spec)
+
+            loop_scope = ops.get_default_graph().get_name_scope() + '/'
+            scalar_values = []
+            for loop_summary in ops.get_collection(ops.GraphKeys.SUMMARIES)[len(summaries):]:
+                if loop_summary.op.type == 'ScalarSummary':
+                    scalar_tags.append(get_tag(loop_summary, loop_scope))
+                    scalar_values.append(math_ops.to_float(loop_summary.op.inputs[1]))
+                else:
+                    dropped_summaries.append(get_tag(loop_summary, loop_scope))
+            scalar_values = (array_ops.stack(scalar_values) if scalar_values
+                             else constant_op.constant([], dtype=dtypes.float32))
+
+            with ops.control_dependencies([estimator_spec.train_op]):
+                return (i + 1,
+                        array_ops.identity(math_ops.to_float(estimator_spec.loss)),
+                        array_ops.identity(scalar_values))
+
+        _, loss, scalar_values = control_flow_ops.while_loop(
+            lambda i, unused_loss, unused_scalar_values: i < iterations, body,
+            [constant_op.constant(0), constant_op.constant(0.),
+             constant_op.constant([], dtype=dtypes.float32)],
+            shape_invariants=[tensor_shape.TensorShape([]), tensor_shape.TensorShape([]),
+                              tensor_shape.TensorShape([None])],
+            parallel_iterations=1, back_prop=False, name='train_loop')
+
+        estimator_spec = estimator_specs[0]
+        if estimator_spec.training_hooks or estimator_spec.training_chief_hooks:
+            raise ValueError('The `EstimatorSpec` hooks are not supported with '
+                             '`iterations_per_loop` > 1, their tensors are built in the '
+                             'train loop and cannot be fetched by the session run.')
+        scaffold_ops = ['init_op', 'ready_op', 'ready_for_local_init_op', 'local_init_op',
+                        'summary_op']
+        if estimator_spec.scaffold and any(getattr(estimator_spec.scaffold, name) is not None
+                                           for name in scaffold_ops):
+            raise ValueError('The `EstimatorSpec` scaffold can only provide a `saver` with '
+                             '`iterations_per_loop` > 1, its ops are built in the train loop.')
+
+        if dropped_summaries:
+            logging.warning('Only the scalar summaries are supported with `iterations_per_loop` '
+                            '> 1, the summaries %s are dropped.', dropped_summaries)
+        ops.get_collection_ref(ops.GraphKeys.SUMMARIES)[:] = summaries
+        for index, tag in enumerate(scalar_tags):
+            summary.scalar(tag, scalar_values[index])
+        if 'loss' not in scalar_tags:
+            summary.scalar('loss', loss)
+        with ops.control_dependencies([loss]):
+            step = global_step.read_value()
+        return estimator_spec, loss, iterations, step
 
     def _evaluate_model(self, input_fn, hooks=None, checkpoint_path=None, name=''):
         # Check that model has been trained (if nothing has been set explicitly).
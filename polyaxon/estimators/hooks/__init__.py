@@ -17,6 +17,7 @@ from polyaxon.estimators.hooks.step_hooks import (
     StepCheckpointSaverHook,
     StepCounterHook,
     StepSummarySaverHook,
+    StepsPerLoopHook,
 )
 from polyaxon.estimators.hooks.episode_hooks import (
     EPISODE_HOOKS,
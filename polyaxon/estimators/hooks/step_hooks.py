@@ -3,7 +3,7 @@ from __future__ import absolute_import, division, print_function
 
 from collections import OrderedDict
 
-from tensorflow.python.training import basic_session_run_hooks
+from tensorflow.python.training import basic_session_run_hooks, session_run_hook, training_util
 
 from polyaxon.estimators.hooks.utils import can_run_hook
 
@@ -133,6 +133,51 @@ class StepSummarySaverHook(basic_session_run_hooks.SummarySaverHook):
             save_steps, save_secs, output_dir, summary_writer, scaffold, summary_op)
 
 
+class StepsPerLoopHook(session_run_hook.SessionRunHook):
+    """Feeds the number of train steps of an in-graph training loop before every run.
+
+    Every run executes `iterations_per_loop` steps, except the last one that executes
+    the steps left before the last step of the `StopAtStepHook`, if any. The global step
+    fetched by the stop hook may be read before the loop, the stop is requested by this
+    hook from the global step after the loop.
+
+    The hook is created by the estimator for its training loop, it's not registered
+    in the hooks that can be created from a configuration.
+
+    Args:
+        iterations: `Tensor`, the number of steps of the loop, fed by the hook.
+        iterations_per_loop: `int`, the maximum number of steps of a loop.
+        step: `Tensor`, the global step after the loop.
+        stop_hook: `StopAtStepHook`, the hook stopping the training, if any.
+    """
+
+    def __init__(self, iterations, iterations_per_loop, step, stop_hook=None):
+        self._iterations = iterations
+        self._iterations_per_loop = iterations_per_loop
+        self._step = step
+        self._stop_hook = stop_hook
+        self._current_step = None
+
+    def after_create_session(self, session, coord):  # pylint: disable=unused-argument
+        self._current_step = session.run(training_util.get_global_step())
+
+    def before_run(self, run_context):  # pylint: disable=unused-argument
+        iterations = self._iterations_per_loop
+        last_step = self._get_last_step()
+        if last_step is not None:
+            iterations = max(min(iterations, last_step - self._current_step), 1)
+        return session_run_hook.SessionRunArgs(self._step, feed_dict={self._iterations: iterations})
+
+    def after_run(self, run_context, run_values):
+        self._current_step = run_values.results
+        last_step = self._get_last_step()
+        if last_step is not None and self._current_step >= last_step:
+            run_context.request_stop()
+
+    def _get_last_step(self):
+        return getattr(self._stop_hook, '_last_step', None)
+
+
 STEP_HOOKS = OrderedDict([
     ('StepLoggingTensorHook', StepLoggingTensorHook),
     ('StopAtStepHook', StopAtStepHook),
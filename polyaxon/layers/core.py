@@ -232,6 +232,8 @@ class Reshape(BaseLayer):
         new_shape: A list of `int`. The desired shape.
         name: A name for this layer (optional).
     """
+    cacheable = True
+
     def __init__(self, mode, new_shape, name='Reshape'):
         super(Reshape, self).__init__(mode, name)
         self.new_shape = new_shape
@@ -257,6 +259,8 @@ class Flatten(BaseLayer):
         mode: `str`, Specifies if this training, evaluation or prediction. See `Modes`.
         name: A name for this layer (optional).
     """
+    cacheable = True
+
     def __init__(self, mode, name='Flatten'):
         super(Flatten, self).__init__(mode, name)
 
@@ -478,6 +482,8 @@ class OneHotEncoding(BaseLayer):
         off_value: `scalar`. A scalar defining the off-value.
         name: A name for this layer (optional). Default: 'OneHotEncoding'.
     """
+    cacheable = True
+
     def __init__(self, mode, n_classes, on_value=1.0, off_value=0.0, name='OneHotEncoding'):
         super(OneHotEncoding, self).__init__(mode, name)
         self.n_classes = n_classes
@@ -510,6 +516,8 @@ class Slice(BaseLayer):
         mode: `str`, Specifies if this training, evaluation or prediction. See `Modes`.
         name: `str`. A name for this layer (optional).
     """
+    cacheable = True
+
     def __init__(self, mode, begin, size, name='Slice'):
         super(Slice, self).__init__(mode, name)
         self.being = begin
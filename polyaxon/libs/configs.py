@@ -92,7 +92,8 @@ class RunConfig(run_config.RunConfig, Configurable):
                  keep_checkpoint_every_n_hours=10000,
                  evaluation_master='',
                  model_dir=None,
-                 cluster_config=None):
+                 cluster_config=None,
+                 iterations_per_loop=1):
         self.create_cluster_config(cluster_config)
         if save_checkpoints_steps is not None:
             save_checkpoints_secs = None
@@ -105,6 +106,10 @@ class RunConfig(run_config.RunConfig, Configurable):
         self._tf_random_seed = 1
         self._model_dir = None
         self._session_config = None
+        if iterations_per_loop < 1:
+            raise ValueError('`iterations_per_loop` must be positive, '
+                             'received `{}`'.format(iterations_per_loop))
+        self._iterations_per_loop = iterations_per_loop
         self._to_dict = OrderedDict([
             ('master', master),
             ('num_cores', num_cores),
@@ -118,7 +123,8 @@ class RunConfig(run_config.RunConfig, Configurable):
             ('keep_checkpoint_every_n_hours', keep_checkpoint_every_n_hours),
             ('evaluation_master', evaluation_master),
             ('model_dir', model_dir),
-            ('cluster_config', cluster_config)
+            ('cluster_config', cluster_config),
+            ('iterations_per_loop', iterations_per_loop)
         ])
 
     @property
@@ -133,6 +139,11 @@ class RunConfig(run_config.RunConfig, Configurable):
     def session_config(self):
         return self._session_config
 
+    @property
+    def iterations_per_loop(self):
+        """The number of train steps run in the graph by every session run."""
+        return self._iterations_per_loop
+
     def to_dict(self):
         return self._to_dict
 
@@ -171,6 +182,29 @@ class RunConfig(run_config.RunConfig, Configurable):
         # Set the cluster config in the environment variable `TF_CONFIG`.
         os.environ['TF_CONFIG'] = json.dumps(config)
 
+    @staticmethod
+    def get_worker_sharding():
+        """Returns the number of workers reading the training data and the index of this task.
+
+        Based on the cluster config in the environment variable `TF_CONFIG`, the master
+        is the worker 0, followed by the workers. Other tasks, or the absence of cluster,
+        return `(1, 0)`.
+
+        Returns:
+            `tuple` (num_workers, worker_index).
+        """
+        tf_config = json.loads(os.environ.get('TF_CONFIG') or '{}')
+        cluster = tf_config.get('cluster', {})
+        task = tf_config.get('task', {})
+        num_masters = len(cluster.get('master', []))
+        num_workers = num_masters + len(cluster.get('worker', []))
+        task_index = task.get('index', 0)
+        if task.get('type') == 'master':
+            return num_workers, task_index
+        if task.get('type') == 'worker':
+            return num_workers, num_masters + task_index
+        return 1, 0
+
 
 class PipelineConfig(Configurable):
     """The PipelineConfig holds information needed to create a `Pipeline`.
@@ -179,15 +213,41 @@ class PipelineConfig(Configurable):
         module: `str`, the pipeline module to use.
         name: `str`, name to give for the pipeline.
         dynamic_pad: `bool`, If True the pipleine uses dynamic padding.
-        bucket_boundaries:
+        bucket_boundaries: `list` of `int`, batch the sequences by buckets of lengths,
+            a sequence of length `l` belongs to the first bucket whose boundary is greater
+            than `l`. If `auto`, the boundaries minimizing the padding are estimated from
+            the histogram of the source lengths of the pipeline.
+        num_buckets: `int`, the maximum number of buckets of `auto` bucket boundaries.
         batch_size: `int`, the batch size.
         num_epochs: number of epochs to iterate over in this pipeline.
         min_after_dequeue: `int`, number of element to have in the queue.
         num_threads: `int`, number of threads to use in the queue.
         shuffle: If true, shuffle the data.
         num_epochs: Number of times to iterate through the dataset. If None, iterate forever.
+        engine: `str`, the input engine, `queue` for queue runners,
+            or `dataset` for `tf.data` with parallel reads, parallel processing and prefetching.
+        num_parallel_calls: `int`, number of elements processed in parallel by the `dataset`
+            engine. If None, `num_threads` is used.
+        prefetch_buffer_size: `int`, number of batches prefetched by the `dataset` engine.
+        shard_by: `str`, in distributed training, split the data between the workers
+            by `file` or by `record`, each example is then read by a single worker per epoch.
+            If None, every worker reads all the data.
+        cache: `bool`, with the `dataset` engine, cache the decoded items after the
+            cacheable processing, e.g. resizing, during the first epoch, only the remaining
+            processing, e.g. random augmentations, is applied on the next epochs.
+        cache_memory_budget: `int`, the maximum size in MB of a cache kept in memory,
+            a larger cache is written to `cache_dir`. If None, the cache is kept in memory.
+        cache_dir: `str`, the directory of the cache files, defaults to the temporary directory.
+            If set, the cache files are named after the data sources, the pipeline
+            definition and the mode, and reused by the next runs, otherwise every run writes
+            a new cache.
         params: `dict`, extra information to pass to the pipeline.
     """
+    QUEUE = 'queue'
+    DATASET = 'dataset'
+    SHARD_BY_FILE = 'file'
+    SHARD_BY_RECORD = 'record'
+    AUTO_BUCKET_BOUNDARIES = 'auto'
 
     def __init__(self,
                  module=None,
@@ -195,24 +255,53 @@ class PipelineConfig(Configurable):
                  subgraph_configs_by_features=None,
                  dynamic_pad=True,
                  bucket_boundaries=False,
+                 num_buckets=4,
                  batch_size=64,
                  num_epochs=1,
                  min_after_dequeue=5000,
                  num_threads=3,
                  shuffle=False,
                  allow_smaller_final_batch=True,
+                 engine='queue',
+                 num_parallel_calls=None,
+                 prefetch_buffer_size=1,
+                 shard_by=None,
+                 cache=False,
+                 cache_memory_budget=None,
+                 cache_dir=None,
                  params=None):
+        if engine not in (self.QUEUE, self.DATASET):
+            raise ValueError('Pipeline engine `{}` is not supported, '
+                             'possible values: `queue`, `dataset`.'.format(engine))
+        if shard_by not in (None, self.SHARD_BY_FILE, self.SHARD_BY_RECORD):
+            raise ValueError('Pipeline sharding `{}` is not supported, '
+                             'possible values: `file`, `record`.'.format(shard_by))
+        if (isinstance(bucket_boundaries, six.string_types) and
+                bucket_boundaries != self.AUTO_BUCKET_BOUNDARIES):
+            raise ValueError('Bucket boundaries `{}` are not supported, '
+                             'possible values: a list of lengths or `auto`.'.format(
+                                 bucket_boundaries))
+        if cache and engine != self.DATASET:
+            raise ValueError('The pipeline cache requires the `dataset` engine.')
         self.name = name
         self.module = module
         self.subgraph_configs_by_features = subgraph_configs_by_features
         self.dynamic_pad = dynamic_pad
         self.bucket_boundaries = bucket_boundaries
+        self.num_buckets = num_buckets
         self.batch_size = batch_size
         self.num_epochs = num_epochs
         self.min_after_dequeue = min_after_dequeue
         self.num_threads = num_threads
         self.shuffle = shuffle
         self.allow_smaller_final_batch = allow_smaller_final_batch
+        self.engine = engine
+        self.num_parallel_calls = num_parallel_calls or num_threads
+        self.prefetch_buffer_size = prefetch_buffer_size
+        self.shard_by = shard_by
+        self.cache = cache
+        self.cache_memory_budget = cache_memory_budget
+        self.cache_dir = cache_dir
         self.params = params or {}
 
     @property
@@ -247,12 +336,20 @@ class PipelineConfig(Configurable):
                  for feature in self.subgraph_configs_by_features])),
             ('dynamic_pad', self.dynamic_pad),
             ('bucket_boundaries', self.bucket_boundaries),
+            ('num_buckets', self.num_buckets),
             ('batch_size', self.batch_size),
             ('num_epochs', self.num_epochs),
             ('min_after_dequeue', self.min_after_dequeue),
             ('num_threads', self.num_threads),
             ('shuffle', self.shuffle),
             ('allow_smaller_final_batch', self.allow_smaller_final_batch),
+            ('engine', self.engine),
+            ('num_parallel_calls', self.num_parallel_calls),
+            ('prefetch_buffer_size', self.prefetch_buffer_size),
+            ('shard_by', self.shard_by),
+            ('cache', self.cache),
+            ('cache_memory_budget', self.cache_memory_budget),
+            ('cache_dir', self.cache_dir),
             ('params', self.params),
         ])
 
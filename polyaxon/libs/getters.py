@@ -268,12 +268,20 @@ def get_agent(agent_config, model_config, run_config):
     memory = get_memory(agent_config.memory_config.module,
                         **agent_config.memory_config.params)
 
+    # Only the `AsyncAgent` accepts the actors parameters.
+    params = agent_config.params or {}
+    agent_params = {}
+    if agent_config.module == 'AsyncAgent':
+        agent_params = {key: params[key] for key in ('num_actors', 'sync_frequency')
+                        if key in params}
+
     estimator = AGENTS[agent_config.module](
         model_fn=model_fn,
         memory=memory,
         model_dir=agent_config.output_dir,
         config=run_config,
-        params=model_config.params)
+        params=model_config.params,
+        **agent_params)
     return estimator
 
 
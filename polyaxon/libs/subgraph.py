@@ -46,6 +46,19 @@ class SubGraph(GraphModule):
     def modules(self):
         return self._modules
 
+    def get_stage_modules(self, stage=None):
+        """Returns the modules of a stage, all the modules if `stage` is None."""
+        if stage is None:
+            return self._modules
+
+        index = next((i for i, module in enumerate(self._modules)
+                      if not getattr(module, 'cacheable', False)), len(self._modules))
+        if stage == self.ProcessingStage.CACHEABLE:
+            return self._modules[:index]
+        if stage == self.ProcessingStage.NON_CACHEABLE:
+            return self._modules[index:]
+        raise ValueError('Subgraph stage `{}` is not supported.'.format(stage))
+
     def _get_incoming(self, incoming):
         if isinstance(incoming, Mapping):
             columns = self._features if self._features else list(incoming.keys())
@@ -54,8 +67,9 @@ class SubGraph(GraphModule):
         return incoming
 
     def _build(self, incoming, *args, **kwargs):
+        stage = kwargs.pop('stage', None)
         incoming = self._get_incoming(incoming)
-        for module in self._modules:
+        for module in self.get_stage_modules(stage):
             incoming = module(incoming, *args, **kwargs)
         return incoming
 
@@ -39,6 +39,14 @@ class GraphModule(object):
 
         VALUES = [MODEL, LAYER, SUBGRAPH, IMAGE_PROCESSOR, PIPELINE, BRIDGE, FUNCTION]
 
+    class ProcessingStage(object):
+        """The stages of a processing subgraph: the cacheable modules preceding the first
+        non cacheable module, e.g. a random augmentation, and the remaining modules."""
+        CACHEABLE = 'cacheable'
+        NON_CACHEABLE = 'non_cacheable'
+
+        VALUES = [CACHEABLE, NON_CACHEABLE]
+
     def __init__(self, mode, name, module_type=None):
         self.name = name
         self.mode = mode
@@ -156,6 +164,9 @@ class GraphModule(object):
 @six.add_metaclass(abc.ABCMeta)
 class BaseLayer(GraphModule):
     """Convenience class to create layers. See `GraphModule`'s docstring."""
+    # Whether the outputs only depend on the inputs, and can be cached between epochs,
+    # layers can have trainable variables.
+    cacheable = False
 
     def __init__(self, mode, name):
         super(BaseLayer, self).__init__(mode=mode, name=name, module_type=self.ModuleType.LAYER)
@@ -164,11 +175,17 @@ class BaseLayer(GraphModule):
 @six.add_metaclass(abc.ABCMeta)
 class ImageProcessorModule(GraphModule):
     """Convenience class to create image processors. See `GraphModule`'s docstring."""
+    is_random = False
 
     def __init__(self, mode, name):
         super(ImageProcessorModule, self).__init__(
             mode=mode, name=name, module_type=self.ModuleType.IMAGE_PROCESSOR)
 
+    @property
+    def cacheable(self):
+        """Whether the outputs only depend on the inputs, and can be cached between epochs."""
+        return not self.is_random
+
 
 class FunctionModule(GraphModule):
     """Constructs a module with a given build function.
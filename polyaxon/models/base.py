@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 from __future__ import absolute_import, division, print_function
 
+import six
 import tensorflow as tf
 from tensorflow.python.training import training
 
@@ -169,16 +170,31 @@ class BaseModel(GraphModule):
         # no need to tf.summary.merge(summary_op), for now we merge all at hook level
         return summary_op
 
-    def _build_loss(self, results, features, labels):
+    def _build_loss(self, results, features, labels, weights=None):
         """Creates the loss operation
 
+        Args:
+            weights: Optional `Tensor` to weight the per-batch losses,
+                combined with the `weights` of the loss config if any.
+
         Returns:
              tuple `(losses, loss)`:
                 `losses` are the per-batch losses.
                 `loss` is a single scalar tensor to minimize.
+
+        Raises:
+            ValueError: if `weights` are given with a callable loss module,
+                it's called without the loss params.
         """
+        loss_params = self.loss_config.params
+        if weights is not None:
+            if not isinstance(self.loss_config.module, six.string_types):
+                raise ValueError('The loss `{}` cannot be weighted, only the losses of the '
+                                 'registry accept `weights`.'.format(self.loss_config.module))
+            loss_params = dict(loss_params)
+            loss_params['weights'] = weights * loss_params.get('weights', 1.0)
         losses, loss = getters.get_loss(
-            self.loss_config.module, results, labels, **self.loss_config.params)
+            self.loss_config.module, results, labels, **loss_params)
         self._loss = loss
         self._losses = losses
 
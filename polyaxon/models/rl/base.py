@@ -42,8 +42,9 @@ class BaseRLModel(BaseModel):
                 min_reward = labels.get('min_reward', None)
                 avg_reward = labels.get('avg_reward', None)
                 total_reward = labels.get('total_reward', None)
+                avg_episode_reward = labels.get('avg_episode_reward', None)
                 summary_op += summarizer.add_reward_summaries(
-                    max_reward, min_reward, avg_reward, total_reward)
+                    max_reward, min_reward, avg_reward, total_reward, avg_episode_reward)
 
         return summary_op
 
@@ -129,6 +130,7 @@ class BaseQModel(BaseRLModel):
 
         self._train_graph = None
         self._target_graph = None
+        self._td_errors = None
 
     def _build_exploration(self):
         """Creates the exploration op.
@@ -232,6 +234,21 @@ class BaseQModel(BaseRLModel):
             self._target_results = self._train_results
             return self._build_actions()
 
+    def _build_q_loss(self, train_q_value, target_q_value, features, labels):
+        """Creates the loss between the train and target q values.
+
+        The temporal difference errors are kept and returned with the predictions,
+        if the labels contain `importance_weights`, e.g. sampled from a `PrioritizedMemory`,
+        they are used to weight the losses. The last transition of the batch
+        is only used as a target, it has no td error and gets the max priority.
+        """
+        self._td_errors = target_q_value - train_q_value
+        weights = labels.get('importance_weights')
+        if weights is not None:
+            weights = weights[:-1]
+        return super(BaseQModel, self)._build_loss(
+            train_q_value, features, target_q_value, weights=weights)
+
     def _build_update_target_graph(self):
         """Creates a copy operation from train graph to target graph."""
         if self.use_target_graph:
@@ -269,6 +286,8 @@ class BaseQModel(BaseRLModel):
         predictions['q'] = self._train_results.q
         if self._train_results.v is not None:
             predictions['v'] = self._train_results.v
+        if self._td_errors is not None:
+            predictions['td_errors'] = self._td_errors
         return predictions
 
 
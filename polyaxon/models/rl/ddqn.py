@@ -66,4 +66,4 @@ class DDQNModel(BaseQModel):
 
         target_q_value = (reward[:-1] + (1.0 - tf.cast(done[:-1], tf.float32)) *
                           self.discount * target_q_values[1:])
-        return super(DDQNModel, self)._build_loss(train_q_value, features, target_q_value)
+        return self._build_q_loss(train_q_value, target_q_value, features, labels)
@@ -13,7 +13,7 @@ except ImportError:
     # tf < 1.2.0
     from tensorflow.contrib.distributions import kl as kl_divergence
 
-from polyaxon.libs.utils import get_shape
+from polyaxon.libs.utils import EPSILON, get_shape
 from polyaxon.models.rl.base import BasePGModel
 
 
@@ -128,8 +128,46 @@ class TRPOModel(BasePGModel):
         self._set_theta = tf.group(*list_assigns)
         self._get_theta = tf.concat(axis=0,
                                     values=[tf.reshape(variable, (-1,)) for variable in variables])
+
+        self._update_step = None
+        self._expected_improve_rate = None
+        if all(key in labels for key in ('cg_damping', 'cg_iterations', 'max_kl_divergence')):
+            self._build_natural_gradient_step(labels, gradients, variables)
         return self._losses, self._loss
 
+    @staticmethod
+    def _flat_fisher_vector_product(gradients, variables, tangents):
+        """Computes the fisher vector product of a flat `tangents` tensor."""
+        offset = 0
+        gradient_vector_product = []
+        for gradient, variable in zip(gradients, variables):
+            shape = get_shape(variable)
+            size = np.prod(shape)
+            gradient_vector_product.append(
+                tf.reduce_sum(gradient * tf.reshape(tangents[offset:offset + size], shape)))
+            offset += size
+        return tf.concat(
+            values=[tf.reshape(grad, (-1,))
+                    for grad in tf.gradients(gradient_vector_product, variables)], axis=0)
+
+    def _build_natural_gradient_step(self, labels, gradients, variables):
+        """Computes the natural gradient step in graph, see `natural_gradient_step`.
+
+        Args:
+            labels: `dict`. Must include `cg_damping`, `cg_iterations`, `max_kl_divergence`.
+            gradients: The gradients of the fixed kl divergence w.r.t `variables`.
+            variables: The trainable variables.
+        """
+        def fisher_vector_product(tangents):
+            return self._flat_fisher_vector_product(gradients, variables, tangents)
+
+        update_step, expected_improve_rate = natural_gradient_step(
+            self._policy_gradient, fisher_vector_product, labels['cg_damping'],
+            labels['cg_iterations'], labels['max_kl_divergence'])
+        self._update_step = tf.identity(update_step, name='update_step')
+        self._expected_improve_rate = tf.identity(expected_improve_rate,
+                                                  name='expected_improve_rate')
+
     def _build_predictions(self, results, features, labels):
         """Creates the dictionary of predictions that is returned by the model."""
         predictions = super(BasePGModel, self)._build_predictions(
@@ -142,5 +180,86 @@ class TRPOModel(BasePGModel):
         return predictions
 
     def _build_extra_ops(self, results, features, labels):
-        return {'set_theta': self._set_theta,
-                'get_theta': self._get_theta}
+        extra_ops = {'set_theta': self._set_theta,
+                     'get_theta': self._get_theta}
+        if self._update_step is not None:
+            extra_ops['update_step'] = self._update_step
+            extra_ops['expected_improve_rate'] = self._expected_improve_rate
+        return extra_ops
+
+
+def conjugate_gradient(fn, b, iterations, residual_tolerance=1e-10):
+    """Conjugate gradient solver in graph, the iterations run in a `tf.while_loop`.
+
+    (A mirror to `polyaxon.rl.utils.conjugate_gradient`.)
+
+    Args:
+        fn: A function computing the `Tensor` Ax of Ax=b.
+        b: b in Ax = b.
+        iterations: `int` or `Tensor`. The maximum number of iterations.
+        residual_tolerance: `float`. The residual below which the iterations stop.
+
+    Returns:
+        Approximate solution to linear system.
+    """
+    def finite(x):
+        return tf.where(tf.is_finite(x), x, tf.zeros_like(x))
+
+    b = finite(b)
+
+    def cond(i, x, residual, vector_p, residual_dot_residual):
+        return tf.logical_and(i < iterations, residual_dot_residual >= residual_tolerance)
+
+    def body(i, x, residual, vector_p, residual_dot_residual):
+        z = fn(vector_p)
+        cg_vector_p_dot_z = tf.reduce_sum(vector_p * z)
+        cg_vector_p_dot_z = tf.where(
+            tf.abs(cg_vector_p_dot_z) < EPSILON, EPSILON, cg_vector_p_dot_z)
+        v = residual_dot_residual / cg_vector_p_dot_z
+        x += v * vector_p
+        residual -= v * z
+        new_residual_dot_residual = tf.reduce_sum(residual * residual)
+        alpha = new_residual_dot_residual / (residual_dot_residual + EPSILON)
+        # Construct new search direction as linear combination of residual and previous
+        # search vector.
+        vector_p = residual + alpha * vector_p
+        return i + 1, x, residual, vector_p, new_residual_dot_residual
+
+    _, x, _, _, _ = tf.while_loop(
+        cond=cond,
+        body=body,
+        loop_vars=[tf.constant(0), tf.zeros_like(b), b, b, tf.reduce_sum(b * b)],
+        back_prop=False)
+    return finite(x)
+
+
+def natural_gradient_step(policy_gradient, fisher_vector_product, cg_damping, cg_iterations,
+                          max_kl_divergence):
+    """Computes the natural gradient step of TRPO in graph.
+
+    The direction solves `(F + cg_damping * I) x = -policy_gradient` with the conjugate
+    gradient, and is scaled so that the step satisfies the kl divergence constraint.
+    The conjugate gradient iterations run in a `tf.while_loop`, so that the batch is fed
+    once and the fisher vector products don't require a session run each.
+
+    Args:
+        policy_gradient: The flat gradient of the surrogate loss.
+        fisher_vector_product: A function computing the flat fisher vector product `F t`.
+        cg_damping: `float` or `Tensor`. The damping added to the fisher matrix.
+        cg_iterations: `int` or `Tensor`. The maximum number of conjugate gradient iterations.
+        max_kl_divergence: `float` or `Tensor`. The kl divergence constraint.
+
+    Returns:
+        The update step of the flat variables, and the expected improve rate of the loss.
+    """
+    def damped_fisher_vector_product(tangents):
+        return fisher_vector_product(tangents) + cg_damping * tangents
+
+    direction = conjugate_gradient(damped_fisher_vector_product, -policy_gradient,
+                                   cg_iterations)
+    shs = 0.5 * tf.reduce_sum(direction * damped_fisher_vector_product(direction))
+    lagrange_multiplier = tf.sqrt(shs / max_kl_divergence)
+    update_step = direction / (lagrange_multiplier + EPSILON)
+    expected_improve_rate = (-tf.reduce_sum(policy_gradient * direction) /
+                             (lagrange_multiplier + EPSILON))
+    return update_step, expected_improve_rate
@@ -88,7 +88,8 @@ def add_exploration_rate_summaries():
     return [get_summary(SummaryTypes.SCALAR, 'exploration_rate', exploration_rate[0])]
 
 
-def add_reward_summaries(max_reward, min_reward, avg_reward, total_reward):
+def add_reward_summaries(max_reward, min_reward, avg_reward, total_reward,
+                         avg_episode_reward=None):
     """Adds reinforcement learning reward summaries."""
     summaries = []
     if max_reward is not None:
@@ -103,6 +104,10 @@ def add_reward_summaries(max_reward, min_reward, avg_reward, total_reward):
     if total_reward is not None:
         summaries.append(get_summary(SummaryTypes.SCALAR, total_reward.op.name, total_reward))
 
+    if avg_episode_reward is not None:
+        summaries.append(get_summary(
+            SummaryTypes.SCALAR, avg_episode_reward.op.name, avg_episode_reward))
+
     return summaries
 
 
@@ -9,6 +9,7 @@ from polyaxon.processing.image import IMAGE_PROCESSORS
 from polyaxon.processing.categorical import CategoricalVocabulary, CategoricalProcessor
 from polyaxon.processing.data_decoders import (
     DataDecoder,
+    RawImage,
     TFExampleDecoder,
     SplitTokensDecoder,
     TFSequenceExampleDecoder
@@ -20,8 +21,18 @@ from polyaxon.processing.data_providers import (
     ParallelDatasetProvider
 )
 from polyaxon.processing import image
+from polyaxon.processing.buckets import estimate_bucket_boundaries, get_length_histogram
 from polyaxon.processing.input_data import create_input_data_fn
 from polyaxon.processing.text import VocabularyProcessor
+from polyaxon.processing.vocabulary import FrozenVocabulary, build_vocabulary
+from polyaxon.processing.tfrecord_index import (
+    IndexedTFRecordWriter,
+    build_index,
+    count_records,
+    get_record_ranges,
+    read_record,
+    read_records
+)
 from polyaxon.processing import pipelines
 
 
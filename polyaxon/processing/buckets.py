@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, print_function
+
+import re
+
+import numpy as np
+import tensorflow as tf
+
+from polyaxon.processing.tfrecord_index import read_sequence_lengths
+
+
+def get_length_histogram(lengths, histogram=None):
+    """Returns the histogram of sequence lengths, the count of every length.
+
+    Args:
+        lengths: `list` of `int`. The sequence lengths.
+        histogram: `numpy array`. A histogram to update.
+
+    Returns:
+        A `numpy array` where the element `i` is the number of sequences of length `i`.
+    """
+    counts = np.bincount(np.asarray(lengths, dtype=np.int64).ravel())
+    if histogram is None:
+        return counts
+    histogram = np.asarray(histogram, dtype=np.int64)
+    size = max(len(counts), len(histogram))
+    return (np.pad(histogram, (0, size - len(histogram)), 'constant') +
+            np.pad(counts, (0, size - len(counts)), 'constant'))
+
+
+def count_tokens(text, delimiter=''):
+    """Returns the number of tokens of a `SplitTokensDecoder` with this delimiter.
+
+    An empty delimiter splits the text into characters, otherwise every character
+    of the delimiter is a separator and the empty tokens are skipped.
+    """
+    text = tf.compat.as_bytes(text)
+    if not delimiter:
+        return len(text)
+    pattern = b'[' + re.escape(tf.compat.as_bytes(delimiter)) + b']+'
+    return len([token for token in re.split(pattern, text) if token])
+
+
+def get_text_length_histogram(filenames, delimiter='', num_special_tokens=0,
+                              chunk_size=100000):
+    """Computes the histogram of the number of tokens per line of text files
+    in a streaming pass, by chunks of lines.
+
+    Args:
+        filenames: `list`. The text files.
+        delimiter: `str`. The delimiter splitting the lines into tokens, see `count_tokens`.
+        num_special_tokens: `int`. The number of tokens added to every line, e.g. a
+            `SEQUENCE_END` token.
+        chunk_size: `int`. The number of lines counted at once.
+
+    Returns:
+        The histogram of lengths, see `get_length_histogram`.
+    """
+    histogram = None
+    for filename in filenames:
+        with tf.gfile.GFile(filename, 'rb') as f:
+            lengths = []
+            for line in f:
+                lengths.append(count_tokens(line.rstrip(b'\r\n'), delimiter) + num_special_tokens)
+                if len(lengths) == chunk_size:
+                    histogram = get_length_histogram(lengths, histogram)
+                    lengths = []
+            if lengths:
+                histogram = get_length_histogram(lengths, histogram)
+    return histogram if histogram is not None else np.zeros(0, dtype=np.int64)
+
+
+def get_tfrecord_length_histogram(filenames, field, delimiter='', num_special_tokens=0):
+    """Computes the histogram of the number of tokens of the text `field` of
+    TFRecord files of `tf.train.Example`.
+
+    The lengths are read from the index sidecars when the records were indexed with
+    their sequence length, see `IndexedTFRecordWriter`, otherwise the records are parsed
+    in a streaming pass.
+
+    Args:
+        filenames: `list`. The TFRecord files.
+        field: `str`. The bytes feature holding the text.
+        delimiter: `str`. The delimiter splitting the text into tokens, see `count_tokens`.
+        num_special_tokens: `int`. The number of tokens added to every text.
+
+    Returns:
+        The histogram of lengths, see `get_length_histogram`.
+    """
+    histogram = None
+    for filename in filenames:
+        lengths = read_sequence_lengths(filename)
+        if lengths is None:
+            lengths = []
+            for record in tf.python_io.tf_record_iterator(filename):
+                values = tf.train.Example.FromString(record).features.feature[field].bytes_list
+                text = values.value[0] if values.value else b''
+                lengths.append(count_tokens(text, delimiter) + num_special_tokens)
+        histogram = get_length_histogram(lengths, histogram)
+    return histogram if histogram is not None else np.zeros(0, dtype=np.int64)
+
+
+def _get_expected_padded_lengths(lengths, counts, batch_size):
+    """Returns the expected padded length of a batch for all the buckets starting at
+    `lengths[0]`, i.e. the expected maximum of `batch_size` lengths drawn from the bucket.
+
+    The element `j` is the expected padded length of the bucket `lengths[:j + 1]`.
+    """
+    cumulative_counts = np.cumsum(counts)
+    # The cumulative distribution of the bucket `j` evaluated at `lengths[k]`, for `k <= j`.
+    cdf = np.tril(cumulative_counts[None, :] / cumulative_counts[:, None])
+    cdf_max = cdf ** batch_size
+    max_probabilities = np.diff(np.concatenate([np.zeros((len(lengths), 1)), cdf_max], axis=1),
+                                axis=1)
+    return np.tril(max_probabilities).dot(lengths)
+
+
+def estimate_bucket_boundaries(length_histogram, batch_size, num_buckets=4, max_lengths=256):
+    """Estimates the bucket boundaries minimizing the expected padding of the batches.
+
+    The batches are padded to their longest sequence, the expected padded length of a batch
+    of a bucket is the expected maximum of `batch_size` lengths drawn from the bucket. The
+    boundaries are the optimal split of the lengths into at most `num_buckets` contiguous
+    buckets holding at least a batch each, found by dynamic programming.
+
+    Args:
+        length_histogram: `numpy array`. The histogram of the lengths,
+            see `get_length_histogram`.
+        batch_size: `int`. The batch size.
+        num_buckets: `int`. The maximum number of buckets.
+        max_lengths: `int`. The lengths are rounded up to at most `max_lengths` distinct values
+            to bound the complexity.
+
+    Returns:
+        A sorted `list` of boundaries, a sequence of length `l` belongs to the first bucket
+        whose boundary is greater than `l`, as expected by `bucket_by_sequence_length`.
+    """
+    histogram = np.asarray(length_histogram, dtype=np.float64)
+    lengths = np.flatnonzero(histogram)
+    counts = histogram[lengths]
+    if len(lengths) > max_lengths:
+        step = int(np.ceil(lengths[-1] / max_lengths))
+        lengths, inverse = np.unique(-(-lengths // step) * step, return_inverse=True)
+        counts = np.bincount(inverse, weights=counts)
+
+    num_buckets = int(min(num_buckets, len(lengths), counts.sum() // batch_size))
+    if num_buckets <= 1:
+        return []
+
+    # padding[i, j] is the expected number of padding tokens of the bucket `lengths[i:j + 1]`.
+    num_lengths = len(lengths)
+    padding = np.full((num_lengths, num_lengths), np.inf)
+    for i in range(num_lengths):
+        bucket_counts = np.cumsum(counts[i:])
+        bucket_tokens = np.cumsum(counts[i:] * lengths[i:])
+        padded_lengths = _get_expected_padded_lengths(lengths[i:], counts[i:], batch_size)
+        bucket_padding = bucket_counts * padded_lengths - bucket_tokens
+        # buckets with less than a batch starve
+        bucket_padding[bucket_counts < batch_size] = np.inf
+        padding[i, i:] = bucket_padding
+
+    # total_padding[b, j] is the minimum padding of `lengths[:j]` split into `b` buckets.
+    total_padding = np.full((num_buckets + 1, num_lengths + 1), np.inf)
+    total_padding[0, 0] = 0
+    starts = np.zeros((num_buckets + 1, num_lengths + 1), dtype=np.int64)
+    for b in range(1, num_buckets + 1):
+        for j in range(1, num_lengths + 1):
+            candidates = total_padding[b - 1, :j] + padding[:j, j - 1]
+            starts[b, j] = np.argmin(candidates)
+            total_padding[b, j] = candidates[starts[b, j]]
+
+    best_num_buckets = int(np.argmin(total_padding[1:, num_lengths])) + 1
+    if not np.isfinite(total_padding[best_num_buckets, num_lengths]):
+        return []
+
+    boundaries = []
+    end = num_lengths
+    for b in range(best_num_buckets, 1, -1):
+        end = starts[b, end]
+        boundaries.append(int(lengths[end - 1]) + 1)
+    return sorted(boundaries)
+
+
+def get_padding_efficiency(lengths, tokens):
+    """Returns the ratio of real tokens to padded tokens of a batch.
+
+    Args:
+        lengths: `Tensor`. The lengths of the sequences of the batch.
+        tokens: `Tensor`. The padded tokens of the batch, `[batch_size, max_length, ...]`.
+    """
+    num_tokens = tf.reduce_sum(tf.cast(lengths, tf.float32))
+    num_padded_tokens = tf.cast(tf.shape(tokens)[0] * tf.shape(tokens)[1], tf.float32)
+    return num_tokens / tf.maximum(num_padded_tokens, 1.)
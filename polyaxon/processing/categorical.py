@@ -1,8 +1,11 @@
 # -*- coding: utf-8 -*-
 from __future__ import absolute_import, division, print_function
 
+import numpy as np
 import tensorflow.contrib.learn as tflearn
 
+from polyaxon.processing.vocabulary import get_frozen_vocabulary
+
 
 class CategoricalVocabulary(tflearn.preprocessing.CategoricalVocabulary):
     """Categorical variables vocabulary class.
@@ -96,6 +99,7 @@ class CategoricalProcessor(tflearn.preprocessing.CategoricalProcessor):
             vocabularies_: list of CategoricalVocabulary objects.
         """
         super(CategoricalProcessor, self).__init__(min_frequency, share, vocabularies)
+        self._frozen_vocabularies = None
 
     def freeze(self, freeze=True):
         """Freeze or unfreeze all vocabularies.
@@ -115,6 +119,7 @@ class CategoricalProcessor(tflearn.preprocessing.CategoricalProcessor):
         Returns:
             self
         """
+        self._frozen_vocabularies = None
         return super(CategoricalProcessor, self).fit(x, unused_y)
 
     def fit_transform(self, x, unused_y=None):
@@ -142,3 +147,32 @@ class CategoricalProcessor(tflearn.preprocessing.CategoricalProcessor):
             x: iterable, [n_samples]. Category-id matrix.
         """
         return super(CategoricalProcessor, self).transform(x)
+
+    def transform_batch(self, x):
+        """Transform a batch of rows to a category-id matrix at once.
+
+        The categories of every column are looked up in bulk in the frozen vocabulary of
+        the column, see `FrozenVocabulary.lookup`. Nan values, never in the vocabularies,
+        are mapped to the unknown token id like in `transform`.
+
+        Args:
+            x: numpy matrix, pandas DataFrame or list of rows. A 1-D array is a single column.
+
+        Returns:
+            x: int32 [n_samples, n_columns]. Category-id matrix.
+        """
+        self.freeze()
+        if getattr(self, '_frozen_vocabularies', None) is None:
+            vocabularies = self.vocabularies_[:1] if self.share else self.vocabularies_
+            self._frozen_vocabularies = [get_frozen_vocabulary(vocabulary)
+                                         for vocabulary in vocabularies]
+
+        x = x if isinstance(x, np.ndarray) else np.asarray(x, dtype=object)
+        if x.ndim == 1:
+            x = x.reshape((-1, 1))
+        if self.share:
+            return self._frozen_vocabularies[0].lookup(x)
+        ids = np.zeros(x.shape, dtype=np.int32)
+        for icol, vocabulary in enumerate(self._frozen_vocabularies):
+            ids[:, icol] = vocabulary.lookup(x[:, icol])
+        return ids
@@ -6,6 +6,7 @@ import six
 
 import tensorflow as tf
 
+from tensorflow.contrib.slim.python.slim.data import tfexample_decoder
 from tensorflow.python.ops import array_ops
 
 
@@ -109,6 +110,111 @@ class TFExampleDecoder(DataDecoder):
             outputs.append(handler.tensors_to_item(keys_to_tensors))
         return outputs
 
+    def decode_batch(self, serialized_examples, items=None, parallel_iterations=32):
+        """Decodes a batch of serialized TF-examples.
+
+        The batch is parsed with a single `tf.parse_example`, `Tensor` items are reshaped
+        batch-wise, `RawImage` items are decoded with a single `tf.decode_raw`,
+        and `Image` items with a fixed shape are decoded with a single
+        `tf.decode_raw` if all the images of the batch are raw, otherwise per image.
+        Other items are decoded per example.
+
+        Args:
+            serialized_examples: a 1-D tensor of serialized TF-examples.
+            items: the list of items to decode. These must be a subset of the item
+                keys in self._items_to_handlers. If `items` is left as None, then all
+                of the items in self._items_to_handlers are decoded.
+            parallel_iterations: the number of examples decoded in parallel when
+                an item cannot be decoded batch-wise.
+
+        Returns:
+            the decoded items, a list of batched tensors.
+        """
+        examples = tf.parse_example(serialized_examples, self._keys_to_features)
+
+        # Reshape non-sparse elements just once:
+        for k, v in self._keys_to_features.items():
+            if isinstance(v, tf.FixedLenFeature):
+                examples[k] = array_ops.reshape(examples[k], [-1] + list(v.shape))
+
+        if not items:
+            items = self._items_to_handlers.keys()
+
+        outputs = []
+        for item in items:
+            handler = self._items_to_handlers[item]
+            keys_to_tensors = {key: examples[key] for key in handler.keys}
+            outputs.append(self._batch_tensors_to_item(
+                handler, keys_to_tensors, parallel_iterations))
+        return outputs
+
+    @staticmethod
+    def _batch_tensors_to_item(handler, keys_to_tensors, parallel_iterations):
+        # pylint: disable=protected-access
+        if isinstance(handler, tfexample_decoder.Tensor) and not handler._shape_keys:
+            tensor = keys_to_tensors[handler._tensor_key]
+            if isinstance(tensor, tf.SparseTensor):
+                tensor = tf.sparse_tensor_to_dense(tensor, handler._default_value)
+            if handler._shape is not None:
+                tensor = array_ops.reshape(tensor, [-1] + list(handler._shape))
+            return tensor
+
+        if isinstance(handler, RawImage):
+            images = tf.decode_raw(keys_to_tensors[handler.image_key], out_type=handler.dtype)
+            return array_ops.reshape(images, [-1] + list(handler.shape))
+
+        if (isinstance(handler, tfexample_decoder.Image) and
+                handler._shape is not None and not handler._repeated):
+            image_buffers = keys_to_tensors[handler._image_key]
+            image_formats = keys_to_tensors[handler._format_key]
+            shape = list(handler._shape)
+
+            def decode_raw():
+                images = tf.decode_raw(image_buffers, out_type=handler._dtype)
+                return array_ops.reshape(images, [-1] + shape)
+
+            def decode_images():
+                return tf.map_fn(
+                    lambda x: array_ops.reshape(handler._decode(x[0], x[1]), shape),
+                    (image_buffers, image_formats),
+                    dtype=handler._dtype,
+                    parallel_iterations=parallel_iterations,
+                    back_prop=False)
+
+            is_raw = tf.logical_or(tf.equal(image_formats, 'raw'), tf.equal(image_formats, 'RAW'))
+            return tf.cond(tf.reduce_all(is_raw), decode_raw, decode_images)
+
+        if any(isinstance(tensor, tf.SparseTensor) for tensor in keys_to_tensors.values()):
+            raise ValueError('The item handler `{}` cannot decode sparse features '
+                             'batch-wise.'.format(type(handler).__name__))
+
+        # The output type is inferred from the decoding of the first example.
+        dtype = handler.tensors_to_item(
+            {key: tensor[0] for key, tensor in keys_to_tensors.items()}).dtype
+        return tf.map_fn(handler.tensors_to_item, keys_to_tensors, dtype=dtype,
+                         parallel_iterations=parallel_iterations, back_prop=False)
+
+
+class RawImage(tfexample_decoder.ItemHandler):
+    """An ItemHandler that decodes raw images, i.e. uncompressed bytes, with a reshape.
+
+    Args:
+        shape: The shape of the images.
+        image_key: the name of the TF-Example feature in which the image bytes are stored.
+        dtype: The type of the stored image values.
+    """
+
+    def __init__(self, shape, image_key='image/encoded', dtype=tf.uint8):
+        super(RawImage, self).__init__([image_key])
+        self.shape = list(shape)
+        self.image_key = image_key
+        self.dtype = dtype
+
+    def tensors_to_item(self, keys_to_tensors):
+        """See base class."""
+        image = tf.decode_raw(keys_to_tensors[self.image_key], out_type=self.dtype)
+        return array_ops.reshape(image, self.shape)
+
 
 class SplitTokensDecoder(DataDecoder):
     """A DataDecoder that splits a string tensor into individual tokens and
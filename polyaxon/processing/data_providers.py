@@ -2,14 +2,27 @@
 from __future__ import absolute_import, division, print_function
 
 import abc
+import functools
+import hashlib
+import os
 import six
+import tempfile
+import zlib
 
 import numpy as np
 import tensorflow as tf
 
-from tensorflow.contrib.slim.python.slim.data.parallel_reader import parallel_read
+from tensorflow.contrib.slim.python.slim.data.parallel_reader import (
+    get_data_files,
+    parallel_read
+)
+from tensorflow.python.util import nest
 
 from polyaxon.processing.data_decoders import SplitTokensDecoder
+from polyaxon.processing.tfrecord_index import get_record_ranges, read_records
+
+SHARD_BY_FILE = 'file'
+SHARD_BY_RECORD = 'record'
 
 
 class Dataset(object):
@@ -112,6 +125,107 @@ class DataProvider(object):
                     item, valid_items))
 
 
+def get_worker_data_sources(data_sources, num_workers, worker_index):
+    """Returns the files read by a worker when sharding by file.
+
+    The files are sorted and assigned round robin, so every worker gets a disjoint
+    and fixed set of files across epochs.
+
+    Args:
+        data_sources: A list of files or file patterns.
+        num_workers: The number of workers.
+        worker_index: The index of the worker.
+    """
+    data_sources = sorted(get_data_files(data_sources))
+    if len(data_sources) < num_workers:
+        raise ValueError('Cannot shard {} files over {} workers by file, '
+                         'shard by record instead.'.format(len(data_sources), num_workers))
+    return data_sources[worker_index::num_workers]
+
+
+def get_worker_seed(seed, data_sources, worker_index):
+    """Returns the shuffling seed of a worker.
+
+    All the workers derive it from the same seed, if `seed` is None, a seed computed
+    from the data sources, and offset it with their index, so the shuffling is
+    reproducible across restarts but the workers don't read in lockstep.
+    """
+    if seed is None:
+        seed = zlib.crc32(','.join(sorted(get_data_files(data_sources))).encode()) & 0x7fffffff
+    return seed + worker_index
+
+
+def make_worker_records(dataset, num_workers, worker_index):
+    """Creates a `tf.data` dataset of the records read by a worker when sharding by record.
+
+    The records of the files are split in exact disjoint ranges using their index
+    sidecars, see `get_record_ranges`. Only TFRecord files are supported.
+
+    A range starting at the first record of a file is read by a `TFRecordDataset`,
+    a range starting further is read in python from the byte offset of its first record,
+    see `read_records`, so the workers don't read the records preceding their range.
+    """
+    if dataset.reader is not tf.TFRecordReader:
+        raise ValueError('Sharding by record is only supported for TFRecord files.')
+    if not hasattr(tf, 'data'):
+        raise ValueError('Sharding by record requires tensorflow>=1.4.')
+
+    ranges = get_record_ranges(sorted(get_data_files(dataset.data_sources)),
+                               num_workers, worker_index)
+    if not ranges:
+        raise ValueError('The worker `{}` has no records to read.'.format(worker_index))
+
+    records = None
+    for filename, start, end in ranges:
+        if start == 0:
+            file_records = tf.data.TFRecordDataset(filename).take(end)
+        else:
+            file_records = tf.data.Dataset.from_generator(
+                functools.partial(read_records, filename, start, end),
+                output_types=tf.string, output_shapes=tf.TensorShape([]))
+        records = file_records if records is None else records.concatenate(file_records)
+    return records
+
+
+def make_aligned_records(datasets, data_sources, num_readers=1, shuffle=False, seed=None):
+    """Creates a `tf.data` dataset of tuples of aligned records of several datasets,
+    e.g. the source and target lines of a parallel text, read in parallel.
+
+    The datasets must be aligned file by file, the file `i` of every dataset, in sorted order,
+    holds the records aligned with the file `i` of the other datasets. The tuples of files are
+    read in parallel by `num_readers` readers, and the records of a tuple are read in lockstep.
+
+    Args:
+        datasets: `list` of `Dataset` instances.
+        data_sources: `list` of the data sources of every dataset.
+        num_readers: The number of tuples of files read in parallel.
+        shuffle: Whether to shuffle the files.
+        seed: The seed to use if shuffling.
+    """
+    if not hasattr(tf, 'data'):
+        raise ValueError('Reading aligned files in parallel requires tensorflow>=1.4.')
+
+    data_sources = [sorted(get_data_files(sources)) for sources in data_sources]
+    if len(set(len(sources) for sources in data_sources)) > 1:
+        raise ValueError('Aligned datasets must have the same number of files, '
+                         'received {}.'.format([len(sources) for sources in data_sources]))
+    record_datasets = [_get_record_dataset(dataset.reader) for dataset in datasets]
+
+    def read_files(*filenames):
+        return tf.data.Dataset.zip(tuple(
+            record_dataset(filename)
+            for record_dataset, filename in zip(record_datasets, filenames)))
+
+    files = tf.data.Dataset.from_tensor_slices(
+        tuple(tf.constant(sources) for sources in data_sources))
+    if shuffle:
+        files = files.shuffle(len(data_sources[0]), seed=seed)
+    if hasattr(tf.contrib.data, 'parallel_interleave'):
+        return files.apply(tf.contrib.data.parallel_interleave(
+            read_files, cycle_length=num_readers, sloppy=shuffle))
+    return files.interleave(read_files, cycle_length=num_readers)
+
+
 class DatasetDataProvider(DataProvider):
     """Creates a DatasetDataProvider.
 
@@ -127,23 +241,40 @@ class DatasetDataProvider(DataProvider):
         record_key: The item name to use for the dataset record keys in the provided tensors.
         seed: The seed to use if shuffling.
         scope: Optional name scope for the ops.
+        num_workers: The number of workers sharing the dataset, e.g. in distributed training.
+        worker_index: The index of this worker.
+        shard_by: How the data is split between workers, by `file` or by `record`.
+            Sharding by record requires indexed TFRecord files and tensorflow>=1.4.
     Raises:
         ValueError: If `record_key` matches one of the items in the dataset.
     """
     def __init__(self, dataset, num_readers=1, reader_kwargs=None, shuffle=True, num_epochs=None,
                  common_queue_capacity=256, common_queue_min=128, record_key='__record_key__',
-                 seed=None, scope=None):
-        key, data = parallel_read(
-            dataset.data_sources,
-            reader_class=dataset.reader,
-            num_epochs=num_epochs,
-            num_readers=num_readers,
-            reader_kwargs=reader_kwargs,
-            shuffle=shuffle,
-            capacity=common_queue_capacity,
-            min_after_dequeue=common_queue_min,
-            seed=seed,
-            scope=scope)
+                 seed=None, scope=None, num_workers=1, worker_index=0, shard_by=SHARD_BY_FILE):
+        data_sources = dataset.data_sources
+        if num_workers > 1:
+            seed = get_worker_seed(seed, data_sources, worker_index)
+            if shard_by == SHARD_BY_FILE:
+                data_sources = get_worker_data_sources(data_sources, num_workers, worker_index)
+
+        if num_workers > 1 and shard_by == SHARD_BY_RECORD:
+            records = make_worker_records(dataset, num_workers, worker_index)
+            records = records.repeat(num_epochs)
+            if shuffle:
+                records = records.shuffle(common_queue_capacity, seed=seed)
+            data = records.make_one_shot_iterator().get_next()
+        else:
+            _, data = parallel_read(
+                data_sources,
+                reader_class=dataset.reader,
+                num_epochs=num_epochs,
+                num_readers=num_readers,
+                reader_kwargs=reader_kwargs,
+                shuffle=shuffle,
+                capacity=common_queue_capacity,
+                min_after_dequeue=common_queue_min,
+                seed=seed,
+                scope=scope)
 
         items = dataset.decoder.list_items()
         tensors = dataset.decoder.decode(data, items)
@@ -173,28 +304,54 @@ class ParallelDatasetProvider(DataProvider):
         common_queue_capacity: The capacity of the common queue.
         common_queue_min: The minimum number of elements in the common queue after a dequeue.
         seed: The seed to use if shuffling.
+        num_workers: The number of workers sharing the dataset, e.g. in distributed training.
+        worker_index: The index of this worker.
+        shard_by: How the data is split between workers, only `file` keeps the
+            datasets aligned.
+        num_readers: The number of pairs of files read in parallel if `aligned_files`,
+            otherwise the files are read by a single reader to keep the datasets aligned.
+        aligned_files: If True, the datasets are aligned file by file, see
+            `make_aligned_records`, and the pairs of files are read in parallel.
+            Requires tensorflow>=1.4.
     """
     def __init__(self, dataset_source, dataset_target, shuffle=True, num_epochs=None,
-                 common_queue_capacity=4096, common_queue_min=1024, seed=None):
+                 common_queue_capacity=4096, common_queue_min=1024, seed=None,
+                 num_workers=1, worker_index=0, shard_by=SHARD_BY_FILE, num_readers=1,
+                 aligned_files=False):
+
+        data_sources_source = dataset_source.data_sources
+        data_sources_target = dataset_target.data_sources if dataset_target else None
+        if num_workers > 1:
+            if shard_by != SHARD_BY_FILE:
+                raise ValueError('Parallel datasets can only be sharded by file.')
+            seed = get_worker_seed(seed, data_sources_source, worker_index)
+            data_sources_source = get_worker_data_sources(
+                data_sources_source, num_workers, worker_index)
+            if data_sources_target is not None:
+                data_sources_target = get_worker_data_sources(
+                    data_sources_target, num_workers, worker_index)
 
         if seed is None:
             seed = np.random.randint(10e8)
 
-        _, data_source = parallel_read(
-            dataset_source.data_sources,
-            reader_class=dataset_source.reader,
-            num_epochs=num_epochs,
-            num_readers=1,
-            shuffle=False,
-            capacity=common_queue_capacity,
-            min_after_dequeue=common_queue_min,
-            seed=seed)
-
         data_target = ""
-        if dataset_target is not None:
-            _, data_target = parallel_read(
-                dataset_target.data_sources,
-                reader_class=dataset_target.reader,
+        if aligned_files:
+            datasets = [dataset_source]
+            data_sources = [data_sources_source]
+            if dataset_target is not None:
+                datasets.append(dataset_target)
+                data_sources.append(data_sources_target)
+            records = make_aligned_records(datasets, data_sources, num_readers=num_readers,
+                                           shuffle=shuffle, seed=seed)
+            records = records.repeat(num_epochs)
+            data = records.make_one_shot_iterator().get_next()
+            data_source = data[0]
+            if dataset_target is not None:
+                data_target = data[1]
+        else:
+            _, data_source = parallel_read(
+                data_sources_source,
+                reader_class=dataset_source.reader,
                 num_epochs=num_epochs,
                 num_readers=1,
                 shuffle=False,
@@ -202,6 +359,17 @@ class ParallelDatasetProvider(DataProvider):
                 min_after_dequeue=common_queue_min,
                 seed=seed)
 
+            if dataset_target is not None:
+                _, data_target = parallel_read(
+                    data_sources_target,
+                    reader_class=dataset_target.reader,
+                    num_epochs=num_epochs,
+                    num_readers=1,
+                    shuffle=False,
+                    capacity=common_queue_capacity,
+                    min_after_dequeue=common_queue_min,
+                    seed=seed)
+
         # Optionally shuffle the data
         if shuffle:
             shuffle_queue = tf.RandomShuffleQueue(
@@ -290,3 +458,216 @@ def make_parallel_data_provider(data_sources_source,
 
     return ParallelDatasetProvider(
         dataset_source=dataset_source, dataset_target=dataset_target, **kwargs)
+
+
+def _get_record_dataset(reader):
+    """Returns the `tf.data` dataset class reading the records of a reader class."""
+    readers_to_datasets = {
+        tf.TFRecordReader: tf.data.TFRecordDataset,
+        tf.TextLineReader: tf.data.TextLineDataset,
+    }
+    if reader not in readers_to_datasets:
+        raise ValueError('The reader `{}` is not supported by the dataset engine, '
+                         'supported readers: {}'.format(reader, list(readers_to_datasets)))
+    return readers_to_datasets[reader]
+
+
+def _decode_items(dataset, data):
+    items = dataset.decoder.list_items()
+    return dict(zip(items, dataset.decoder.decode(data, items)))
+
+
+def make_tf_dataset(datasets, shuffle=True, num_epochs=None, num_readers=4,
+                    num_parallel_calls=4, shuffle_buffer_size=1024, seed=None,
+                    processing_fn=None, decode_batch_size=None, num_workers=1, worker_index=0,
+                    shard_by=SHARD_BY_FILE, cache=False, cache_memory_budget=None,
+                    cache_dir=None, cache_key=None, augmentation_fn=None, aligned_files=False):
+    """Creates a `tf.data` dataset of decoded items, an alternative to the queue based
+    `DatasetDataProvider` and `ParallelDatasetProvider`.
+
+    A single dataset is read with a parallel interleave of its files,
+    several datasets are read line by line aligned, e.g. the source and target of a
+    parallel text, with a parallel interleave of their tuples of files if they are aligned
+    file by file. The records are decoded, and processed, with a parallel map.
+
+    Args:
+        datasets: `list` of `Dataset` instances.
+        shuffle: Whether to shuffle the files and the records.
+        num_epochs: The number of times each data source is read. If left as None,
+            the data will be cycled through indefinitely.
+        num_readers: The number of files read in parallel.
+        num_parallel_calls: The number of records decoded and processed in parallel.
+        shuffle_buffer_size: The size of the records shuffle buffer.
+        seed: The seed to use if shuffling.
+        processing_fn: A function applied on the `dict` of decoded items.
+        decode_batch_size: If set, the records of a single dataset, whose decoder
+            implements `decode_batch`, are decoded by batches of this size before being
+            unbatched and processed per example.
+        num_workers: The number of workers sharing the datasets, e.g. in distributed training.
+        worker_index: The index of this worker.
+        shard_by: How the data is split between workers, by `file` or by `record`.
+            Several datasets can only be sharded by file.
+        cache: If True, the decoded and processed items are cached during the first epoch,
+            and the next epochs are read from the cache. The repeat and the shuffling of
+            the records then happen after the cache.
+        cache_memory_budget: The maximum size, in MB, of a cache kept in memory. If the
+            estimated size of the cache exceeds it, the cache is written to `cache_dir`.
+            If None, the cache is always kept in memory.
+        cache_dir: The directory of the cache files. If set with a `cache_key`, the cache
+            files are named after the data sources and the `cache_key`, and reused by the next
+            calls, see `get_cache_filename`. Otherwise, a new cache is written to a temporary
+            directory by every call.
+        cache_key: `str`. Identifies the decoding and the processing of the items, e.g. the
+            configuration of the pipeline and the mode, to name the cache files.
+        augmentation_fn: A function applied on the `dict` of items after the cache,
+            e.g. random augmentations.
+        aligned_files: If True, several datasets are aligned file by file, see
+            `make_aligned_records`, and `num_readers` tuples of files are read in parallel.
+
+    Returns:
+        A `tf.data.Dataset` of `dict` of items.
+    """
+    if not hasattr(tf, 'data'):
+        raise ValueError('The dataset engine requires tensorflow>=1.4.')
+
+    data_sources = [dataset.data_sources for dataset in datasets]
+    if num_workers > 1:
+        seed = get_worker_seed(seed, data_sources[0], worker_index)
+        if shard_by == SHARD_BY_FILE:
+            data_sources = [get_worker_data_sources(sources, num_workers, worker_index)
+                            for sources in data_sources]
+        elif len(datasets) > 1:
+            raise ValueError('Several datasets can only be sharded by file.')
+
+    if seed is None:
+        seed = np.random.randint(10e8)
+
+    if num_workers > 1 and shard_by == SHARD_BY_RECORD:
+        data = make_worker_records(datasets[0], num_workers, worker_index)
+    elif len(datasets) == 1:
+        dataset = datasets[0]
+        record_dataset = _get_record_dataset(dataset.reader)
+        data = tf.data.Dataset.from_tensor_slices(tf.constant(data_sources[0]))
+        if shuffle:
+            data = data.shuffle(len(data_sources[0]), seed=seed)
+        if hasattr(tf.contrib.data, 'parallel_interleave'):
+            data = data.apply(tf.contrib.data.parallel_interleave(
+                record_dataset, cycle_length=num_readers, sloppy=shuffle))
+        else:
+            data = data.interleave(record_dataset, cycle_length=num_readers)
+    elif aligned_files:
+        data = make_aligned_records(datasets, data_sources, num_readers=num_readers,
+                                    shuffle=shuffle, seed=seed)
+    else:
+        # Files are read sequentially to keep the records of the datasets aligned.
+        data = tf.data.Dataset.zip(tuple(
+            _get_record_dataset(dataset.reader)(sources)
+            for dataset, sources in zip(datasets, data_sources)))
+
+    if not cache:
+        data = data.repeat(num_epochs)
+        if shuffle:
+            data = data.shuffle(shuffle_buffer_size, seed=seed)
+
+    if decode_batch_size and len(datasets) == 1 and hasattr(datasets[0].decoder, 'decode_batch'):
+        decoder = datasets[0].decoder
+
+        def decode_batch(records):
+            items = decoder.list_items()
+            return dict(zip(items, decoder.decode_batch(records, items)))
+
+        data = data.batch(decode_batch_size)
+        data = data.map(decode_batch, num_parallel_calls=num_parallel_calls)
+        data = data.flat_map(lambda items: tf.data.Dataset.from_tensor_slices(items))
+        if processing_fn is not None:
+            data = data.map(processing_fn, num_parallel_calls=num_parallel_calls)
+    else:
+        def decode(*records):
+            items = {}
+            for dataset, record in zip(datasets, records):
+                items.update(_decode_items(dataset, record))
+            if processing_fn is not None:
+                items = processing_fn(items)
+            return items
+
+        data = data.map(decode, num_parallel_calls=num_parallel_calls)
+
+    if cache:
+        num_samples = datasets[0].num_samples
+        if num_samples and num_workers > 1:
+            num_samples = -(-num_samples // num_workers)
+        if cache_key is not None:
+            cache_key = repr((cache_key, data_sources, num_workers, worker_index, shard_by))
+        data = data.cache(get_cache_filename(data, num_samples, cache_memory_budget, cache_dir,
+                                             cache_key=cache_key))
+        data = data.repeat(num_epochs)
+        if shuffle:
+            data = data.shuffle(shuffle_buffer_size, seed=seed)
+
+    if augmentation_fn is not None:
+        data = data.map(augmentation_fn, num_parallel_calls=num_parallel_calls)
+    return data
+
+
+def estimate_cache_size(data, num_samples):
+    """Estimates the size in bytes of the items of a `tf.data` dataset of `num_samples` elements.
+
+    Returns:
+        The estimated size, or None if the number of samples or the shape of an item is unknown,
+        or if an item is a string.
+    """
+    if not num_samples:
+        return None
+
+    size = 0
+    for shape, dtype in zip(nest.flatten(data.output_shapes), nest.flatten(data.output_types)):
+        if not shape.is_fully_defined() or dtype == tf.string:
+            return None
+        size += shape.num_elements() * dtype.size
+    return size * num_samples
+
+
+def get_cache_filename(data, num_samples, memory_budget=None, cache_dir=None, cache_key=None):
+    """Returns the filename of the `tf.data` cache, an empty string to cache in memory.
+
+    The cache is kept in memory if there's no `memory_budget`, or if its estimated size
+    is within the budget, otherwise, or if the size cannot be estimated, it is written to disk.
+
+    If both `cache_dir` and `cache_key` are set, the cache file is named after a hash of
+    the `cache_key` and of the structure of the items, so the input functions of the same data
+    and processing, e.g. of successive training calls, share it instead of writing a new cache
+    every call. A complete cache file is read as is by the next calls, the files left by
+    an interrupted first epoch, i.e. a partial cache and its lockfile, are removed so the cache
+    is written again. Otherwise, the cache is written to a new temporary directory.
+
+    Args:
+        data: The `tf.data.Dataset` of items to cache.
+        num_samples: The number of items, if known.
+        memory_budget: The maximum size, in MB, of a cache kept in memory.
+        cache_dir: The directory of the cache files, defaults to the temporary directory.
+        cache_key: `str`. Identifies the cached items, e.g. their data sources and their
+            processing.
+    """
+    size = estimate_cache_size(data, num_samples)
+    size_message = 'unknown' if size is None else '{:.1f}MB'.format(size / 2 ** 20)
+    if memory_budget is None or (size is not None and size <= memory_budget * 2 ** 20):
+        tf.logging.info('Caching the items in memory, estimated size: {}, budget: {}.'.format(
+            size_message, 'none' if memory_budget is None else '{}MB'.format(memory_budget)))
+        return ''
+
+    if cache_dir and not tf.gfile.Exists(cache_dir):
+        tf.gfile.MakeDirs(cache_dir)
+    if cache_dir is None or cache_key is None:
+        filename = os.path.join(tempfile.mkdtemp(dir=cache_dir), 'cache')
+    else:
+        cache_key = '{}:{}:{}'.format(cache_key, data.output_types, data.output_shapes)
+        filename = os.path.join(cache_dir, 'cache-{}'.format(
+            hashlib.sha1(cache_key.encode('utf-8')).hexdigest()[:16]))
+        # The index is written when the cache is complete.
+        if not tf.gfile.Exists('{}.index'.format(filename)):
+            for partial_filename in tf.gfile.Glob('{}*'.format(filename)):
+                tf.logging.info('Removing the partial cache file `{}`.'.format(partial_filename))
+                tf.gfile.Remove(partial_filename)
+    tf.logging.info('Caching the items in `{}`, estimated size: {} exceeds the memory '
+                    'budget {}MB.'.format(filename, size_message, memory_budget))
+    return filename
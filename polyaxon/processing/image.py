@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 from __future__ import absolute_import, division, print_function
 
+import json
+
 from collections import OrderedDict
 
 import tensorflow as tf
@@ -155,6 +157,8 @@ def random_crop(images, height, width):
 
 class RandomCrop(ImageProcessorModule):
     """See `plx.image.random_crop`'s docstring"""
+    is_random = True
+
     def __init__(self, mode, height, width, name="RandomCrop"):
         super(RandomCrop, self).__init__(mode=mode, name=name)
         self.height = height
@@ -863,6 +867,66 @@ class Standardization(ImageProcessorModule):
         return standardize(images=incoming)
 
 
+def normalize(images, mean, std):
+    """Normalizes `images` with dataset level per channel constants, `(x - mean) / std`.
+
+    Unlike `standardize`, no reduction is computed per image, the constants are
+    precomputed, e.g. by the dataset converters, see `get_statistics`.
+
+    Args:
+        images: 4-D Tensor of shape `[batch, height, width, channels]` or
+            3-D Tensor of shape `[height, width, channels]`.
+        mean: `float` or `list` of `float`. The mean of every channel.
+        std: `float` or `list` of `float`. The standard deviation of every channel.
+
+    Returns:
+        The normalized `float32` images with same shape as `images`.
+    """
+    images = tf.cast(images, tf.float32)
+    mean = tf.constant(mean, dtype=tf.float32)
+    # Capped away from zero for uniform channels.
+    std = tf.maximum(tf.constant(std, dtype=tf.float32), 1e-6)
+    return (images - mean) / std
+
+
+def get_statistics(meta_data_file, mode='train'):
+    """Returns the per channel `(mean, std)` of the images of a dataset mode,
+    from the statistics stored in its meta data file by the converters.
+    """
+    with tf.gfile.GFile(meta_data_file, 'r') as f:
+        statistics = json.loads(f.read()).get('statistics', {}).get(mode)
+    if not statistics or statistics.get('channel_mean') is None:
+        raise ValueError('The meta data file `{}` has no images statistics for the mode '
+                         '`{}`.'.format(meta_data_file, mode))
+    return statistics['channel_mean'], statistics['channel_std']
+
+
+class Normalization(ImageProcessorModule):
+    """See `plx.image.normalize`'s docstring.
+
+    Args:
+        mode: `str`, Specifies if this training, evaluation or prediction. See `Modes`.
+        mean: `float` or `list` of `float`. The mean of every channel.
+        std: `float` or `list` of `float`. The standard deviation of every channel.
+        meta_data_file: `str`. If `mean` and `std` are not provided, they are read from
+            the statistics of the dataset meta data file.
+        statistics_mode: `str`. The mode of the statistics to read, the training data's
+            by default.
+    """
+    def __init__(self, mode, mean=None, std=None, meta_data_file=None, statistics_mode='train',
+                 name="Normalization"):
+        super(Normalization, self).__init__(mode=mode, name=name)
+        if mean is None or std is None:
+            if not meta_data_file:
+                raise ValueError('`mean` and `std`, or a `meta_data_file`, are required.')
+            mean, std = get_statistics(meta_data_file, statistics_mode)
+        self.mean = mean
+        self.std = std
+
+    def _build(self, incoming, *args, **kwargs):
+        return normalize(images=incoming, mean=self.mean, std=self.std)
+
+
 def draw_bounding_boxes(images, boxes, name=None):
     """Draw bounding boxes on a batch of images.
     (A mirror to tf.image draw_bounding_boxes)
@@ -1110,6 +1174,7 @@ IMAGE_PROCESSORS = OrderedDict([
     ('AdjustSaturation', AdjustSaturation),
     ('AdjustGamma', AdjustGamma),
     ('Standardization', Standardization),
+    ('Normalization', Normalization),
     ('DrawBoundingBoxes', DrawBoundingBoxes),
     ('TotalVariation', TotalVariation),
 ])
@@ -1,13 +1,16 @@
 # -*- coding: utf-8 -*-
 from __future__ import absolute_import, division, print_function
 
+import json
+
 import tensorflow as tf
 
 from tensorflow.python.estimator.inputs.numpy_io import numpy_input_fn
 from tensorflow.python.estimator.inputs.pandas_io import pandas_input_fn
 
 from polyaxon.libs import getters
-from polyaxon.libs.configs import InputDataConfig
+from polyaxon.libs.configs import InputDataConfig, PipelineConfig, RunConfig
+from polyaxon.processing.buckets import estimate_bucket_boundaries, get_padding_efficiency
 
 
 def create_input_data_fn(mode, pipeline_config, scope=None, input_type=None, x=None, y=None):
@@ -46,6 +49,9 @@ def create_input_data_fn(mode, pipeline_config, scope=None, input_type=None, x=N
                                shuffle=pipeline_config.shuffle,
                                num_threads=pipeline_config.num_threads)
 
+    # The estimated bucket boundaries, computed once for all the calls of the input function.
+    estimated_bucket_boundaries = []
+
     def input_fn():
         """Creates features and labels."""
 
@@ -55,32 +61,22 @@ def create_input_data_fn(mode, pipeline_config, scope=None, input_type=None, x=N
             subgraph_configs_by_features=pipeline_config.subgraph_configs_by_features,
             **pipeline_config.params)
 
+        bucket_boundaries = pipeline_config.bucket_boundaries
+        if bucket_boundaries == PipelineConfig.AUTO_BUCKET_BOUNDARIES:
+            if not estimated_bucket_boundaries:
+                estimated_bucket_boundaries.append(
+                    _estimate_bucket_boundaries(pipeline, pipeline_config))
+            bucket_boundaries = estimated_bucket_boundaries[0]
+
         with tf.variable_scope(scope or 'input_fn'):
-            data_provider = pipeline.make_data_provider()
-            features_and_labels = pipeline.read_from_data_provider(data_provider)
-            # call pipeline processors
-            features_and_labels = pipeline(features_and_labels)
-
-            if pipeline_config.bucket_boundaries:
-                _, batch = tf.contrib.training.bucket_by_sequence_length(
-                    input_length=features_and_labels['source_len'],
-                    bucket_boundaries=pipeline_config.bucket_boundaries,
-                    tensors=features_and_labels,
-                    batch_size=pipeline_config.batch_size,
-                    keep_input=features_and_labels['source_len'] >= 1,
-                    dynamic_pad=pipeline_config.dynamic_pad,
-                    capacity=pipeline_config.capacity,
-                    allow_smaller_final_batch=pipeline_config.allow_smaller_final_batch,
-                    name='bucket_queue')
+            sharding_kwargs = _get_sharding_kwargs(pipeline_config)
+            if pipeline_config.engine == PipelineConfig.DATASET:
+                batch = _get_dataset_batch(
+                    pipeline, pipeline_config, sharding_kwargs, bucket_boundaries)
             else:
-                batch = tf.train.batch(
-                    tensors=features_and_labels,
-                    enqueue_many=False,
-                    batch_size=pipeline_config.batch_size,
-                    dynamic_pad=pipeline_config.dynamic_pad,
-                    capacity=pipeline_config.capacity,
-                    allow_smaller_final_batch=pipeline_config.allow_smaller_final_batch,
-                    name='batch_queue')
+                batch = _get_queue_batch(
+                    pipeline, pipeline_config, sharding_kwargs, bucket_boundaries)
+            _add_padding_efficiency_summaries(batch)
 
             # Separate features and labels
             features_batch = {k: batch[k] for k in pipeline.feature_keys}
@@ -92,3 +88,133 @@ def create_input_data_fn(mode, pipeline_config, scope=None, input_type=None, x=N
             return features_batch, labels_batch
 
     return input_fn
+
+
+def _get_sharding_kwargs(pipeline_config):
+    """Returns the data provider arguments splitting the data between the cluster's workers."""
+    if not pipeline_config.shard_by:
+        return {}
+
+    num_workers, worker_index = RunConfig.get_worker_sharding()
+    if num_workers <= 1:
+        return {}
+    return {'num_workers': num_workers,
+            'worker_index': worker_index,
+            'shard_by': pipeline_config.shard_by}
+
+
+def _estimate_bucket_boundaries(pipeline, pipeline_config):
+    """Estimates the bucket boundaries minimizing the padding from the histogram of
+    the source lengths of the pipeline, no bucketing if it has a single bucket.
+    """
+    length_histogram = pipeline.get_length_histogram()
+    bucket_boundaries = estimate_bucket_boundaries(
+        length_histogram,
+        batch_size=pipeline_config.batch_size,
+        num_buckets=pipeline_config.num_buckets)
+    tf.logging.info('Estimated bucket boundaries: {}'.format(bucket_boundaries))
+    return bucket_boundaries or None
+
+
+def _add_padding_efficiency_summaries(batch):
+    """Adds a summary of the ratio of real tokens to padded tokens of the sequences."""
+    for tokens_key in sorted(batch.keys()):
+        if not tokens_key.endswith('_tokens'):
+            continue
+        length_key = '{}_len'.format(tokens_key[:-len('_tokens')])
+        if length_key not in batch:
+            continue
+        efficiency = get_padding_efficiency(batch[length_key], batch[tokens_key])
+        tf.summary.scalar('{}_padding_efficiency'.format(length_key[:-len('_len')]), efficiency)
+
+
+def _get_queue_batch(pipeline, pipeline_config, sharding_kwargs, bucket_boundaries=None):
+    """Creates a batch of features and labels with queue runners.
+
+    The files of pipelines with `aligned_files` are read with `num_threads` parallel readers,
+    the other pipelines keep the default readers of their data providers.
+    """
+    if getattr(pipeline, 'aligned_files', False):
+        sharding_kwargs = dict(sharding_kwargs, num_readers=pipeline_config.num_threads)
+    data_provider = pipeline.make_data_provider(**sharding_kwargs)
+    features_and_labels = pipeline.read_from_data_provider(data_provider)
+    # call pipeline processors
+    features_and_labels = pipeline(features_and_labels)
+
+    if bucket_boundaries:
+        _, batch = tf.contrib.training.bucket_by_sequence_length(
+            input_length=features_and_labels['source_len'],
+            bucket_boundaries=bucket_boundaries,
+            tensors=features_and_labels,
+            batch_size=pipeline_config.batch_size,
+            keep_input=features_and_labels['source_len'] >= 1,
+            dynamic_pad=pipeline_config.dynamic_pad,
+            capacity=pipeline_config.capacity,
+            allow_smaller_final_batch=pipeline_config.allow_smaller_final_batch,
+            name='bucket_queue')
+    else:
+        batch = tf.train.batch(
+            tensors=features_and_labels,
+            enqueue_many=False,
+            batch_size=pipeline_config.batch_size,
+            dynamic_pad=pipeline_config.dynamic_pad,
+            capacity=pipeline_config.capacity,
+            allow_smaller_final_batch=pipeline_config.allow_smaller_final_batch,
+            name='batch_queue')
+    return batch
+
+
+def _get_dataset_batch(pipeline, pipeline_config, sharding_kwargs, bucket_boundaries=None):
+    """Creates a batch of features and labels with a `tf.data` dataset.
+
+    The files are read with `num_threads` parallel readers, the records are decoded and
+    processed with `num_parallel_calls` parallel calls, optionally cached after the first
+    epoch, and `prefetch_buffer_size` batches are prefetched to overlap the input with
+    the train step.
+    """
+    batch_size = pipeline_config.batch_size
+    # The cache is named after the decoding and the processing of the items.
+    config = pipeline_config.to_dict()
+    cache_key = json.dumps([pipeline.mode, config['module'], config['definition'],
+                            config['params']], sort_keys=True, default=str)
+    dataset = pipeline.make_tf_dataset(
+        num_readers=pipeline_config.num_threads,
+        num_parallel_calls=pipeline_config.num_parallel_calls,
+        shuffle_buffer_size=pipeline_config.min_after_dequeue,
+        cache=pipeline_config.cache,
+        cache_memory_budget=pipeline_config.cache_memory_budget,
+        cache_dir=pipeline_config.cache_dir,
+        cache_key=cache_key,
+        **sharding_kwargs)
+
+    if bucket_boundaries:
+        bucket_boundaries = tf.constant(bucket_boundaries, dtype=tf.int64)
+
+        def bucket_id(items):
+            length = tf.cast(items['source_len'], tf.int64)
+            return tf.reduce_sum(tf.cast(length >= bucket_boundaries, tf.int64))
+
+        def batch_bucket(_, bucket):
+            return bucket.padded_batch(batch_size, bucket.output_shapes)
+
+        dataset = dataset.filter(lambda items: items['source_len'] >= 1)
+        dataset = dataset.apply(tf.contrib.data.group_by_window(
+            key_func=bucket_id, reduce_func=batch_bucket, window_size=batch_size))
+    elif pipeline_config.dynamic_pad:
+        dataset = dataset.padded_batch(batch_size, dataset.output_shapes)
+    else:
+        dataset = dataset.batch(batch_size)
+
+    if not pipeline_config.allow_smaller_final_batch:
+        def is_full_batch(batch):
+            return tf.equal(tf.shape(batch[sorted(batch.keys())[0]])[0], batch_size)
+
+        dataset = dataset.filter(is_full_batch)
+
+    dataset = dataset.prefetch(pipeline_config.prefetch_buffer_size)
+
+    # An initializable iterator supports pipelines with lookup tables, it's initialized
+    # with the tables when the session is created.
+    iterator = dataset.make_initializable_iterator()
+    tf.add_to_collection(tf.GraphKeys.TABLE_INITIALIZERS, iterator.initializer)
+    return iterator.get_next()
@@ -7,12 +7,19 @@ import tensorflow as tf
 from tensorflow.contrib import slim as tfslim
 
 from polyaxon.libs.template_module import GraphModule
+from polyaxon.processing.buckets import get_text_length_histogram, get_tfrecord_length_histogram
 from polyaxon.processing.data_decoders import (
+    RawImage,
     SplitTokensDecoder,
     TFExampleDecoder,
     TFSequenceExampleDecoder,
 )
-from polyaxon.processing.data_providers import ParallelDatasetProvider, DatasetDataProvider, Dataset
+from polyaxon.processing.data_providers import (
+    ParallelDatasetProvider,
+    DatasetDataProvider,
+    Dataset,
+    make_tf_dataset
+)
 from polyaxon.processing.image import Flip
 
 
@@ -36,6 +43,10 @@ class Pipeline(GraphModule):
         self.subgraphs_by_features = subgraphs_by_features
         self.shuffle = shuffle
         self.num_epochs = num_epochs
+        # Records are decoded by batches of this size with the dataset engine, if supported.
+        self.decode_batch_size = None
+        # Several datasets are aligned file by file and their files are read in parallel.
+        self.aligned_files = False
 
     def make_data_provider(self, **kwargs):
         """Creates DataProvider instance for this input pipeline. Additional keyword arguments
@@ -43,6 +54,44 @@ class Pipeline(GraphModule):
         """
         raise NotImplementedError("Not implemented.")
 
+    def make_datasets(self):
+        """Creates the list of `Dataset` instances read by this input pipeline.
+        Several datasets are read aligned, e.g. the source and target of a parallel text.
+        """
+        raise NotImplementedError("Not implemented.")
+
+    def make_tf_dataset(self, cache=False, **kwargs):
+        """Creates a `tf.data` dataset of decoded and processed items for this input pipeline.
+        Additional keyword arguments are passed to `make_tf_dataset`.
+
+        If `cache`, the items are cached after the cacheable modules of the features subgraphs,
+        e.g. resizing or standardization, and only the remaining modules,
+        e.g. random augmentations, are applied on every epoch.
+        """
+        if not cache:
+            return make_tf_dataset(self.make_datasets(), shuffle=self.shuffle,
+                                   num_epochs=self.num_epochs, processing_fn=self,
+                                   decode_batch_size=self.decode_batch_size,
+                                   aligned_files=self.aligned_files, **kwargs)
+
+        def processing_fn(incoming):
+            return self(incoming, stage=self.ProcessingStage.CACHEABLE)
+
+        def augmentation_fn(incoming):
+            return self(incoming, stage=self.ProcessingStage.NON_CACHEABLE)
+
+        return make_tf_dataset(self.make_datasets(), shuffle=self.shuffle,
+                               num_epochs=self.num_epochs, processing_fn=processing_fn,
+                               decode_batch_size=self.decode_batch_size, cache=True,
+                               augmentation_fn=augmentation_fn,
+                               aligned_files=self.aligned_files, **kwargs)
+
+    def get_length_histogram(self):
+        """Returns the histogram of the source lengths of this input pipeline,
+        used to estimate the bucket boundaries, see `estimate_bucket_boundaries`.
+        """
+        raise NotImplementedError("Not implemented.")
+
     @property
     def feature_keys(self):
         """Defines the features that this input pipeline provides. Returns a set of strings."""
@@ -56,11 +105,13 @@ class Pipeline(GraphModule):
         return set()
 
     def _build(self, incoming, *args, **kwargs):
+        # The stage of the subgraphs to apply, all the modules if None.
+        stage = kwargs.get('stage')
         for feature, subgraph in self.subgraphs_by_features.items():
             if feature not in incoming:
                 raise KeyError("The feature `{}` does not exist, please review your pipeline "
                                "feature processors".format(feature))
-            incoming[feature] = subgraph(incoming[feature])
+            incoming[feature] = subgraph(incoming[feature], stage=stage)
         return incoming
 
     @staticmethod
@@ -82,13 +133,19 @@ class TFRecordImagePipeline(Pipeline):
         subgraphs_by_features: `dict`, list of modules to call for each feature to be processed
         shuffle: If true, shuffle the data.
         num_epochs: Number of times to iterate through the dataset. If None, iterate forever.
+        data_files: An array of file names to read from.
+        meta_data_file: The meta data file of the dataset.
+        decode_batch_size: `int`. If set, the records are parsed and decoded by batches
+            of this size with the `dataset` engine. The images must have a fixed shape,
+            i.e. the meta data must define `height`, `width` and `channels`.
     """
 
     def __init__(self, mode, name='TFRecordImagePipeline', subgraphs_by_features=None, shuffle=True,
-                 num_epochs=None, data_files=None, meta_data_file=None):
+                 num_epochs=None, data_files=None, meta_data_file=None, decode_batch_size=None):
         super(TFRecordImagePipeline, self).__init__(
             mode=mode, name=name, subgraphs_by_features=subgraphs_by_features,
             shuffle=shuffle, num_epochs=num_epochs)
+        self.decode_batch_size = decode_batch_size
         self.data_files = data_files or []
         self.meta_data = None
         if meta_data_file:
@@ -99,6 +156,11 @@ class TFRecordImagePipeline(Pipeline):
         """Creates DataProvider instance for this input pipeline. Additional keyword arguments
         are passed to the DataProvider.
         """
+        return DatasetDataProvider(dataset=self.make_datasets()[0], shuffle=self.shuffle,
+                                   num_epochs=self.num_epochs, **kwargs)
+
+    def make_datasets(self):
+        """See base class."""
         keys_to_features = {
             'image/encoded': tf.FixedLenFeature((), tf.string, default_value=''),
             'image/format': tf.FixedLenFeature((), tf.string,
@@ -110,13 +172,23 @@ class TFRecordImagePipeline(Pipeline):
         image_shape = [self.meta_data.get('height'),
                        self.meta_data.get('width'),
                        self.meta_data.get('channels')]
+        is_raw = self.meta_data.get('image_format') == 'raw'
         if not all(image_shape):
+            if self.decode_batch_size or is_raw:
+                raise ValueError('`decode_batch_size` and raw images require the meta data to '
+                                 'define the `height`, `width` and `channels` of the images.')
             # no reshaping should be done
             image_shape = None
 
+        if is_raw:
+            # Raw images are decoded with a reshape, without going through the image codecs.
+            image_handler = RawImage(shape=image_shape)
+        else:
+            image_handler = tfslim.tfexample_decoder.Image(
+                shape=image_shape, channels=self.meta_data.get('channels'))
+
         items_to_handlers = {
-            'image': tfslim.tfexample_decoder.Image(shape=image_shape,
-                                                    channels=self.meta_data.get('channels')),
+            'image': image_handler,
             'label': tfslim.tfexample_decoder.Tensor('image/class/label', shape=[]),
         }
 
@@ -132,8 +204,7 @@ class TFRecordImagePipeline(Pipeline):
             meta_data=self.meta_data,
             labels_to_names=self.meta_data['labels_to_classes'])
 
-        return DatasetDataProvider(dataset=dataset, shuffle=self.shuffle,
-                                   num_epochs=self.num_epochs, **kwargs)
+        return [dataset]
 
     @property
     def feature_keys(self):
@@ -162,10 +233,14 @@ class ParallelTextPipeline(Pipeline):
           to  " " (space). For character-level training this can be set to the
           empty string.
         target_delimiter: Same as `source_delimiter` but for the target text.
+        aligned_files: If True, the source and target files are aligned file by file, the
+            sorted source file `i` is aligned with the sorted target file `i`, and the pairs
+            of files are read in parallel, otherwise the files are read by a single reader.
+            Use `shard_parallel_text` to split large files into aligned shards.
     """
     def __init__(self, mode, name='ParallelTextPipeline', subgraphs_by_features=None, shuffle=True,
                  num_epochs=None, source_files=None, target_files=None, source_delimiter="",
-                 target_delimiter=""):
+                 target_delimiter="", aligned_files=False):
         super(ParallelTextPipeline, self).__init__(
             mode=mode, name=name, subgraphs_by_features=subgraphs_by_features, shuffle=shuffle,
             num_epochs=num_epochs)
@@ -173,11 +248,23 @@ class ParallelTextPipeline(Pipeline):
         self.target_files = target_files or []
         self.source_delimiter = source_delimiter
         self.target_delimiter = target_delimiter
+        self.aligned_files = aligned_files
 
     def make_data_provider(self, **kwargs):
         """Creates DataProvider instance for this input pipeline. Additional keyword arguments
         are passed to the DataProvider.
         """
+        datasets = self.make_datasets()
+        return ParallelDatasetProvider(
+            dataset_source=datasets[0],
+            dataset_target=datasets[1] if len(datasets) > 1 else None,
+            shuffle=self.shuffle,
+            num_epochs=self.num_epochs,
+            aligned_files=self.aligned_files,
+            **kwargs)
+
+    def make_datasets(self):
+        """See base class."""
         decoder_source = SplitTokensDecoder(
             tokens_feature_name='source_tokens',
             length_feature_name='source_len',
@@ -191,28 +278,30 @@ class ParallelTextPipeline(Pipeline):
             num_samples=None,
             items_to_descriptions={})
 
-        dataset_target = None
-        if len(self.target_files) > 0:
-            decoder_target = SplitTokensDecoder(
-                tokens_feature_name='target_tokens',
-                length_feature_name='target_len',
-                prepend_token='SEQUENCE_START',
-                append_token='SEQUENCE_END',
-                delimiter=self.target_delimiter)
-
-            dataset_target = Dataset(
-                data_sources=self.target_files,
-                reader=tf.TextLineReader,
-                decoder=decoder_target,
-                num_samples=None,
-                items_to_descriptions={})
+        if len(self.target_files) == 0:
+            return [dataset_source]
 
-        return ParallelDatasetProvider(
-            dataset_source=dataset_source,
-            dataset_target=dataset_target,
-            shuffle=self.shuffle,
-            num_epochs=self.num_epochs,
-            **kwargs)
+        decoder_target = SplitTokensDecoder(
+            tokens_feature_name='target_tokens',
+            length_feature_name='target_len',
+            prepend_token='SEQUENCE_START',
+            append_token='SEQUENCE_END',
+            delimiter=self.target_delimiter)
+
+        dataset_target = Dataset(
+            data_sources=self.target_files,
+            reader=tf.TextLineReader,
+            decoder=decoder_target,
+            num_samples=None,
+            items_to_descriptions={})
+
+        return [dataset_source, dataset_target]
+
+    def get_length_histogram(self):
+        """See base class. The source files are read in a streaming pass."""
+        # The source tokens are followed by `SEQUENCE_END`
+        return get_text_length_histogram(self.source_files, delimiter=self.source_delimiter,
+                                         num_special_tokens=1)
 
     @property
     def feature_keys(self):
@@ -259,6 +348,11 @@ class TFRecordSourceSequencePipeline(Pipeline):
         """Creates DataProvider instance for this input pipeline. Additional keyword arguments
         are passed to the DataProvider.
         """
+        return DatasetDataProvider(dataset=self.make_datasets()[0], shuffle=self.shuffle,
+                                   num_epochs=self.num_epochs, **kwargs)
+
+    def make_datasets(self):
+        """See base class."""
         splitter_source = SplitTokensDecoder(
             tokens_feature_name='source_tokens',
             length_feature_name='source_len',
@@ -300,8 +394,14 @@ class TFRecordSourceSequencePipeline(Pipeline):
 
         dataset = Dataset(data_sources=self.files, reader=tf.TFRecordReader, decoder=decoder)
 
-        return DatasetDataProvider(dataset=dataset, shuffle=self.shuffle,
-                                   num_epochs=self.num_epochs, **kwargs)
+        return [dataset]
+
+    def get_length_histogram(self):
+        """See base class. The lengths are read from the TFRecord indexes if they have them."""
+        # The source tokens are followed by `SEQUENCE_END`
+        return get_tfrecord_length_histogram(self.files, self.source_field,
+                                             delimiter=self.source_delimiter,
+                                             num_special_tokens=1)
 
     @property
     def feature_keys(self):
@@ -347,6 +447,14 @@ class ImageCaptioningPipeline(Pipeline):
         """Creates DataProvider instance for this input pipeline. Additional keyword arguments
         are passed to the DataProvider.
         """
+        return DatasetDataProvider(
+            dataset=self.make_datasets()[0],
+            shuffle=self.shuffle,
+            num_epochs=self.num_epochs,
+            **kwargs)
+
+    def make_datasets(self):
+        """See base class."""
         context_keys_to_features = {
             self.image_field: tf.FixedLenFeature(
                 [], dtype=tf.string),
@@ -383,11 +491,7 @@ class ImageCaptioningPipeline(Pipeline):
             num_samples=None,
             items_to_descriptions={})
 
-        return DatasetDataProvider(
-            dataset=dataset,
-            shuffle=self.shuffle,
-            num_epochs=self.num_epochs,
-            **kwargs)
+        return [dataset]
 
     @property
     def feature_keys(self):
@@ -1,11 +1,118 @@
 # -*- coding: utf-8 -*-
 from __future__ import absolute_import, division, print_function
 
-from six.moves import xrange
+import itertools
 
 import numpy as np
 
 
+def _check_padding_and_truncating(padding, truncating):
+    if truncating not in ('pre', 'post'):
+        raise ValueError('Truncating type "%s" not understood' % truncating)
+    if padding not in ('pre', 'post'):
+        raise ValueError('Padding type "%s" not understood' % padding)
+
+
+def sequences_to_ragged(sequences, maxlen=None, dtype='int32', truncating='pre'):
+    """Converts sequences to a ragged representation, a flat buffer of the concatenated
+    sequences and the row splits, i.e. the start and end offsets of the sequences.
+
+    The sequence `i` is `values[row_splits[i]:row_splits[i + 1]]`.
+
+    Args:
+        sequences: list of lists where each element is a sequence.
+        maxlen: int, if provided, sequences longer than maxlen are truncated to maxlen.
+        dtype: type of the values.
+        truncating: 'pre' or 'post', remove values from sequences larger than
+            maxlen either in the beginning or in the end of the sequence.
+
+    Returns:
+        values: `numpy array` with dimensions (total_length,) + sample_shape.
+        row_splits: `numpy array` with dimensions (number_of_sequences + 1,).
+
+    Raises:
+        ValueError: in case of invalid values for `truncating`,
+            or in case of invalid shape for a `sequences` entry.
+
+    Examples:
+        >>> values, row_splits = sequences_to_ragged([[1, 1, 1], [2], [3, 3]])
+        ... [1 1 1 2 3 3], [0 3 4 6]
+    """
+    _check_padding_and_truncating('pre', truncating)
+    lengths = np.fromiter((len(s) for s in sequences), dtype=np.int64, count=len(sequences))
+    total_length = int(lengths.sum())
+
+    # take the sample shape from the first non empty sequence
+    sample_shape = tuple()
+    non_empty = np.flatnonzero(lengths)
+    if non_empty.size:
+        sample_shape = np.asarray(sequences[non_empty[0]][0]).shape
+
+    if not sample_shape:
+        values = np.fromiter(itertools.chain.from_iterable(sequences), dtype=dtype,
+                             count=total_length)
+    else:
+        values = np.empty((0,) + sample_shape, dtype=dtype)
+        if non_empty.size:
+            try:
+                values = np.concatenate([np.asarray(sequences[i], dtype=dtype)
+                                         for i in non_empty])
+            except ValueError:
+                values = None
+            if values is None or values.shape[1:] != sample_shape:
+                raise ValueError('The sequences have samples of different shapes, '
+                                 'expected shape %s' % (sample_shape,))
+
+    row_splits = np.zeros(len(sequences) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=row_splits[1:])
+
+    if maxlen is not None and lengths.size and lengths.max() > maxlen:
+        # positions of the values in their sequences
+        positions = np.arange(total_length) - np.repeat(row_splits[:-1], lengths)
+        if truncating == 'pre':
+            keep = positions >= np.repeat(lengths - maxlen, lengths)
+        else:
+            keep = positions < maxlen
+        values = values[keep]
+        row_splits[1:] = np.cumsum(np.minimum(lengths, maxlen))
+    return values, row_splits
+
+
+def ragged_to_padded(values, row_splits, maxlen=None, dtype='int32', padding='pre', value=0.):
+    """Pads a ragged representation of sequences, see `sequences_to_ragged`,
+    to a matrix in one scatter.
+
+    Args:
+        values: `numpy array`, the flat buffer of the concatenated sequences.
+        row_splits: `numpy array`, the start and end offsets of the sequences.
+        maxlen: int, maximum length, defaults to the length of the longest sequence.
+            The sequences must not be longer.
+        dtype: type to cast the resulting sequence.
+        padding: 'pre' or 'post', pad either before or after each sequence.
+        value: float, value to pad the sequences to the desired value.
+
+    Returns:
+        x: `numpy array` with dimensions (number_of_sequences, maxlen) + sample_shape
+    """
+    _check_padding_and_truncating(padding, 'pre')
+    values = np.asarray(values)
+    row_splits = np.asarray(row_splits)
+    lengths = np.diff(row_splits)
+    if maxlen is None:
+        maxlen = np.max(lengths)
+    if lengths.size and lengths.max() > maxlen:
+        raise ValueError('The sequences are longer than maxlen `%s`, '
+                         'truncate them first' % maxlen)
+
+    x = np.full((len(lengths), maxlen) + values.shape[1:], value).astype(dtype)
+    rows = np.repeat(np.arange(len(lengths)), lengths)
+    columns = np.arange(len(values)) - np.repeat(row_splits[:-1], lengths)
+    if padding == 'pre':
+        columns += np.repeat(maxlen - lengths, lengths)
+    x[rows, columns] = values
+    return x
+
+
 def pad_sequences(sequences, maxlen=None, dtype='int32', padding='pre', truncating='pre', value=0.):
     """Pads each sequence to the same length (length of the longest sequence).
     If maxlen is provided, any sequence longer
@@ -14,6 +121,9 @@ def pad_sequences(sequences, maxlen=None, dtype='int32', padding='pre', truncati
     the end of the sequence.
     Supports post-padding and pre-padding (default).
 
+    The sequences are concatenated in a flat buffer and scattered in the padded matrix
+    in one shot, see `sequences_to_ragged` to skip the padding.
+
     Args:
         sequences: list of lists where each element is a sequence.
         maxlen: int, maximum length.
@@ -40,51 +150,22 @@ def pad_sequences(sequences, maxlen=None, dtype='int32', padding='pre', truncati
         ...  [2 2 2 0 0]
         ...  [3 3 0 0 0]]
     """
-    lengths = [len(s) for s in sequences]
-
-    nb_samples = len(sequences)
+    _check_padding_and_truncating(padding, truncating)
     if maxlen is None:
-        maxlen = np.max(lengths)
-
-    # take the sample shape from the first non empty sequence
-    # checking for consistency in the main loop below.
-    sample_shape = tuple()
-    for s in sequences:
-        if len(s) > 0:
-            sample_shape = np.asarray(s).shape[1:]
-            break
-
-    x = (np.ones((nb_samples, maxlen) + sample_shape) * value).astype(dtype)
-    for idx, s in enumerate(sequences):
-        if not len(s):
-            continue  # empty list/array was found
-        if truncating == 'pre':
-            trunc = s[-maxlen:]
-        elif truncating == 'post':
-            trunc = s[:maxlen]
-        else:
-            raise ValueError('Truncating type "%s" not understood' % truncating)
-
-        # check `trunc` has expected shape
-        trunc = np.asarray(trunc, dtype=dtype)
-        if trunc.shape[1:] != sample_shape:
-            raise ValueError(
-                'Shape of sample %s of sequence at position %s is different from expected shape %s' %
-                (trunc.shape[1:], idx, sample_shape))
-
-        if padding == 'post':
-            x[idx, :len(trunc)] = trunc
-        elif padding == 'pre':
-            x[idx, -len(trunc):] = trunc
-        else:
-            raise ValueError('Padding type "%s" not understood' % padding)
-    return x
+        maxlen = np.max([len(s) for s in sequences])
+    values, row_splits = sequences_to_ragged(
+        sequences, maxlen=maxlen, dtype=dtype, truncating=truncating)
+    return ragged_to_padded(values, row_splits, maxlen=maxlen, dtype=dtype, padding=padding,
+                            value=value)
 
 
-def process_sequences(sequences, end_token=0, pad_val=0, is_shorten=True, remain_end_id=False):
+def process_sequences(sequences, end_token=0, pad_val=0, is_shorten=True, remain_end_id=False,
+                      ragged=False):
     """Set all tokens(ids) after END token to the padding value, and then shorten (option) it to
     the maximum sequence length in this batch.
 
+    The END tokens are detected with an `argmax` over a boolean matrix of the padded sequences.
+
     Args:
         sequences: `numpy array` or `list of list` with token IDs.
             e.g. [[4,3,5,3,2,2,2,2], [5,3,9,4,9,2,2,3]]
@@ -92,6 +173,11 @@ def process_sequences(sequences, end_token=0, pad_val=0, is_shorten=True, remain
         pad_val: `int`. replace the end_id and the ids after end_id to this value.
         is_shorten: `boolean`. Shorten the sequences.
         remain_end_id: `boolean`. Keep an end_id in the end.
+        ragged: `boolean`. If True, returns the ragged representation of the sequences,
+            `(values, row_splits)`, see `sequences_to_ragged`.
+
+    Returns:
+        A `numpy array` if `sequences` is a `numpy array`, a `list of list` otherwise.
 
     Examples:
     ```python
@@ -102,24 +188,44 @@ def process_sequences(sequences, end_token=0, pad_val=0, is_shorten=True, remain
     ... [[4, 3, 5, 3, 0], [5, 3, 9, 4, 9]]
     ```
     """
-    max_length = 0
-    for seq in sequences:
-        is_end = False
-        for i_token, token in enumerate(seq):
-            if token == end_token and not is_end:  # 1st time to see end_id
-                is_end = True
-                if max_length < i_token:
-                    max_length = i_token
-                if not remain_end_id:
-                    seq[i_token] = pad_val  # set end_id to pad_val
-            elif is_end:
-                seq[i_token] = pad_val
+    is_array = isinstance(sequences, np.ndarray)
+    if is_array:
+        lengths = np.full(len(sequences), sequences.shape[1] if sequences.ndim > 1 else 0)
+        padded = sequences.copy()
+    else:
+        # take the dtype from the first non empty sequence, as the sample shape
+        first_sequence = next((s for s in sequences if len(s)), [])
+        values, row_splits = sequences_to_ragged(sequences,
+                                                 dtype=np.asarray(first_sequence).dtype)
+        lengths = np.diff(row_splits)
+        padded = ragged_to_padded(values, row_splits, dtype=values.dtype, padding='post')
 
+    columns = np.arange(padded.shape[1])
+    is_end = (padded == end_token) & (columns < lengths[:, None])
+    has_end = is_end.any(axis=1)
+    # all the sequences can be empty
+    first_end = (np.argmax(is_end, axis=1) if is_end.shape[1]
+                 else np.zeros(len(padded), dtype=np.int64))
+
+    after_end = columns > first_end[:, None] if remain_end_id else columns >= first_end[:, None]
+    padded[after_end & has_end[:, None] & (columns < lengths[:, None])] = pad_val
+
+    # The sequences are shortened to the first END token of the sequences having one.
+    max_length = first_end[has_end].max() if has_end.any() else 0
     if remain_end_id:
         max_length += 1
     if is_shorten:
-        sequences = [seq[:max_length] for seq in sequences]
-    return sequences
+        lengths = np.minimum(lengths, max_length)
+        padded = padded[:, :max_length]
+
+    if ragged:
+        valid = columns[:padded.shape[1]] < lengths[:, None]
+        row_splits = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=row_splits[1:])
+        return padded[valid], row_splits
+    if is_array:
+        return padded
+    return [row[:length].tolist() for row, length in zip(padded, lengths)]
 
 
 def sequences_add_start_token(sequences, start_token=0, remove_last=False):
@@ -153,11 +259,9 @@ def sequences_get_mask(sequences, pad_val=0):
         ...  [1 1 1 1 1 0]]
         ```
     """
+    sequences = np.asarray(sequences)
     mask = np.ones_like(sequences)
-    for i_seq, seq in enumerate(sequences):
-        for i_token in xrange(len(seq) - 1, -1, -1):
-            if seq[i_token] == pad_val:
-                mask[i_seq, i_token] = 0
-            else:
-                break  # <-- exit the for loop, preprocess next sequence
+    # The trailing padding values, the padding values not followed by another value.
+    is_trailing_pad = np.logical_and.accumulate(sequences[:, ::-1] == pad_val, axis=1)[:, ::-1]
+    mask[is_trailing_pad] = 0
     return mask
@@ -1,8 +1,12 @@
 # -*- coding: utf-8 -*-
 from __future__ import absolute_import, division, print_function
 
+import numpy as np
 import tensorflow.contrib.learn as tflearn
 
+from polyaxon.processing.sequence import ragged_to_padded
+from polyaxon.processing.vocabulary import build_vocabulary, get_frozen_vocabulary
+
 
 class VocabularyProcessor(tflearn.preprocessing.VocabularyProcessor):
     """A mirror to tf.contrib.learn VocabularyProcessor.
@@ -13,10 +17,10 @@ class VocabularyProcessor(tflearn.preprocessing.VocabularyProcessor):
         max_document_length: Maximum length of documents.
             if documents are longer, they will be trimmed, if shorter - padded.
         min_frequency: Minimum frequency of words in the vocabulary.
-        vocabulary: CategoricalVocabulary object.
+        vocabulary: CategoricalVocabulary or FrozenVocabulary object.
 
     Attributes:
-        vocabulary: CategoricalVocabulary object.
+        vocabulary: CategoricalVocabulary or FrozenVocabulary object.
     """
 
     def __init__(self,
@@ -25,6 +29,7 @@ class VocabularyProcessor(tflearn.preprocessing.VocabularyProcessor):
                  vocabulary=None,
                  tokenizer_fn=None):
         super(VocabularyProcessor, self).__init__(max_document_length, min_frequency, vocabulary, tokenizer_fn)
+        self._frozen_vocabulary = None
 
     def fit(self, raw_documents, unused_y=None):
         """fit.
@@ -38,8 +43,31 @@ class VocabularyProcessor(tflearn.preprocessing.VocabularyProcessor):
         Returns:
             self
         """
+        self._frozen_vocabulary = None
         return super().fit(raw_documents, unused_y)
 
+    def fit_files(self, filenames, num_workers=None, chunk_size=64 * 1024 * 1024):
+        """fit_files.
+
+        Learn a frozen vocabulary of all tokens in text files, one document per line,
+        tokenized and counted in parallel, see `build_vocabulary`.
+
+        Args:
+            filenames: `list`. The text files.
+            num_workers: `int`. The number of processes, defaults to the number of cpus.
+            chunk_size: `int`. The size in bytes of the file ranges counted by a process.
+
+        Returns:
+            self
+        """
+        self._frozen_vocabulary = None
+        self.vocabulary_ = build_vocabulary(filenames,
+                                            min_frequency=self.min_frequency,
+                                            tokenizer_fn=self._tokenizer,
+                                            num_workers=num_workers,
+                                            chunk_size=chunk_size)
+        return self
+
     def fit_transform(self, raw_documents, unused_y=None):
         """fit_transform.
 
@@ -70,6 +98,38 @@ class VocabularyProcessor(tflearn.preprocessing.VocabularyProcessor):
         """
         return super().transform(raw_documents)
 
+    def transform_batch(self, raw_documents, ragged=False):
+        """transform_batch.
+
+        Transforms a batch of documents to word ids at once, the tokens of all the
+        documents are looked up in bulk in the frozen vocabulary, see `FrozenVocabulary.lookup`.
+
+        Args:
+            raw_documents: An iterable which yield either str or unicode.
+            ragged: If True, returns the ids as ragged values and row splits instead of a matrix.
+
+        Returns:
+            X: int32 [n_samples, max_document_length] Word-id matrix, padded with 0 like
+                `transform`, or the `(values, row_splits)` of the ids if `ragged`.
+        """
+        if getattr(self, '_frozen_vocabulary', None) is None:
+            self._frozen_vocabulary = get_frozen_vocabulary(self.vocabulary_)
+
+        tokens = []
+        lengths = []
+        for document_tokens in self._tokenizer(raw_documents):
+            document_tokens = document_tokens[:self.max_document_length]
+            tokens.extend(document_tokens)
+            lengths.append(len(document_tokens))
+
+        values = self._frozen_vocabulary.lookup(np.array(tokens, dtype=object))
+        row_splits = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=row_splits[1:])
+        if ragged:
+            return values, row_splits
+        return ragged_to_padded(values, row_splits, maxlen=self.max_document_length,
+                                padding='post')
+
     def reverse(self, documents):
         """reverse.
 
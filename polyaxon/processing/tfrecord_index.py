@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, print_function
+
+import io
+import struct
+
+import numpy as np
+import tensorflow as tf
+
+# A TFRecord is stored as: uint64 length, uint32 masked crc of length, data, uint32 masked crc.
+RECORD_HEADER_SIZE = 12
+RECORD_FOOTER_SIZE = 4
+
+INDEX_FILE_NAME_FORMAT = '{}.index'
+
+
+def get_index_filename(tfrecord_filename):
+    """Returns the name of the index sidecar of a TFRecord file."""
+    return INDEX_FILE_NAME_FORMAT.format(tfrecord_filename)
+
+
+def has_index(tfrecord_filename):
+    return tf.gfile.Exists(get_index_filename(tfrecord_filename))
+
+
+def write_index(index_filename, offsets, lengths, sequence_lengths=None):
+    """Writes an index of records as an int64 array of shape `[num_records, 2]`,
+    or `[num_records, 3]` with the sequence lengths.
+
+    Args:
+        index_filename: `str`. The name of the index file.
+        offsets: `list`. The byte offsets of the records in the TFRecord file.
+        lengths: `list`. The length of the records' data.
+        sequence_lengths: `list`. The length of the sequences of the records, if any.
+    """
+    columns = [offsets, lengths]
+    if sequence_lengths is not None:
+        columns.append(sequence_lengths)
+    index = np.stack([np.asarray(column, dtype=np.int64) for column in columns],
+                     axis=-1).reshape((-1, len(columns)))
+    buffer = io.BytesIO()
+    np.save(buffer, index)
+    with tf.gfile.GFile(index_filename, 'wb') as f:
+        f.write(buffer.getvalue())
+
+
+def read_index(tfrecord_filename):
+    """Reads the index sidecar of a TFRecord file.
+
+    Returns:
+        An int64 array of shape `[num_records, 2]` with the byte offset and
+        the data length of every record, and the sequence length as third column
+        if the records were indexed with their sequence lengths.
+    """
+    with tf.gfile.GFile(get_index_filename(tfrecord_filename), 'rb') as f:
+        return np.load(io.BytesIO(f.read()))
+
+
+def build_index(tfrecord_filename):
+    """Creates the index sidecar of an existing uncompressed TFRecord file.
+
+    Only the records' headers are read, the data is skipped.
+
+    Returns:
+        The index, see `read_index`.
+    """
+    offsets = []
+    lengths = []
+    with tf.gfile.GFile(tfrecord_filename, 'rb') as f:
+        offset = 0
+        while True:
+            header = f.read(RECORD_HEADER_SIZE)
+            if not header:
+                break
+            if len(header) < RECORD_HEADER_SIZE:
+                raise ValueError('Truncated record at offset {} in `{}`.'.format(
+                    offset, tfrecord_filename))
+            length = struct.unpack('<Q', header[:8])[0]
+            offsets.append(offset)
+            lengths.append(length)
+            offset += RECORD_HEADER_SIZE + length + RECORD_FOOTER_SIZE
+            f.seek(offset)
+
+    write_index(get_index_filename(tfrecord_filename), offsets, lengths)
+    return read_index(tfrecord_filename)
+
+
+def read_sequence_lengths(tfrecord_filename):
+    """Returns the sequence lengths of the records from the index sidecar,
+    None if the file has no index or the index has no sequence lengths.
+    """
+    if not has_index(tfrecord_filename):
+        return None
+    index = read_index(tfrecord_filename)
+    if index.shape[1] < 3:
+        return None
+    return index[:, 2]
+
+
+def count_records(tfrecord_filename):
+    """Returns the number of records of a TFRecord file, from its index if it has one."""
+    if has_index(tfrecord_filename):
+        return len(read_index(tfrecord_filename))
+    return sum(1 for _ in tf.python_io.tf_record_iterator(tfrecord_filename))
+
+
+def read_record(tfrecord_filename, i, index=None):
+    """Reads the record `i` of an indexed TFRecord file without reading the previous records.
+
+    Args:
+        tfrecord_filename: `str`. The name of the TFRecord file.
+        i: `int`. The index of the record.
+        index: The index of the file, read from the sidecar if not provided.
+
+    Returns:
+        The serialized record.
+    """
+    index = read_index(tfrecord_filename) if index is None else index
+    offset, length = index[i, 0], index[i, 1]
+    with tf.gfile.GFile(tfrecord_filename, 'rb') as f:
+        f.seek(int(offset) + RECORD_HEADER_SIZE)
+        return f.read(int(length))
+
+
+def read_records(tfrecord_filename, start=0, end=None, index=None):
+    """Yields the records `[start, end)` of an indexed TFRecord file.
+
+    The file is read from the byte offset of the record `start`, the previous records
+    are not read. The checksums of the records are not verified.
+
+    Args:
+        tfrecord_filename: `str`. The name of the TFRecord file.
+        start: `int`. The index of the first record.
+        end: `int`. The index after the last record, defaults to the number of records.
+        index: The index of the file, read from the sidecar if not provided.
+    """
+    index = read_index(tfrecord_filename) if index is None else index
+    end = len(index) if end is None else end
+    if start >= end:
+        return
+    with tf.gfile.GFile(tfrecord_filename, 'rb') as f:
+        f.seek(int(index[start, 0]))
+        for i in range(start, end):
+            header = f.read(RECORD_HEADER_SIZE)
+            length = int(index[i, 1])
+            if len(header) < RECORD_HEADER_SIZE or struct.unpack('<Q', header[:8])[0] != length:
+                raise ValueError('The record {} of `{}` does not match its index.'.format(
+                    i, tfrecord_filename))
+            yield f.read(length)
+            f.read(RECORD_FOOTER_SIZE)
+
+
+def get_record_ranges(tfrecord_filenames, num_shards, shard_index):
+    """Splits the records of TFRecord files into `num_shards` disjoint balanced ranges.
+
+    The records are considered in the order of the files, the ranges differ by
+    at most one record.
+
+    Args:
+        tfrecord_filenames: `list`. The TFRecord files.
+        num_shards: `int`. The number of shards, e.g. the number of workers.
+        shard_index: `int`. The index of the shard to return.
+
+    Returns:
+        A list of `(filename, start, end)` giving the records `[start, end)` of
+        each file belonging to the shard.
+    """
+    if not 0 <= shard_index < num_shards:
+        raise ValueError('`shard_index` must be in [0, {}), received `{}`'.format(
+            num_shards, shard_index))
+
+    counts = [count_records(filename) for filename in tfrecord_filenames]
+    total = sum(counts)
+    shard_start = shard_index * total // num_shards
+    shard_end = (shard_index + 1) * total // num_shards
+
+    ranges = []
+    file_start = 0
+    for filename, count in zip(tfrecord_filenames, counts):
+        start = max(shard_start, file_start)
+        end = min(shard_end, file_start + count)
+        if start < end:
+            ranges.append((filename, start - file_start, end - file_start))
+        file_start += count
+    return ranges
+
+
+class IndexedTFRecordWriter(object):
+    """A `TFRecordWriter` that writes the index sidecar of the records on close.
+
+    The sequence length of the records, e.g. the number of tokens, can be indexed
+    as well to compute the bucket boundaries of the data without reading it.
+
+    Args:
+        path: `str`. The name of the TFRecord file.
+        index_path: `str`. The name of the index file, defaults to `path.index`.
+    """
+    def __init__(self, path, index_path=None):
+        self._writer = tf.python_io.TFRecordWriter(path)
+        self._index_path = index_path or get_index_filename(path)
+        self._offsets = []
+        self._lengths = []
+        self._sequence_lengths = []
+        self._offset = 0
+
+    def write(self, record, sequence_length=None):
+        self._writer.write(record)
+        self._offsets.append(self._offset)
+        self._lengths.append(len(record))
+        if sequence_length is not None:
+            self._sequence_lengths.append(sequence_length)
+        self._offset += RECORD_HEADER_SIZE + len(record) + RECORD_FOOTER_SIZE
+
+    @property
+    def num_records(self):
+        return len(self._offsets)
+
+    def close(self):
+        self._writer.close()
+        if self._sequence_lengths and len(self._sequence_lengths) != len(self._offsets):
+            raise ValueError('The sequence length must be provided for all the records or none.')
+        write_index(self._index_path, self._offsets, self._lengths,
+                    sequence_lengths=self._sequence_lengths or None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,378 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, print_function
+
+import io
+import multiprocessing
+import re
+
+from collections import Counter
+from itertools import repeat
+
+import numpy as np
+import six
+import tensorflow as tf
+
+from six.moves import xrange
+
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
+
+# The tokenizer of `tf.contrib.learn` `VocabularyProcessor`.
+TOKENIZER_RE = re.compile(r"[A-Z]{2,}(?![a-z])|[A-Z][a-z]+(?=[A-Z])|[\'\w\-]+", re.UNICODE)
+
+
+def tokenizer(iterator):
+    """Tokenizer generator, the default tokenizer of `VocabularyProcessor`.
+
+    Args:
+        iterator: Input iterator with strings.
+
+    Yields:
+        array of tokens per each value in the input.
+    """
+    for value in iterator:
+        yield TOKENIZER_RE.findall(value)
+
+
+class FrozenVocabulary(object):
+    """An immutable array backed vocabulary, a replacement of a frozen `CategoricalVocabulary`.
+
+    The categories are stored in id order, the id 0 being the unknown token, text categories
+    as a utf-8 buffer with their offsets. A table of the ids sorted by category is used to look
+    categories up by binary search, and a hash index is built on demand for bulk lookups.
+    The vocabulary is saved as arrays, without pickling, and restores in milliseconds.
+
+    Use `from_categories` or `from_vocabulary` to create a vocabulary.
+
+    Args:
+        buffer: `bytes`. The concatenated utf-8 text categories.
+        offsets: `numpy array`. The start and end offsets of the text categories in `buffer`.
+        values: `numpy array`. The non text categories, if `buffer` is None.
+        sorted_ids: `numpy array`. The indices of the categories sorted by category.
+        frequencies: `numpy array`. The frequencies of the categories.
+        unknown_token: The unknown token, mapped to the id 0.
+    """
+    def __init__(self, buffer=None, offsets=None, values=None, sorted_ids=None,
+                 frequencies=None, unknown_token='<UNK>'):
+        self._buffer = buffer
+        self._offsets = offsets
+        self._values = values
+        self._sorted_ids = sorted_ids
+        self._frequencies = frequencies
+        self._unknown_token = unknown_token
+        self._categories = None
+        self._index = None
+        self._pandas_index = None
+
+    @classmethod
+    def from_categories(cls, categories, frequencies=None, unknown_token='<UNK>'):
+        """Creates a vocabulary of the `categories` in id order, the unknown token excluded."""
+        categories = list(categories)
+        if frequencies is None:
+            frequencies = np.zeros(len(categories), dtype=np.int64)
+        frequencies = np.asarray(frequencies, dtype=np.int64)
+
+        if all(isinstance(category, six.string_types) for category in categories):
+            encoded = [category.encode('utf-8') for category in categories]
+            offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+            np.cumsum([len(category) for category in encoded], out=offsets[1:])
+            sorted_ids = np.array(sorted(xrange(len(encoded)), key=encoded.__getitem__),
+                                  dtype=np.int64)
+            return cls(buffer=b''.join(encoded), offsets=offsets, sorted_ids=sorted_ids,
+                       frequencies=frequencies, unknown_token=unknown_token)
+
+        values = np.asarray(categories)
+        if values.dtype.kind in 'biuf':
+            sorted_ids = np.argsort(values, kind='mergesort')
+        else:
+            # Mixed categories are not comparable, they are only looked up in the hash index.
+            values = np.empty(len(categories), dtype=object)
+            values[:] = categories
+            sorted_ids = np.arange(len(categories))
+        return cls(values=values, sorted_ids=sorted_ids,
+                   frequencies=frequencies, unknown_token=unknown_token)
+
+    @classmethod
+    def from_vocabulary(cls, vocabulary):
+        """Freezes a `CategoricalVocabulary` into an array backed vocabulary with the same ids.
+        """
+        ids_to_categories = sorted((class_id, category)
+                                   for category, class_id in six.iteritems(vocabulary._mapping)
+                                   if class_id > 0)
+        categories = [category for _, category in ids_to_categories]
+        frequencies = [vocabulary._freq.get(category, 0) for category in categories]
+        return cls.from_categories(categories, frequencies, vocabulary._unknown_token)
+
+    @property
+    def is_text(self):
+        return self._buffer is not None
+
+    @property
+    def is_numeric(self):
+        return not self.is_text and self._values.dtype.kind in 'biuf'
+
+    def __len__(self):
+        """Returns total count of mappings. Including unknown token."""
+        return len(self._sorted_ids) + 1
+
+    def _get_category(self, i):
+        if self.is_text:
+            return self._buffer[self._offsets[i]:self._offsets[i + 1]].decode('utf-8')
+        return self._values[i]
+
+    @property
+    def categories(self):
+        """The `list` of categories in id order, the unknown token excluded."""
+        if self._categories is None:
+            if self.is_text:
+                text = self._buffer
+                self._categories = [text[start:end].decode('utf-8') for start, end in
+                                    zip(self._offsets[:-1].tolist(), self._offsets[1:].tolist())]
+            else:
+                self._categories = self._values.tolist()
+        return self._categories
+
+    @property
+    def frequencies(self):
+        """The frequencies of the categories in id order, the unknown token excluded."""
+        return self._frequencies
+
+    @property
+    def index(self):
+        """The hash index of the categories to their ids, built on first use."""
+        if self._index is None:
+            self._index = {category: i + 1 for i, category in enumerate(self.categories)}
+        return self._index
+
+    def lookup(self, categories):
+        """Returns the ids of an array of categories in bulk, 0 for unknown categories.
+
+        The categories are looked up in a `pandas.Index` hash table if pandas is installed,
+        otherwise in the hash index, numbers are looked up by binary search in the sorted table.
+
+        Args:
+            categories: `numpy array` or `list` of categories, of any shape.
+
+        Returns:
+            An int32 `numpy array` of ids with the shape of `categories`.
+        """
+        values = categories if isinstance(categories, np.ndarray) else np.asarray(categories)
+        flat_values = values.ravel()
+        if len(self._sorted_ids) == 0:
+            ids = np.zeros(len(flat_values), dtype=np.int64)
+        elif self.is_numeric and values.dtype.kind in 'biuf':
+            sorted_values = self._values[self._sorted_ids]
+            positions = np.minimum(np.searchsorted(sorted_values, flat_values),
+                                   len(sorted_values) - 1)
+            ids = self._sorted_ids[positions] + 1
+            ids[sorted_values[positions] != flat_values] = 0
+        elif pd is not None:
+            if self._pandas_index is None:
+                self._pandas_index = pd.Index(self.categories, dtype=object)
+            ids = self._pandas_index.get_indexer(flat_values) + 1
+        else:
+            ids = np.fromiter(six.moves.map(self.index.get, flat_values.tolist(), repeat(0)),
+                              dtype=np.int64, count=len(flat_values))
+        return ids.astype(np.int32).reshape(values.shape)
+
+    def freeze(self, freeze=True):
+        if not freeze:
+            raise ValueError('A `FrozenVocabulary` cannot be unfrozen.')
+
+    def get(self, category):
+        """Returns category's id in the vocabulary, 0 for unknown categories.
+
+        Without the hash index, the category is looked up by binary search in the sorted table.
+        """
+        if self._index is not None or not (self.is_text or self.is_numeric):
+            return self.index.get(category, 0)
+
+        if self.is_text:
+            if not isinstance(category, six.string_types):
+                return 0
+            key = category.encode('utf-8')
+            low, high = 0, len(self._sorted_ids)
+            while low < high:
+                middle = (low + high) // 2
+                i = self._sorted_ids[middle]
+                if self._buffer[self._offsets[i]:self._offsets[i + 1]] < key:
+                    low = middle + 1
+                else:
+                    high = middle
+            if low < len(self._sorted_ids) and self._get_category(self._sorted_ids[low]) == category:
+                return int(self._sorted_ids[low]) + 1
+            return 0
+
+        sorted_values = self._values[self._sorted_ids]
+        position = np.searchsorted(sorted_values, category)
+        if position < len(sorted_values) and sorted_values[position] == category:
+            return int(self._sorted_ids[position]) + 1
+        return 0
+
+    def add(self, category, count=1):
+        raise ValueError('A `FrozenVocabulary` cannot be updated.')
+
+    def reverse(self, class_id):
+        """Given class id reverse to original class name."""
+        if class_id == 0:
+            return self._unknown_token
+        return self._get_category(class_id - 1)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_categories'] = None
+        state['_index'] = None
+        state['_pandas_index'] = None
+        return state
+
+    def save(self, filename):
+        """Saves the vocabulary arrays into the given file.
+
+        Raises:
+            ValueError: if the categories are neither all text nor all numbers.
+        """
+        if not (self.is_text or self.is_numeric):
+            raise ValueError('Only vocabularies of text or numbers can be saved.')
+        arrays = {
+            'sorted_ids': self._sorted_ids,
+            'frequencies': self._frequencies,
+            'unknown_token': np.frombuffer(self._unknown_token.encode('utf-8'), dtype=np.uint8),
+        }
+        if self.is_text:
+            arrays['buffer'] = np.frombuffer(self._buffer, dtype=np.uint8)
+            arrays['offsets'] = self._offsets
+        else:
+            arrays['values'] = self._values
+        data = io.BytesIO()
+        np.savez(data, **arrays)
+        with tf.gfile.GFile(filename, 'wb') as f:
+            f.write(data.getvalue())
+
+    @classmethod
+    def restore(cls, filename):
+        """Restores the vocabulary from the given file."""
+        with tf.gfile.GFile(filename, 'rb') as f:
+            arrays = np.load(io.BytesIO(f.read()), allow_pickle=False)
+            unknown_token = arrays['unknown_token'].tobytes().decode('utf-8')
+            if 'buffer' in arrays:
+                return cls(buffer=arrays['buffer'].tobytes(), offsets=arrays['offsets'],
+                           sorted_ids=arrays['sorted_ids'], frequencies=arrays['frequencies'],
+                           unknown_token=unknown_token)
+            return cls(values=arrays['values'], sorted_ids=arrays['sorted_ids'],
+                       frequencies=arrays['frequencies'], unknown_token=unknown_token)
+
+
+def get_frozen_vocabulary(vocabulary):
+    """Returns the vocabulary if frozen, otherwise freezes it into a `FrozenVocabulary`."""
+    if isinstance(vocabulary, FrozenVocabulary):
+        return vocabulary
+    return FrozenVocabulary.from_vocabulary(vocabulary)
+
+
+def get_byte_ranges(filenames, chunk_size):
+    """Splits files into `(filename, start, end)` byte ranges of `chunk_size`."""
+    ranges = []
+    for filename in filenames:
+        size = tf.gfile.Stat(filename).length
+        for start in xrange(0, size, chunk_size):
+            ranges.append((filename, start, min(start + chunk_size, size)))
+    return ranges
+
+
+def _iter_range_lines(f, start, end):
+    """Yields the lines starting in the byte range `[start, end)` of a file."""
+    if start > 0:
+        # The line overlapping the start belongs to the previous range.
+        f.seek(start - 1)
+        position = start - 1 + len(f.readline())
+    else:
+        position = 0
+    while position < end:
+        line = f.readline()
+        if not line:
+            break
+        position += len(line)
+        yield line
+
+
+def _count_range(args):
+    """Counts the tokens of the lines of a byte range.
+
+    Returns:
+        The `Counter` of the tokens, and their first position as `(line, token)` indices.
+    """
+    filename, start, end, tokenizer_fn, unknown_token = args
+    counts = Counter()
+    first_positions = {}
+    with tf.gfile.GFile(filename, 'rb') as f:
+        documents = (line.decode('utf-8') for line in _iter_range_lines(f, start, end))
+        for line_index, tokens in enumerate(tokenizer_fn(documents)):
+            counts.update(tokens)
+            for token_index, token in enumerate(tokens):
+                if token not in first_positions:
+                    first_positions[token] = (line_index, token_index)
+    counts.pop(unknown_token, None)
+    return counts, first_positions
+
+
+def build_vocabulary(filenames, min_frequency=0, tokenizer_fn=None, num_workers=None,
+                     chunk_size=64 * 1024 * 1024, unknown_token='<UNK>'):
+    """Builds a `FrozenVocabulary` of the tokens of text files, one document per line.
+
+    The files are split into byte ranges, tokenized and counted in a pool of processes.
+    The ids are the ones of `VocabularyProcessor.fit` on the lines of the files: in order of
+    first occurrence, or, if `min_frequency`, in decreasing frequency order of the
+    tokens occurring more than `min_frequency` times.
+
+    Args:
+        filenames: `list`. The text files.
+        min_frequency: `int`. Minimum frequency of the tokens in the vocabulary.
+        tokenizer_fn: A function taking an iterator of documents and yielding their lists
+            of tokens, see `tokenizer`. It must be picklable if `num_workers` > 1.
+        num_workers: `int`. The number of processes, defaults to the number of cpus.
+        chunk_size: `int`. The size in bytes of the ranges counted by a process.
+        unknown_token: The unknown token, mapped to the id 0.
+
+    Returns:
+        A `FrozenVocabulary`.
+    """
+    tokenizer_fn = tokenizer_fn or tokenizer
+    ranges = get_byte_ranges(filenames, chunk_size)
+    tasks = [(filename, start, end, tokenizer_fn, unknown_token)
+             for filename, start, end in ranges]
+
+    num_workers = min(num_workers or multiprocessing.cpu_count(), max(len(tasks), 1))
+    if num_workers > 1:
+        pool = multiprocessing.Pool(num_workers)
+        try:
+            results = pool.imap(_count_range, tasks)
+            counts, first_positions = _merge_counts(results)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        counts, first_positions = _merge_counts(six.moves.map(_count_range, tasks))
+
+    if min_frequency > 0:
+        # Same order as `CategoricalVocabulary.trim`, by frequency then alphabetically.
+        tokens = sorted(sorted(counts), key=counts.__getitem__, reverse=True)
+        tokens = [token for token in tokens if counts[token] > min_frequency]
+    else:
+        tokens = sorted(counts, key=first_positions.__getitem__)
+    return FrozenVocabulary.from_categories(
+        tokens, [counts[token] for token in tokens], unknown_token=unknown_token)
+
+
+def _merge_counts(results):
+    """Merges the counts of the ranges, in order, the first positions become
+    `(range, line, token)` indices."""
+    counts = Counter()
+    first_positions = {}
+    for range_index, (range_counts, range_first_positions) in enumerate(results):
+        counts.update(range_counts)
+        for token, position in six.iteritems(range_first_positions):
+            if token not in first_positions:
+                first_positions[token] = (range_index,) + position
+    return counts, first_positions
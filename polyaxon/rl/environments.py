@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 from __future__ import absolute_import, division, print_function
 
+import multiprocessing
+
 from collections import namedtuple, OrderedDict
 
 import numpy as np
@@ -72,6 +74,8 @@ class GymEnvironment(Environment):
             else:
                 video_callable = (lambda x: x % monitor_video == 0)
             self._env = Monitor(self._env, directory, video_callable=video_callable, force=force)
+        # The action space doesn't change, avoid checking its type at every step.
+        self._is_box = isinstance(self._env.action_space, Box)
 
     def __str__(self):
         return 'OpenAIGym({})'.format(self._env_id)
@@ -91,9 +95,8 @@ class GymEnvironment(Environment):
     def step(self, action, state, return_spec=True):
         self._step()
         if isinstance(action, (list, np.ndarray)):
-            if isinstance(self._env.action_space, Discrete) or isinstance(action, (list, np.ndarray)):
-                action = action[0]
-        if isinstance(self._env.action_space, Box) and not isinstance(action, (list, np.ndarray)):
+            action = action[0]
+        if self._is_box and not isinstance(action, (list, np.ndarray)):
             action = list(action)
         next_state, reward, done, _ = self._env.step(action)
         if return_spec:
@@ -117,6 +120,160 @@ class GymEnvironment(Environment):
         return not isinstance(self._env.action_space, Discrete)
 
 
+def _environment_worker(connection, env_class, env_id, env_kwargs):
+    """Runs an environment in a subprocess and executes the commands sent by the parent."""
+    env = env_class(env_id, **env_kwargs)
+    try:
+        while True:
+            command, data = connection.recv()
+            if command == 'step':
+                action, state = data
+                connection.send(env.step(action, state, return_spec=False))
+            elif command == 'reset':
+                connection.send(env.reset(return_spec=False))
+            elif command == 'properties':
+                connection.send((env.num_states, env.num_actions, env.is_continuous))
+            elif command == 'close':
+                env.close()
+                break
+            else:
+                raise ValueError('Unknown command `{}`.'.format(command))
+    finally:
+        connection.close()
+
+
+class VectorEnvironment(Environment):
+    """Steps several copies of an environment together and returns batched `EnvSpec`s.
+
+    The agents act for all the copies with a single session run. The copies run either
+    in the current process, or each in its own subprocess so that they step in parallel.
+
+    The copies that are done are reset automatically, the `EnvSpec` returned by `step`
+    holds the transitions, and `states` the observations to act on at the next step.
+
+    Args:
+        env_id: `str`. The id of the environment.
+        num_envs: `int`. The number of copies of the environment.
+        use_processes: `bool`. Whether to run every copy in its own subprocess.
+        env_class: The `Environment` class to create, default `GymEnvironment`.
+        kwargs: extra arguments to pass to `env_class`.
+    """
+    def __init__(self, env_id, num_envs=4, use_processes=False, env_class=None, **kwargs):
+        super(VectorEnvironment, self).__init__(env_id=env_id)
+        env_class = env_class or GymEnvironment
+        self._num_envs = num_envs
+        self._use_processes = use_processes
+        self._states = None
+
+        if use_processes:
+            self._envs = None
+            self._connections = []
+            self._processes = []
+            for _ in range(num_envs):
+                connection, child_connection = multiprocessing.Pipe()
+                process = multiprocessing.Process(
+                    target=_environment_worker,
+                    args=(child_connection, env_class, env_id, kwargs))
+                process.daemon = True
+                process.start()
+                child_connection.close()
+                self._connections.append(connection)
+                self._processes.append(process)
+            self._connections[0].send(('properties', None))
+            self._properties = self._connections[0].recv()
+        else:
+            self._envs = [env_class(env_id, **kwargs) for _ in range(num_envs)]
+            self._properties = (
+                self._envs[0].num_states, self._envs[0].num_actions, self._envs[0].is_continuous)
+
+    def __str__(self):
+        return 'VectorEnvironment({}, {})'.format(self._env_id, self._num_envs)
+
+    def _run(self, command, data, indices):
+        """Executes a command on the copies at `indices`, in parallel when using processes."""
+        if self._use_processes:
+            for i, d in zip(indices, data):
+                self._connections[i].send((command, d))
+            return [self._connections[i].recv() for i in indices]
+
+        if command == 'step':
+            return [self._envs[i].step(*d, return_spec=False) for i, d in zip(indices, data)]
+        return [self._envs[i].reset(return_spec=False) for i in indices]
+
+    def close(self):
+        if self._closed:
+            return
+        if self._use_processes:
+            for connection in self._connections:
+                connection.send(('close', None))
+            for process in self._processes:
+                process.join()
+        else:
+            for env in self._envs:
+                env.close()
+        self._closed = True
+
+    def reset(self, return_spec=True):
+        self._reset()
+        indices = range(self._num_envs)
+        self._states = np.stack(self._run('reset', [None] * self._num_envs, indices))
+        if return_spec:
+            return EnvSpec(action=None,
+                           state=None,
+                           reward=np.zeros(self._num_envs),
+                           done=np.zeros(self._num_envs, dtype=np.bool_),
+                           next_state=self._states)
+        return self._states
+
+    def step(self, action, state, return_spec=True):
+        self._step()
+        action = np.asarray(action)
+        # Every copy receives a batch of one action, as if the agent acted only for it.
+        results = self._run(
+            'step',
+            [(action[i:i + 1], state[i]) for i in range(self._num_envs)],
+            range(self._num_envs))
+        next_state, reward, done = [np.asarray(values) for values in zip(*results)]
+
+        self._states = next_state.copy()
+        done_indices = np.flatnonzero(done)
+        if done_indices.size:
+            self._states[done_indices] = self._run(
+                'reset', [None] * done_indices.size, done_indices)
+
+        if return_spec:
+            return EnvSpec(
+                action=action, state=state, reward=reward, done=done, next_state=next_state)
+        return next_state, reward, done
+
+    def unstack(self, env_spec):
+        """Splits a batched `EnvSpec` into a list of `EnvSpec`s, one by copy."""
+        return [EnvSpec(*[None if value is None else value[i] for value in env_spec])
+                for i in range(self._num_envs)]
+
+    @property
+    def states(self):
+        """The observations to act on at the next step."""
+        return self._states
+
+    @property
+    def num_envs(self):
+        return self._num_envs
+
+    @property
+    def num_states(self):
+        return self._properties[0]
+
+    @property
+    def num_actions(self):
+        return self._properties[1]
+
+    @property
+    def is_continuous(self):
+        return self._properties[2]
+
+
 ENVIRONMENTS = OrderedDict([
     ('GymEnvironment', GymEnvironment),
+    ('VectorEnvironment', VectorEnvironment),
 ])
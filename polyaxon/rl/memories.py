@@ -1,16 +1,21 @@
 # -*- coding: utf-8 -*-
 from __future__ import absolute_import, division, print_function
 
-import random
+import json
+import os
 
 import numpy as np
 
-from collections import deque, OrderedDict
+from collections import OrderedDict
 
 
 class Memory(object):
     """Base Agent Memory class.
 
+    The memory is a columnar ring buffer: one preallocated array per spec key,
+    the dtype and shape of every column is inferred from the first step.
+    Inserting is O(1) and sampling gathers a batch with a single fancy index per key.
+
     Args:
         size: `int`. The size of the memory.
         batch_size: `int`. The batch size to return during the sampling.
@@ -18,21 +23,58 @@ class Memory(object):
     Attributes:
         _size: `int`. The size of the memory.
         _batch_size: `int`. The batch size to return during the sampling.
-        _memory: `deque`. Where to store the data.
+        _memory: `dict`. Where to store the data, a preallocated array by key.
         _counter: `int`. Number of step stored up to size.
+        _index: `int`. The position where the next step will be stored.
         _spec: `list`. the list of keys corresponding to the data values stored each step.
     """
     def __init__(self, size=1000, batch_size=32):
         self._size = size
         self._batch_size = batch_size
-        self._memory = deque()
+        self._memory = None
         self._counter = 0
+        self._index = 0
         self._spec = None
 
+    def _create_memory(self, **kwargs):
+        self._memory = {}
+        for key in self._spec:
+            value = np.asarray(kwargs[key])
+            self._memory[key] = np.empty((self._size,) + value.shape, dtype=value.dtype)
+
+    def _store(self, position, **kwargs):
+        for key in kwargs:
+            value = np.asarray(kwargs[key])
+            column = self._memory[key]
+            if value.dtype != column.dtype and not np.can_cast(value.dtype, column.dtype):
+                # e.g. integer rewards followed by float rewards, upcast the column once.
+                column = self._promote_column(key, np.promote_types(column.dtype, value.dtype))
+                self._memory[key] = column
+            column[position] = value
+
+    def _promote_column(self, key, dtype):
+        return self._memory[key].astype(dtype)
+
+    def _get_position(self, i):
+        """Returns the position in the buffer of the i-th oldest step."""
+        if i < 0:
+            i += self._counter
+        if not 0 <= i < self._counter:
+            raise IndexError('Memory index out of range.')
+        return (self._index - self._counter + i) % self._size
+
+    def _get_ordered_positions(self):
+        """Returns the positions of the stored steps from the oldest to the newest."""
+        return (self._index - self._counter + np.arange(self._counter)) % self._size
+
+    def _gather(self, positions):
+        return {key: self._memory[key][positions] for key in self._spec}
+
     def get_by_index(self, i):
         if self._counter == 0:
             return None
-        return {key: self._memory[i][e] for e, key in enumerate(self._spec)}
+        position = self._get_position(i)
+        return {key: self._memory[key][position].copy() for key in self._spec}
 
     def can_sample(self, counter=None):
         if counter is None:
@@ -49,29 +91,41 @@ class Memory(object):
         else:
             self.check_step_values(**kwargs)
 
-        values = [kwargs[k] for k in self._spec]
+        if self._memory is None:
+            self._create_memory(**kwargs)
 
+        self._store(self._index, **kwargs)
+        self._index = (self._index + 1) % self._size
         if self._counter < self._size:
             self._counter += 1
-        else:
-            self._memory.popleft()
-
-        self._memory.append(values)
 
     def sample(self):
         if not self.can_sample():
             raise ValueError('Not enough data to sample.')
 
-        sample = {}
-        batch = random.sample(self._memory, self._batch_size)
-        for i, key in enumerate(self._spec):
-            sample[key] = np.array([b_step[i] for b_step in batch])
+        offsets = self._sample_offsets()
+        return self._gather((self._index - self._counter + offsets) % self._size)
 
-        return sample
+    def _sample_offsets(self):
+        """Samples `batch_size` distinct offsets of the stored steps, without replacement.
+
+        The duplicates of a uniform draw are drawn again, which is cheaper than a permutation
+        of the whole memory when the batch is small compared to the memory.
+        """
+        if 2 * self._batch_size > self._counter:
+            return np.random.permutation(self._counter)[:self._batch_size]
+
+        offsets = np.unique(np.random.randint(0, self._counter, size=self._batch_size))
+        while len(offsets) < self._batch_size:
+            offsets = np.unique(np.concatenate([
+                offsets,
+                np.random.randint(0, self._counter, size=self._batch_size - len(offsets))]))
+        np.random.shuffle(offsets)
+        return offsets
 
     def clear(self):
-        self._memory = deque()
         self._counter = 0
+        self._index = 0
 
 
 class BatchMemory(Memory):
@@ -83,15 +137,445 @@ class BatchMemory(Memory):
         if not self.can_sample():
             raise ValueError('Not enough data to sample.')
 
-        sample = {}
-        for i, key in enumerate(self._spec):
-            sample[key] = np.array([b_step[i] for b_step in self._memory])
-
+        sample = self._gather(self._get_ordered_positions())
         self.clear()
         return sample
 
 
+class FrameMemory(Memory):
+    """Memory storing every observation frame once.
+
+    Consecutive transitions share their observations, the `next_state` of a transition
+    is the `state` of the next one, and with stacked observations, e.g. the last 4 frames
+    of an atari game, every frame is part of several observations.
+    This memory stores every frame once in a shared ring of frames, and only keeps
+    for every transition the indices of the frames of its `state` and `next_state`,
+    the observations are rebuilt at sample time with a single gather.
+
+    When the ring of frames wraps around, the oldest transitions still referencing
+    the overwritten frames are evicted, so the number of frames should be a bit larger
+    than the size of the memory to account for the first observation of every episode.
+
+    Args:
+        size: `int`. The size of the memory.
+        batch_size: `int`. The batch size to return during the sampling.
+        history_length: `int`. The number of frames stacked in an observation
+            along its last axis, 1 if the observations are not stacked.
+        num_frames: `int`. The size of the ring of frames,
+            by default 10% larger than the memory size.
+        dtype: The dtype of the stored frames, e.g. `uint8` for images,
+            if `None` the dtype of the first observation is used.
+    """
+    FRAME_KEYS = ('next_state', 'state')
+
+    def __init__(self, size=1000, batch_size=32, history_length=1, num_frames=None,
+                 dtype=None):
+        super(FrameMemory, self).__init__(size, batch_size)
+        self._history_length = history_length
+        self._num_frames = num_frames or size + size // 10 + 2 * history_length
+        if self._num_frames <= 2 * history_length:
+            raise ValueError('`num_frames` must be larger than `2 * history_length`.')
+        self._dtype = dtype
+        self._frames = None
+        self._frame_index = 0
+
+    def _get_frames(self, observation):
+        """Splits an observation into `history_length` frames."""
+        observation = np.asarray(observation)
+        if self._history_length == 1:
+            return observation[np.newaxis]
+        return np.moveaxis(observation, -1, 0)
+
+    def _get_observations(self, frame_indices):
+        """Rebuilds observations from the frame indices of shape `[..., history_length]`."""
+        frames = self._frames[frame_indices]
+        history_axis = frame_indices.ndim - 1
+        if self._history_length == 1:
+            return np.squeeze(frames, axis=history_axis)
+        return np.moveaxis(frames, history_axis, -1)
+
+    def _create_memory(self, **kwargs):
+        if any(key not in self._spec for key in self.FRAME_KEYS):
+            raise KeyError('`FrameMemory` expects a `state` and a `next_state` at every step.')
+
+        frames = self._get_frames(kwargs['state'])
+        self._frames = np.empty((self._num_frames,) + frames.shape[1:],
+                                dtype=self._dtype or frames.dtype)
+        self._frame_index = 0
+        kwargs = dict(kwargs)
+        for key in self.FRAME_KEYS:
+            kwargs[key] = np.zeros(self._history_length, dtype=np.int64)
+        super(FrameMemory, self)._create_memory(**kwargs)
+
+    def _evict(self, frame_index):
+        """Evicts the oldest transitions referencing the frame at `frame_index`.
+
+        The frames of a transition are either shared with the previous transition or newer,
+        so only the oldest transitions can reference the oldest frame.
+        """
+        while self._counter > 0:
+            position = (self._index - self._counter) % self._size
+            if not (np.any(self._memory['state'][position] == frame_index) or
+                    np.any(self._memory['next_state'][position] == frame_index)):
+                break
+            self._counter -= 1
+
+    def _write_frames(self, frames):
+        indices = np.empty(len(frames), dtype=np.int64)
+        for i, frame in enumerate(frames):
+            self._evict(self._frame_index)
+            self._frames[self._frame_index] = frame
+            indices[i] = self._frame_index
+            self._frame_index = (self._frame_index + 1) % self._num_frames
+        return indices
+
+    def _store(self, position, **kwargs):
+        state_frames = self._get_frames(kwargs.pop('state')).astype(self._frames.dtype)
+        next_state_frames = self._get_frames(kwargs.pop('next_state')).astype(self._frames.dtype)
+
+        # The state is usually the next state of the previous transition.
+        state_indices = None
+        if self._counter > 0:
+            previous_indices = self._memory['next_state'][(position - 1) % self._size]
+            if np.array_equal(self._frames[previous_indices], state_frames):
+                state_indices = previous_indices.copy()
+        if state_indices is None:
+            state_indices = self._write_frames(state_frames)
+
+        # The next state usually shares all but its last frame with the state.
+        if np.array_equal(next_state_frames[:-1], state_frames[1:]):
+            next_state_indices = np.append(state_indices[1:],
+                                           self._write_frames(next_state_frames[-1:]))
+        else:
+            next_state_indices = self._write_frames(next_state_frames)
+
+        super(FrameMemory, self)._store(
+            position, state=state_indices, next_state=next_state_indices, **kwargs)
+
+    def _gather(self, positions):
+        sample = super(FrameMemory, self)._gather(positions)
+        for key in self.FRAME_KEYS:
+            sample[key] = self._get_observations(sample[key])
+        return sample
+
+    def get_by_index(self, i):
+        values = super(FrameMemory, self).get_by_index(i)
+        if values is not None:
+            for key in self.FRAME_KEYS:
+                values[key] = self._get_observations(values[key])
+        return values
+
+
+class SegmentTree(object):
+    """Array backed segment tree, used to store the priorities of a `PrioritizedMemory`.
+
+    The leaves are stored in the second half of the array and every internal node
+    holds the reduction of its two children, the root is at position 1.
+    Updates and queries are vectorized over batches of indices and are O(log n).
+
+    Args:
+        capacity: `int`. The number of leaves, rounded up to the next power of 2.
+        operation: `ufunc`. The reduction operation, e.g. `np.add` or `np.minimum`.
+        neutral_element: `float`. The neutral element of the operation.
+    """
+    def __init__(self, capacity, operation, neutral_element):
+        self._capacity = 1
+        while self._capacity < capacity:
+            self._capacity *= 2
+        self._operation = operation
+        self._values = np.full(2 * self._capacity, neutral_element, dtype=np.float64)
+
+    @property
+    def capacity(self):
+        return self._capacity
+
+    def __getitem__(self, indices):
+        return self._values[np.asarray(indices) + self._capacity]
+
+    def update(self, indices, values):
+        positions = np.asarray(indices, dtype=np.int64) + self._capacity
+        self._values[positions] = values
+        positions = np.unique(positions // 2)
+        # All the positions are at the same depth, walk up level by level until the root.
+        while positions[0] >= 1:
+            self._values[positions] = self._operation(self._values[2 * positions],
+                                                      self._values[2 * positions + 1])
+            positions = np.unique(positions // 2)
+
+    def reduce(self):
+        return self._values[1]
+
+
+class SumSegmentTree(SegmentTree):
+    def __init__(self, capacity):
+        super(SumSegmentTree, self).__init__(capacity, np.add, 0.)
+
+    def find_prefixsum_indices(self, prefixsums):
+        """Returns for every prefix sum the highest index `i` such that
+        `sum(values[:i]) <= prefixsum`, all the queries descend the tree together.
+        """
+        prefixsums = np.array(prefixsums, dtype=np.float64)
+        positions = np.ones(prefixsums.shape, dtype=np.int64)
+        while positions[0] < self._capacity:
+            left = 2 * positions
+            left_sums = self._values[left]
+            go_right = prefixsums >= left_sums
+            prefixsums = np.where(go_right, prefixsums - left_sums, prefixsums)
+            positions = np.where(go_right, left + 1, left)
+        return positions - self._capacity
+
+
+class MinSegmentTree(SegmentTree):
+    def __init__(self, capacity):
+        super(MinSegmentTree, self).__init__(capacity, np.minimum, np.inf)
+
+
+class PrioritizedMemory(Memory):
+    """Prioritized experience replay memory.
+
+    Transitions are sampled with a probability proportional to `priority ** alpha`,
+    using a stratified sampling over the sum of the priorities.
+    The samples returned contain, in addition to the spec keys, the `indices` of the
+    transitions, to be used with `update_priorities`, and the `importance_weights`
+    correcting the bias introduced by the prioritization.
+
+    New transitions get the maximum priority seen so far,
+    so that they are sampled at least once.
+
+    Args:
+        size: `int`. The size of the memory.
+        batch_size: `int`. The batch size to return during the sampling.
+        alpha: `float`. How much prioritization is used, 0 corresponds to uniform sampling.
+        beta: `float`. The importance sampling correction exponent, 1 fully compensates.
+        beta_increment: `float`. The value added to beta after each sample, up to 1.
+        epsilon: `float`. Small value added to the td errors to avoid zero priorities.
+
+    References:
+        Prioritized Experience Replay, Schaul et al. 2015.
+    """
+    def __init__(self, size=1000, batch_size=32, alpha=0.6, beta=0.4, beta_increment=0.,
+                 epsilon=1e-6):
+        super(PrioritizedMemory, self).__init__(size, batch_size)
+        self._alpha = alpha
+        self._beta = beta
+        self._beta_increment = beta_increment
+        self._epsilon = epsilon
+        self._max_priority = 1.
+        self._sum_tree = SumSegmentTree(size)
+        self._min_tree = MinSegmentTree(size)
+
+    def _set_priorities(self, positions, priorities):
+        priorities = np.asarray(priorities, dtype=np.float64) ** self._alpha
+        self._sum_tree.update(positions, priorities)
+        self._min_tree.update(positions, priorities)
+
+    def step(self, **kwargs):
+        position = self._index
+        super(PrioritizedMemory, self).step(**kwargs)
+        self._set_priorities([position], [self._max_priority])
+
+    def sample(self):
+        if not self.can_sample():
+            raise ValueError('Not enough data to sample.')
+
+        total = self._sum_tree.reduce()
+        segment = total / self._batch_size
+        prefixsums = (np.arange(self._batch_size) + np.random.uniform(size=self._batch_size))
+        positions = self._sum_tree.find_prefixsum_indices(prefixsums * segment)
+        # Rounding errors can descend into empty leaves.
+        positions = np.minimum(positions, self._counter - 1)
+
+        probabilities = self._sum_tree[positions] / total
+        min_probability = self._min_tree.reduce() / total
+        max_weight = (self._counter * min_probability) ** -self._beta
+        weights = (self._counter * probabilities) ** -self._beta / max_weight
+        self._beta = min(1., self._beta + self._beta_increment)
+
+        sample = self._gather(positions)
+        sample['indices'] = positions
+        sample['importance_weights'] = weights.astype(np.float32)
+        return sample
+
+    def update_priorities(self, indices, td_errors):
+        """Updates the priorities of the sampled transitions.
+
+        Args:
+            indices: `array`. The `indices` returned with the sample.
+            td_errors: `array`. The temporal difference errors of the sampled transitions.
+                If fewer td errors than indices are given, e.g. when the model uses the last
+                transition only as a target, the first indices are updated with their
+                td errors, and the remaining ones with the max priority, so they're sampled
+                again and get a td error.
+        """
+        td_errors = np.asarray(td_errors, dtype=np.float64).reshape(-1)
+        indices = np.asarray(indices)
+        priorities = np.abs(td_errors) + self._epsilon
+        self._max_priority = max(self._max_priority, np.max(priorities))
+        self._set_priorities(indices[:len(td_errors)], priorities)
+
+        target_indices = np.setdiff1d(indices[len(td_errors):], indices[:len(td_errors)])
+        if len(target_indices):
+            self._set_priorities(target_indices, [self._max_priority] * len(target_indices))
+
+    def clear(self):
+        super(PrioritizedMemory, self).clear()
+        self._max_priority = 1.
+        self._sum_tree = SumSegmentTree(self._size)
+        self._min_tree = MinSegmentTree(self._size)
+
+
+class MemmapMemory(Memory):
+    """Memory storing its columns in `np.memmap` files, for buffers that do not fit in RAM.
+
+    Every column is an `.npy` file under `directory`, the memory state (spec, counter and index)
+    is written by `flush` next to it, so that the memory can be restored with its content
+    when a new instance is created with the same directory, e.g. when resuming from a checkpoint.
+    Sampled positions are sorted and deduplicated before reading the columns,
+    so that every batch is read with ordered reads on disk.
+
+    Args:
+        size: `int`. The size of the memory.
+        batch_size: `int`. The batch size to return during the sampling.
+        directory: `str`. Where to store the memory files. If `None`, the agent using
+            this memory sets it to a `memory` directory under its `model_dir`.
+    """
+    META_FILENAME = 'memory.json'
+
+    def __init__(self, size=1000, batch_size=32, directory=None):
+        super(MemmapMemory, self).__init__(size, batch_size)
+        self._directory = None
+        if directory is not None:
+            self.directory = directory
+
+    @property
+    def directory(self):
+        return self._directory
+
+    @directory.setter
+    def directory(self, directory):
+        if self._memory is not None:
+            raise ValueError('Cannot change the directory of a memory already storing data.')
+        self._directory = directory
+        self._restore()
+
+    def _get_path(self, filename):
+        return os.path.join(self._directory, filename)
+
+    def _get_column_path(self, key):
+        return self._get_path('{}.npy'.format(key))
+
+    def _create_memory(self, **kwargs):
+        if self._directory is None:
+            raise ValueError('`directory` must be set before storing data in a `MemmapMemory`.')
+        if not os.path.exists(self._directory):
+            os.makedirs(self._directory)
+
+        self._memory = {}
+        for key in self._spec:
+            value = np.asarray(kwargs[key])
+            self._memory[key] = np.lib.format.open_memmap(
+                self._get_column_path(key), mode='w+', dtype=value.dtype,
+                shape=(self._size,) + value.shape)
+
+    def _promote_column(self, key, dtype):
+        path = self._get_column_path(key)
+        column = self._memory[key]
+        promoted_column = np.lib.format.open_memmap(
+            path + '.tmp', mode='w+', dtype=dtype, shape=column.shape)
+        promoted_column[:] = column
+        promoted_column.flush()
+        os.rename(path + '.tmp', path)
+        return promoted_column
+
+    def _gather(self, positions):
+        unique_positions, inverse = np.unique(positions, return_inverse=True)
+        return {key: np.asarray(self._memory[key][unique_positions])[inverse]
+                for key in self._spec}
+
+    def _restore(self):
+        meta_path = self._get_path(self.META_FILENAME)
+        if not os.path.exists(meta_path):
+            return
+
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta['size'] != self._size:
+            raise ValueError('The memory stored in `{}` has a size `{}`, '
+                             'received `{}`.'.format(self._directory, meta['size'], self._size))
+
+        self._spec = meta['spec']
+        self._counter = meta['counter']
+        self._index = meta['index']
+        self._memory = {key: np.lib.format.open_memmap(self._get_column_path(key), mode='r+')
+                        for key in self._spec}
+
+    def flush(self):
+        """Writes the columns and the memory state to disk."""
+        if self._memory is None:
+            return
+
+        for column in self._memory.values():
+            column.flush()
+
+        meta_path = self._get_path(self.META_FILENAME)
+        with open(meta_path + '.tmp', 'w') as f:
+            json.dump({'spec': self._spec,
+                       'size': self._size,
+                       'counter': self._counter,
+                       'index': self._index}, f)
+        os.rename(meta_path + '.tmp', meta_path)
+
+
+class PrioritizedMemmapMemory(MemmapMemory, PrioritizedMemory):
+    """Prioritized experience replay memory storing its columns in `np.memmap` files.
+
+    Only the priorities are kept in RAM, they are written by `flush` with the memory state.
+    See `MemmapMemory` and `PrioritizedMemory`.
+
+    Args:
+        size: `int`. The size of the memory.
+        batch_size: `int`. The batch size to return during the sampling.
+        alpha: `float`. How much prioritization is used, 0 corresponds to uniform sampling.
+        beta: `float`. The importance sampling correction exponent, 1 fully compensates.
+        beta_increment: `float`. The value added to beta after each sample, up to 1.
+        epsilon: `float`. Small value added to the td errors to avoid zero priorities.
+        directory: `str`. Where to store the memory files. If `None`, the agent using
+            this memory sets it to a `memory` directory under its `model_dir`.
+    """
+    PRIORITIES_FILENAME = 'priorities.npy'
+
+    def __init__(self, size=1000, batch_size=32, alpha=0.6, beta=0.4, beta_increment=0.,
+                 epsilon=1e-6, directory=None):
+        PrioritizedMemory.__init__(self, size=size, batch_size=batch_size, alpha=alpha,
+                                   beta=beta, beta_increment=beta_increment, epsilon=epsilon)
+        self._directory = None
+        if directory is not None:
+            self.directory = directory
+
+    def _restore(self):
+        super(PrioritizedMemmapMemory, self)._restore()
+        priorities_path = self._get_path(self.PRIORITIES_FILENAME)
+        if self._counter == 0 or not os.path.exists(priorities_path):
+            return
+
+        priorities = np.load(priorities_path)[:self._counter]
+        positions = np.arange(self._counter)
+        self._sum_tree.update(positions, priorities)
+        self._min_tree.update(positions, priorities)
+        self._max_priority = max(1., np.max(priorities) ** (1. / self._alpha))
+
+    def flush(self):
+        super(PrioritizedMemmapMemory, self).flush()
+        if self._counter > 0:
+            np.save(self._get_path(self.PRIORITIES_FILENAME),
+                    self._sum_tree[np.arange(self._counter)])
+
+
 MEMORIES = OrderedDict([
     ('Memory', Memory),
     ('BatchMemory', BatchMemory),
+    ('FrameMemory', FrameMemory),
+    ('PrioritizedMemory', PrioritizedMemory),
+    ('MemmapMemory', MemmapMemory),
+    ('PrioritizedMemmapMemory', PrioritizedMemmapMemory),
 ])
@@ -1,25 +1,137 @@
 # -*- coding: utf-8 -*-
 from __future__ import absolute_import, division, print_function
 
+from collections import deque
+
 import numpy as np
 
 
-class Stats(object):
-    """A class to collect episode rewards statistics"""
+class RunningStats(object):
+    """Running statistics of a stream of values, updated and queried in O(1).
+
+    The mean and the variance are computed with Welford's algorithm.
+    """
     def __init__(self):
-        self.rewards = []
-        self.max_reward = 0
-        self.avg_reward = 0
-        self.total_reward = 0
+        self.count = 0
+        self._total = 0.
+        self._mean = 0.
+        self._m2 = 0.
+        self._min = np.inf
+        self._max = -np.inf
+
+    def update(self, value):
+        value = float(value)
+        self.count += 1
+        self._total += value
+        delta = value - self._mean
+        self._mean += delta / self.count
+        self._m2 += delta * (value - self._mean)
+        self._min = min(self._min, value)
+        self._max = max(self._max, value)
+
+    def extend(self, values):
+        for value in values:
+            self.update(value)
+
+    def max(self):
+        return self._max if self.count else np.nan
+
+    def min(self):
+        return self._min if self.count else np.nan
+
+    def avg(self):
+        return self._mean if self.count else np.nan
+
+    def total(self):
+        return self._total
+
+    def variance(self):
+        return self._m2 / self.count if self.count else np.nan
+
+    def std(self):
+        return np.sqrt(self.variance())
+
+
+class Stats(RunningStats):
+    """A class to collect episode rewards statistics"""
+
+
+class WindowStats(object):
+    """Statistics of the last `window_size` values, updated and queried in O(1) amortized.
+
+    Used to track the statistics of the last episodes, e.g. the total rewards.
+    The minimum and maximum are maintained with monotonic queues, the mean and the variance
+    with Welford's algorithm, extended to remove the values leaving the window.
+
+    Args:
+        window_size: `int`. The number of values to keep.
+    """
+    def __init__(self, window_size=100):
+        if window_size <= 0:
+            raise ValueError("Must specify window_size > 0, given: {}".format(window_size))
+        self._window_size = window_size
+        self._values = deque()
+        self._total = 0.
+        self._mean = 0.
+        # The sum of the squared differences to the mean.
+        self._squared_deviations = 0.
+        self._max_values = deque()
+        self._min_values = deque()
+
+    @property
+    def window_size(self):
+        return self._window_size
+
+    @property
+    def count(self):
+        return len(self._values)
+
+    def update(self, value):
+        value = float(value)
+        if len(self._values) == self._window_size:
+            removed = self._values.popleft()
+            self._total -= removed
+            if self._values:
+                delta = removed - self._mean
+                self._mean -= delta / len(self._values)
+                self._squared_deviations -= delta * (removed - self._mean)
+            else:
+                self._mean = 0.
+                self._squared_deviations = 0.
+            if self._max_values[0] == removed:
+                self._max_values.popleft()
+            if self._min_values[0] == removed:
+                self._min_values.popleft()
+
+        self._values.append(value)
+        self._total += value
+        delta = value - self._mean
+        self._mean += delta / len(self._values)
+        self._squared_deviations += delta * (value - self._mean)
+        while self._max_values and self._max_values[-1] < value:
+            self._max_values.pop()
+        self._max_values.append(value)
+        while self._min_values and self._min_values[-1] > value:
+            self._min_values.pop()
+        self._min_values.append(value)
 
     def max(self):
-        return np.max(self.rewards)
+        return self._max_values[0] if self._values else np.nan
 
     def min(self):
-        return np.min(self.rewards)
+        return self._min_values[0] if self._values else np.nan
 
     def avg(self):
-        return np.mean(self.rewards)
+        return self._mean if self._values else np.nan
 
     def total(self):
-        return np.sum(self.rewards)
+        return self._total
+
+    def variance(self):
+        if not self._values:
+            return np.nan
+        # Rounding errors can leave a tiny negative sum for a constant window.
+        return max(self._squared_deviations, 0.) / len(self._values)
+
+    def std(self):
+        return np.sqrt(self.variance())
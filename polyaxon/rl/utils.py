@@ -141,33 +141,105 @@ def assert_global_counter(global_counter_tensor):
                         'scalar: {}'.format(global_counter_tensor.get_shape()))
 
 
-def get_cumulative_rewards(reward, done,  discount=0.99):
+def discounted_cumsum(values, done, discount, block_size=64):
+    """Computes the discounted cumulative sums of `values` with resets at episode ends.
+
+    `y_t = x_t + discount * y_{t+1}`, where `y_{t+1}` is replaced by 0 if `done_t`.
+
+    The recurrence is solved by blocks of `block_size` steps: every block is solved
+    in closed form with a single matrix product, and only the carries between blocks
+    are propagated sequentially, the discount powers are thus bounded by `block_size`.
+
+    Args:
+        values: `list` or `np.ndarray`. The values x_t of the passed episodes.
+        done: `list` or `np.ndarray`. The terminal states of the passed episodes.
+        discount: `float`. The discount factor.
+        block_size: `int`. The number of steps solved in closed form.
+
+    Returns:
+        `np.ndarray` of `float32`.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    done = np.asarray(done, dtype=np.bool_)
+    num_steps = values.shape[0]
+    if num_steps == 0 or discount == 0:
+        return values.astype(np.float32)
+
+    # Work on the reversed sequence, so that the recurrence goes forward in time.
+    num_blocks = -(-num_steps // block_size)
+    pad = num_blocks * block_size - num_steps
+    x = np.pad(values[::-1], (0, pad), mode='constant').reshape(num_blocks, block_size)
+    resets = np.pad(done[::-1], (0, pad), mode='constant').reshape(num_blocks, block_size)
+
+    # The contribution of x_j to y_s, in the same block, is discount^(s - j) if j <= s
+    # and there is no reset in (j, s], resets are counted within each block.
+    num_resets = np.cumsum(resets, axis=1)
+    steps = np.arange(block_size)
+    exponents = steps[:, None] - steps[None, :]
+    powers = discount ** np.maximum(exponents, 0)
+    connected = num_resets[:, :, None] == num_resets[:, None, :]
+    weights = np.where(connected & (exponents >= 0), powers, 0.)
+    local = np.einsum('bsj,bj->bs', weights, x)
+
+    # The contribution of the carry, i.e. the last value of the previous block.
+    carry_weights = np.where(num_resets == 0, discount ** (steps + 1.), 0.)
+    carries = np.zeros(num_blocks)
+    carry = 0.
+    for b in xrange(num_blocks):
+        carries[b] = carry
+        carry = local[b, -1] + carry_weights[b, -1] * carry
+
+    cumsum = (local + carry_weights * carries[:, None]).reshape(-1)[:num_steps]
+    return cumsum[::-1].astype(np.float32)
+
+
+def get_cumulative_rewards(reward, done, discount=0.99):
     """compute cumulative rewards R(s,a) (a.k.a. G(s,a) in Sutton '16)
 
     `R_t = r_t + gamma*r_{t+1} + gamma^2*r_{t+2} + ...`
 
-    The simple way to compute cumulative rewards is to iterate from last to first time tick
-    and compute R_t = r_t + gamma*R_{t+1} recurrently
+    The cumulative rewards are computed with `discounted_cumsum`, which solves
+    the recurrence R_t = r_t + gamma*R_{t+1} with resets at the end of every episode.
 
     Args:
-        reward: `list`. A list of immediate rewards r(s,a) for the passed episodes.
-        done: `list`. A list of terminal states for the passed episodes.
+        reward: `list` or `np.ndarray`. The immediate rewards r(s,a) for the passed episodes.
+        done: `list` or `np.ndarray`. The terminal states for the passed episodes.
         discount: `float`. The discount factor.
+
+    Returns:
+        `np.ndarray` of `float32`.
     """
-    if discount == 0:
-        return reward
+    return discounted_cumsum(reward, done, discount)
 
-    cumulative_rewards = []
-    cumulative_reward = 0
 
-    for r, d in zip(reward[::-1], done[::-1]):
-        if d:
-            cumulative_reward = 0.0
+def get_generalized_advantages(reward, value, done, discount=0.99, gae_lambda=0.95,
+                               last_value=0.):
+    """Computes the generalized advantage estimates GAE(gamma, lambda) (Schulman '15).
 
-        cumulative_reward = r + discount * cumulative_reward
-        cumulative_rewards.insert(0, cumulative_reward)
+    `A_t = delta_t + (gamma*lambda)*delta_{t+1} + ...`,
+    where `delta_t = r_t + gamma*V(s_{t+1}) - V(s_t)` and `V(s_{t+1}) = 0` if `done_t`.
 
-    return cumulative_rewards
+    Args:
+        reward: `list` or `np.ndarray`. The immediate rewards r(s,a) for the passed episodes.
+        value: `list` or `np.ndarray`. The value estimates V(s) for the passed episodes.
+        done: `list` or `np.ndarray`. The terminal states for the passed episodes.
+        discount: `float`. The discount factor.
+        gae_lambda: `float`. The bias/variance trade off of the estimates,
+            0 gives the one step TD errors, and 1 the discounted returns minus the values.
+        last_value: `float`. The value estimate used to bootstrap the last transition,
+            if it's not terminal.
+
+    Returns:
+        `tuple`: (advantages, returns), `np.ndarray`s of `float32`,
+            the returns are the targets of the value estimates: `advantages + value`.
+    """
+    reward = np.asarray(reward, dtype=np.float64)
+    value = np.asarray(value, dtype=np.float64)
+    done = np.asarray(done, dtype=np.bool_)
+    next_value = np.append(value[1:], last_value)
+    deltas = reward + discount * np.where(done, 0., next_value) - value
+    advantages = discounted_cumsum(deltas, done, discount * gae_lambda)
+    return advantages, (advantages + value).astype(np.float32)
 
 
 def conjugate_gradient(fn, b, iterations=50, residual_tolerance=1e-10):
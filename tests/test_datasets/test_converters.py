@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, print_function
+
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import tensorflow as tf
+
+from tensorflow.python.platform import test
+
+from polyaxon.datasets.converters import (
+    ImagesToTFExampleConverter,
+    JPEGPillowImageReader,
+    PNGPillowImageReader,
+    RawImageReader,
+    get_shard_filenames
+)
+from polyaxon.processing.data_decoders import RawImage
+from polyaxon.processing.tfrecord_index import (
+    count_records,
+    get_index_filename,
+    read_index,
+    read_record
+)
+
+
+class NumpyImageReadersTest(test.TestCase):
+    def setUp(self):
+        # A smooth image, the jpeg encoding loses little of it.
+        rows, columns = np.meshgrid(np.arange(8), np.arange(6), indexing='ij')
+        self.image = np.stack([rows * 30, columns * 40, rows * 10 + columns * 20],
+                              axis=-1).astype(np.uint8)
+
+    def test_png_pillow_reader(self):
+        reader = PNGPillowImageReader(shape=(8, 6, 3))
+        assert not reader.requires_session
+        encoded, image = reader.read(None, self.image)
+        assert np.array_equal(image, self.image)
+        with self.test_session():
+            self.assertAllEqual(tf.image.decode_png(encoded, channels=3).eval(), self.image)
+
+        # The grayscale images are encoded without their channel dimension.
+        gray_image = self.image[:, :, :1]
+        encoded, _ = PNGPillowImageReader().read(None, gray_image)
+        with self.test_session():
+            self.assertAllEqual(tf.image.decode_png(encoded, channels=1).eval(), gray_image)
+
+        with self.assertRaises(ValueError):
+            reader.read(None, gray_image)
+
+    def test_jpeg_pillow_reader(self):
+        reader = JPEGPillowImageReader(quality=100)
+        assert reader.get_config() == {'shape': None, 'quality': 100}
+        # Without chroma, the subsampling of the jpeg encoding has no effect.
+        gray_image = np.repeat(self.image[:, :, 2:], 3, axis=-1)
+        encoded, image = reader.read(None, gray_image,
+                                     processing_fn=lambda session, image: image[::-1])
+        assert np.array_equal(image, gray_image[::-1])
+        with self.test_session():
+            decoded = tf.image.decode_jpeg(encoded, channels=3).eval()
+        assert decoded.shape == gray_image.shape
+        assert np.abs(decoded.astype(np.int32) - image).mean() < 2
+
+    def test_raw_reader(self):
+        reader = RawImageReader(shape=(8, 6, 3))
+        encoded, image = reader.read(None, self.image.tolist())
+        assert image.dtype == np.uint8
+        assert len(encoded) == self.image.size
+        assert np.array_equal(np.frombuffer(encoded, dtype=np.uint8).reshape((8, 6, 3)),
+                              self.image)
+        with self.test_session():
+            decoded = RawImage(shape=(8, 6, 3)).tensors_to_item(
+                {'image/encoded': tf.constant(encoded)}).eval()
+        self.assertAllEqual(decoded, self.image)
+
+        # The images are copied in C order before the encoding.
+        encoded, _ = RawImageReader().read(None, np.asfortranarray(self.image))
+        assert np.array_equal(np.frombuffer(encoded, dtype=np.uint8).reshape((8, 6, 3)),
+                              self.image)
+
+
+class ImagesToTFExampleConverterTest(test.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.output_prefix = os.path.join(self.directory, 'data')
+        self.converter = ImagesToTFExampleConverter(
+            classes=['zero', 'one', 'two'], colorspace='grayscale', image_format='raw',
+            channels=1, height=2, width=2)
+        # The value of the pixels of an image is its index.
+        self.images = np.arange(24, dtype=np.uint8)[:, None, None, None] * np.ones(
+            (24, 2, 2, 1), dtype=np.uint8)
+        self.labels = np.arange(24) % 3
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_convert_sharded(self):
+        results = self.converter.convert_sharded(
+            self.output_prefix, self.images, self.labels, num_shards=3, num_workers=2)
+
+        shard_filenames = get_shard_filenames(self.output_prefix, 3)
+        assert results['files'] == [os.path.basename(f) for f in shard_filenames]
+        assert results['num_samples'] == [8, 8, 8]
+        for shard_filename in shard_filenames:
+            assert os.path.exists(get_index_filename(shard_filename))
+            assert len(read_index(shard_filename)) == 8
+        assert results['statistics']['num_images'] == 24
+
+        # The shards are balanced ranges of the images, in order.
+        example = tf.train.Example.FromString(read_record(shard_filenames[1], 0))
+        encoded = example.features.feature['image/encoded'].bytes_list.value[0]
+        assert encoded == self.images[8].tobytes()
+        assert not [f for f in os.listdir(self.directory) if f.endswith('.tmp')]
+
+    def test_convert_chunks(self):
+        def processing_fn(session, image):
+            # The odd images, the shards of the second worker, are slow to convert,
+            # the first worker finishes while the last tasks of the second are queued
+            # for longer than the timeout of the queue.
+            if image[0, 0, 0] % 2:
+                time.sleep(0.6)
+            return image
+
+        chunks = [(self.images[i:i + 8], self.labels[i:i + 8]) for i in range(0, 16, 8)]
+        results = self.converter.convert_chunks(
+            self.output_prefix, iter(chunks), num_shards=4, num_workers=2,
+            processing_fn=processing_fn, max_pending_chunks=1)
+
+        shard_filenames = get_shard_filenames(self.output_prefix, 4)
+        assert results['files'] == [os.path.basename(f) for f in shard_filenames]
+        assert results['num_samples'] == [4, 4, 4, 4]
+        assert [count_records(f) for f in shard_filenames] == [4, 4, 4, 4]
+        assert results['statistics']['num_images'] == 16
+        assert results['statistics']['class_histogram'] == {'0': 6, '1': 5, '2': 5}
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, print_function
+
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from tensorflow.python.platform import test
+
+from polyaxon import Modes
+from polyaxon.datasets.statistics import (
+    DatasetStatistics,
+    get_statistics_filename,
+    merge_shards_statistics,
+    write_statistics
+)
+from polyaxon.processing.image import Normalization
+
+
+class DatasetStatisticsTest(test.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        random = np.random.RandomState(0)
+        self.images = [random.randint(0, 256, size=(num_images, 4, 3, 3)).astype(np.uint8)
+                       for num_images in [5, 1, 8]]
+        self.labels = [random.randint(0, 4, size=len(images)) for images in self.images]
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write_shards(self):
+        shard_filenames = []
+        for i, (images, labels) in enumerate(zip(self.images, self.labels)):
+            statistics = DatasetStatistics()
+            for image, label in zip(images, labels):
+                statistics.update_image(image)
+                statistics.update_label(label)
+            shard_filename = os.path.join(self.directory, 'data-{}'.format(i))
+            write_statistics(get_statistics_filename(shard_filename), statistics)
+            shard_filenames.append(shard_filename)
+        return shard_filenames
+
+    def test_merge_shards_statistics(self):
+        statistics = merge_shards_statistics(self.write_shards())
+
+        pixels = np.concatenate(self.images).reshape((-1, 3)).astype(np.float64)
+        labels = np.concatenate(self.labels)
+        assert statistics['num_images'] == 14
+        assert statistics['num_pixels'] == len(pixels)
+        self.assertAllClose(statistics['channel_mean'], pixels.mean(axis=0))
+        self.assertAllClose(statistics['channel_std'], pixels.std(axis=0))
+        assert statistics['class_histogram'] == {
+            str(label): int(count) for label, count in zip(*np.unique(labels, return_counts=True))}
+
+        assert merge_shards_statistics(
+            [os.path.join(self.directory, 'data-0'), os.path.join(self.directory, 'other')]) is None
+
+    def test_to_dict_from_dict(self):
+        statistics = DatasetStatistics()
+        for image, label in zip(self.images[0], self.labels[0]):
+            statistics.update_image(image)
+            statistics.update_label(label)
+        for length in [3, 1, 3, 7]:
+            statistics.update_length('tokens', length)
+
+        values = json.loads(json.dumps(statistics.to_dict()))
+        assert values['length_histograms'] == {'tokens': [0, 1, 0, 2, 0, 0, 0, 1]}
+        restored = DatasetStatistics.from_dict(values)
+        assert restored.to_dict() == statistics.to_dict()
+        assert restored.class_histogram == statistics.class_histogram
+        assert all(isinstance(label, int) for label in restored.class_histogram)
+        assert restored.length_histograms == {'tokens': {1: 1, 3: 2, 7: 1}}
+
+        # The restored statistics are merged as the accumulated ones.
+        other = DatasetStatistics()
+        other.update_image(self.images[1][0])
+        self.assertAllClose(restored.merge(other).channel_std,
+                            statistics.merge(other).channel_std)
+
+        assert DatasetStatistics.from_dict(DatasetStatistics().to_dict()).channel_std is None
+
+    def test_normalization(self):
+        statistics = merge_shards_statistics(self.write_shards())
+        meta_data_file = os.path.join(self.directory, 'meta_data.json')
+        with open(meta_data_file, 'w') as f:
+            f.write(json.dumps({'statistics': {Modes.TRAIN: statistics}}))
+
+        images = self.images[0]
+        with self.test_session():
+            normalized = Normalization(Modes.TRAIN, meta_data_file=meta_data_file)(images).eval()
+        self.assertAllClose(normalized,
+                            (images - np.array(statistics['channel_mean'])) /
+                            np.array(statistics['channel_std']), rtol=1e-5, atol=1e-5)
+
+        pixels = np.concatenate(self.images).reshape((-1, 3))
+        self.assertAllClose(((pixels - np.array(statistics['channel_mean'])) /
+                             np.array(statistics['channel_std'])).std(axis=0), np.ones(3))
+
+        with self.assertRaises(ValueError):
+            Normalization(Modes.EVAL, meta_data_file=meta_data_file)
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, print_function
+
+import tempfile
+
+import numpy as np
+import tensorflow as tf
+
+from tensorflow.contrib.framework import load_variable
+from tensorflow.python.framework import ops
+from tensorflow.python.platform import test
+from tensorflow.python.training import monitored_session
+from tensorflow.python.training import training
+
+from polyaxon.estimators import Agent, AsyncAgent
+from polyaxon.estimators.estimator_spec import EstimatorSpec
+from polyaxon.libs.configs import RunConfig
+from polyaxon.rl.environments import EnvSpec, Environment
+from polyaxon.rl.memories import Memory
+
+
+class CounterEnvironment(Environment):
+    """Environment whose state counts the steps, done after `episode_length` steps."""
+    def __init__(self, env_id='counter', episode_length=5):
+        super(CounterEnvironment, self).__init__(env_id=env_id)
+        self._episode_length = episode_length
+        self._counter = 0
+
+    def close(self):
+        self._closed = True
+
+    def reset(self, return_spec=True):
+        self._counter = 0
+        return EnvSpec(action=None, state=None, reward=0, done=False, next_state=np.zeros(2))
+
+    def step(self, action, state, return_spec=True):
+        self._counter += 1
+        action = action[0] if isinstance(action, (list, np.ndarray)) else action
+        next_state = state + 1
+        return EnvSpec(action=action, state=state, reward=float(action),
+                       done=self._counter == self._episode_length, next_state=next_state)
+
+    @property
+    def num_states(self):
+        return 2
+
+    @property
+    def num_actions(self):
+        return 2
+
+    @property
+    def is_continuous(self):
+        return False
+
+
+def q_model_fn(features, labels, mode):
+    weights = tf.get_variable('weights', [2, 2], initializer=tf.zeros_initializer())
+    q_values = tf.matmul(features['state'], weights)
+    loss = tf.reduce_mean(tf.square(
+        tf.reduce_sum(q_values * tf.one_hot(labels['action'], 2), axis=1) - labels['reward']))
+    train_op = tf.train.GradientDescentOptimizer(0.01).minimize(
+        loss, global_step=training.get_global_step())
+    return EstimatorSpec(mode, predictions={'results': tf.argmax(q_values, axis=1)},
+                         loss=loss, train_op=train_op)
+
+
+class TestAsyncAgent(test.TestCase):
+    def test_train(self):
+        memory = Memory(size=100, batch_size=4)
+        agent = AsyncAgent(model_fn=q_model_fn, memory=memory, num_actors=2, sync_frequency=3,
+                           transitions_per_put=4, model_dir=tempfile.mkdtemp(),
+                           config=RunConfig())
+        agent.train(CounterEnvironment(), first_update=5, steps=10)
+
+        self.assertEqual(10, load_variable(agent.model_dir, ops.GraphKeys.GLOBAL_STEP))
+        # The learner only trains once the actors' transitions pushed the timestep.
+        self.assertGreater(load_variable(agent.model_dir, 'global_timestep'), 5)
+        assert memory.can_sample()
+        assert np.all(np.in1d(memory.sample()['action'], [0, 1]))
+
+
+class TestActFn(test.TestCase):
+    def setUp(self):
+        super(TestActFn, self).setUp()
+        self.agent = Agent(model_fn=q_model_fn, memory=Memory(), model_dir=tempfile.mkdtemp())
+        self.state = tf.placeholder(tf.float32, [None, 2], name='state')
+        weights = tf.get_variable('weights', initializer=[[1., 2.], [3., 4.]])
+        self.q_values = tf.matmul(self.state, weights)
+        self.actions = tf.argmax(self.q_values, axis=1)
+        self.states = np.array([[1., 0.], [-1., 0.5], [0., 2.]], dtype=np.float32)
+
+    def assert_act_fn(self, sess):
+        fetches = [self.q_values, self.actions]
+        act_fn = self.agent._get_act_fn(sess, self.state, fetches)
+        # The callable is reused as long as the session, the fetches and the batch size are.
+        assert self.agent._get_act_fn(sess, self.state, list(fetches)) is act_fn
+        for state in self.states:
+            q_values, actions = act_fn(state)
+            expected_q_values, expected_actions = sess.run(
+                fetches, feed_dict={self.state: [state]})
+            self.assertAllClose(q_values, expected_q_values)
+            self.assertAllEqual(actions, expected_actions)
+
+        # It's rebuilt when the fetches or the batch size change.
+        actions_fn = self.agent._get_act_fn(sess, self.state, [self.actions])
+        assert actions_fn is not act_fn
+        assert actions_fn(self.states[0])[0].tolist() == [1]
+        batch_fn = self.agent._get_act_fn(sess, self.state, fetches, batch_size=3)
+        assert batch_fn is not actions_fn
+        q_values, actions = batch_fn(self.states)
+        self.assertAllClose(q_values, sess.run(self.q_values, feed_dict={self.state: self.states}))
+        assert actions.tolist() == [1, 0, 1]
+
+    def test_session(self):
+        with self.test_session() as sess:
+            sess.run(tf.global_variables_initializer())
+            self.assert_act_fn(sess)
+
+    def test_monitored_session(self):
+        with monitored_session.MonitoredSession() as sess:
+            self.assert_act_fn(sess)
+            act_fn = self.agent._get_act_fn(sess, self.state, [self.actions])
+        # A new session gets a new callable.
+        with monitored_session.MonitoredSession() as sess:
+            new_act_fn = self.agent._get_act_fn(sess, self.state, [self.actions])
+            assert new_act_fn is not act_fn
+            assert new_act_fn(self.states[1])[0].tolist() == [0]
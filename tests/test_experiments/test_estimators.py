@@ -10,6 +10,7 @@ import six
 from google.protobuf import text_format
 
 from tensorflow.python.client import session
+from tensorflow.python.data.ops import dataset_ops
 from tensorflow.python.estimator import model_fn as model_fn_lib
 from tensorflow.contrib.framework import load_variable
 from tensorflow.python.estimator.export import export
@@ -24,10 +25,12 @@ from tensorflow.python.ops import array_ops
 from tensorflow.python.ops import check_ops
 from tensorflow.python.ops import control_flow_ops
 from tensorflow.python.ops import init_ops
+from tensorflow.python.ops import math_ops
 # from tensorflow.python.ops import lookup_ops
 from tensorflow.python.ops import metrics as metrics_lib
 from tensorflow.python.ops import parsing_ops
 from tensorflow.python.ops import state_ops
+from tensorflow.python.ops import variable_scope
 from tensorflow.python.ops import variables
 from tensorflow.python.ops.losses import losses
 from tensorflow.python.platform import gfile
@@ -35,6 +38,8 @@ from tensorflow.python.platform import test
 from tensorflow.python.platform import tf_logging as logging
 from tensorflow.python.saved_model import loader
 from tensorflow.python.saved_model import tag_constants
+from tensorflow.python.summary import summary
+from tensorflow.python.summary import summary_iterator
 from tensorflow.python.training import checkpoint_state_pb2
 from tensorflow.python.training import saver
 from tensorflow.python.training import saver_test_utils
@@ -311,6 +316,69 @@ class TestEstimatorTrain(test.TestCase):
         est.train(dummy_input_fn, max_steps=5)
         self.assertEqual(5, load_variable(est.model_dir, ops.GraphKeys.GLOBAL_STEP))
 
+    def test_iterations_per_loop(self):
+        model_fn_call_count = [0]
+
+        def _model_fn(features, labels, mode):
+            model_fn_call_count[0] += 1
+            return model_fn_global_step_incrementer(features, labels, mode)
+
+        est = Estimator(model_fn=_model_fn, config=RunConfig(iterations_per_loop=3))
+        est.train(dummy_input_fn, steps=7)
+        self.assertEqual(1, model_fn_call_count[0])
+        self.assertEqual(7, load_variable(est.model_dir, ops.GraphKeys.GLOBAL_STEP))
+        est.train(dummy_input_fn, max_steps=8)
+        self.assertEqual(8, load_variable(est.model_dir, ops.GraphKeys.GLOBAL_STEP))
+
+    def test_iterations_per_loop_stops_in_partial_loop(self):
+        def _input_fn():
+            features = dataset_ops.Dataset.range(100).batch(1).make_one_shot_iterator().get_next()
+            return {'x': features}, features
+
+        def _model_fn(features, labels, mode):
+            _ = labels
+            x = math_ops.to_float(features['x'][0])
+            total = variable_scope.get_variable('total', [],
+                                                initializer=init_ops.zeros_initializer())
+            summary.scalar('x', x)
+            summary.histogram('x_histogram', x)
+            return EstimatorSpec(
+                mode,
+                loss=x,
+                train_op=control_flow_ops.group(
+                    state_ops.assign_add(total, x),
+                    state_ops.assign_add(training.get_global_step(), 1)))
+
+        est = Estimator(model_fn=_model_fn,
+                        config=RunConfig(iterations_per_loop=3, save_summary_steps=1))
+        est.train(_input_fn, hooks=[training.StopAtStepHook(last_step=5)])
+        self.assertEqual(5, load_variable(est.model_dir, ops.GraphKeys.GLOBAL_STEP))
+        # Every step trained on the next batch: 0 + 1 + 2 + 3 + 4.
+        self.assertEqual(10., load_variable(est.model_dir, 'total'))
+
+        # The scalar summaries are saved for the last step of every loop, the others are dropped.
+        values = {}
+        for event_file in gfile.Glob(os.path.join(est.model_dir, 'events.out.tfevents*')):
+            for event in summary_iterator.summary_iterator(event_file):
+                for value in event.summary.value:
+                    values.setdefault(value.tag, []).append(value.simple_value)
+        self.assertIn('loss', values)
+        self.assertEqual(4., values['x'][-1])
+        self.assertNotIn('x_histogram', values)
+
+    def test_iterations_per_loop_rejects_spec_hooks(self):
+        def _model_fn_hooks(features, labels, mode):
+            _, _ = features, labels
+            return EstimatorSpec(
+                mode=mode,
+                loss=constant_op.constant(0.),
+                train_op=state_ops.assign_add(training.get_global_step(), 1),
+                training_hooks=[training.SessionRunHook()])
+
+        est = Estimator(model_fn=_model_fn_hooks, config=RunConfig(iterations_per_loop=3))
+        with self.assertRaisesRegexp(ValueError, 'iterations_per_loop'):
+            est.train(dummy_input_fn, steps=3)
+
     def test_checkpoint_contains_relative_paths(self):
         tmpdir = tempfile.mkdtemp()
         est = Estimator(model_dir=tmpdir, model_fn=model_fn_global_step_incrementer)
@@ -34,6 +34,31 @@ class TestSubgraph(tf.test.TestCase):
                 kwargs=[{'num_units': 12}])
             SubGraph.build_subgraph_modules(mode=plx.Modes.TRAIN, subgraph_config=config)
 
+    def test_stage_modules(self):
+        resize = plx.processing.image.Resize(mode=plx.Modes.TRAIN, height=8, width=8)
+        standardization = plx.processing.image.Standardization(mode=plx.Modes.TRAIN)
+        flip = plx.processing.image.Flip(mode=plx.Modes.TRAIN, is_random=True)
+        crop = plx.processing.image.RandomCrop(mode=plx.Modes.TRAIN, height=4, width=4)
+        subgraph = SubGraph(mode=plx.Modes.TRAIN, name='test',
+                            modules=[resize, standardization, flip, crop])
+
+        stage = SubGraph.ProcessingStage
+        assert subgraph.get_stage_modules() == [resize, standardization, flip, crop]
+        assert subgraph.get_stage_modules(stage.CACHEABLE) == [resize, standardization]
+        assert subgraph.get_stage_modules(stage.NON_CACHEABLE) == [flip, crop]
+
+        images = tf.placeholder(tf.float32, [16, 16, 3])
+        cached = subgraph(images, stage=stage.CACHEABLE)
+        self.assertEqual(cached.get_shape().as_list(), [8, 8, 3])
+        outputs = subgraph(cached, stage=stage.NON_CACHEABLE)
+        self.assertEqual(outputs.get_shape().as_list(), [4, 4, 3])
+
+        # Layers can have variables and end the cacheable modules
+        subgraph = SubGraph(mode=plx.Modes.TRAIN, name='test_layers', modules=[
+            plx.layers.Reshape(mode=plx.Modes.TRAIN, new_shape=[-1, 4]),
+            plx.layers.FullyConnected(mode=plx.Modes.TRAIN, num_units=2)])
+        assert len(subgraph.get_stage_modules(stage.CACHEABLE)) == 1
+
     def test_modules_get_scopes_outside_subgraph(self):
         m1 = plx.layers.FullyConnected(mode=plx.Modes.TRAIN, num_units=12)
         m2 = plx.layers.Dropout(mode=plx.Modes.TRAIN, keep_prob=0.5)
@@ -1,6 +1,9 @@
 # -*- coding: utf-8 -*-
 from __future__ import absolute_import, division, print_function
 
+import json
+import os
+
 from collections import OrderedDict
 
 import tensorflow as tf
@@ -24,11 +27,31 @@ class TestConfigs(tf.test.TestCase):
             ('evaluation_master', ''),
             ('model_dir', None),
             ('cluster_config', None),
+            ('iterations_per_loop', 1),
         ])
         config = plx.configs.RunConfig(**config_dict)
 
         assert config.to_dict() == config_dict
 
+    def test_run_config_worker_sharding(self):
+        tf_config = os.environ.pop('TF_CONFIG', None)
+        try:
+            assert plx.configs.RunConfig.get_worker_sharding() == (1, 0)
+
+            cluster = {'master': ['host0:2222'],
+                       'worker': ['host1:2222', 'host2:2222'],
+                       'ps': ['host3:2222']}
+            for task_type, index, expected in [('master', 0, (3, 0)),
+                                               ('worker', 1, (3, 2)),
+                                               ('ps', 0, (1, 0))]:
+                os.environ['TF_CONFIG'] = json.dumps(
+                    {'cluster': cluster, 'task': {'type': task_type, 'index': index}})
+                assert plx.configs.RunConfig.get_worker_sharding() == expected
+        finally:
+            os.environ.pop('TF_CONFIG', None)
+            if tf_config is not None:
+                os.environ['TF_CONFIG'] = tf_config
+
     def test_pipeline_config(self):
         config_dict = {'module': 'TFRecordImagePipeline',
                        'batch_size': 64,
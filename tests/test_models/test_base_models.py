@@ -73,6 +73,22 @@ class TestBaseModel(test.TestCase):
         for s_name in summaries_by_names.keys():
             assert 'Loss' in s_name
 
+    def test_build_loss_rejects_weights_of_callable_loss(self):
+        def custom_loss(y_true, y_pred):
+            losses = tf.squared_difference(y_true, y_pred)
+            return losses, tf.reduce_mean(losses)
+
+        model = BaseModel(plx.Modes.TRAIN, graph_fn=self.get_dummy_graph_fn(),
+                          loss_config=LossConfig(module=custom_loss),
+                          optimizer_config=OptimizerConfig(module='adadelta'),
+                          model_type=BaseModel.Types.REGRESSOR, eval_metrics_config=[],
+                          summaries=[], name='test')
+
+        results = tf.zeros([2, 1])
+        labels = tf.ones([2, 1])
+        with self.assertRaises(ValueError):
+            model._build_loss(results, None, labels, weights=tf.ones([2]))
+
     def test_build_gradients_summaries(self):
         x = {'x': tf.placeholder(tf.float32, [2, 89])}
         y = tf.constant([[1], [1]])
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, print_function
+
+import numpy as np
+import tensorflow as tf
+
+from tensorflow.python.platform import test
+
+from polyaxon.libs.utils import EPSILON
+from polyaxon.models.rl.trpo import conjugate_gradient, natural_gradient_step
+from polyaxon.rl.utils import conjugate_gradient as np_conjugate_gradient
+
+
+class TestNaturalGradientStep(test.TestCase):
+    def setUp(self):
+        # The hessian of a small quadratic, symmetric positive definite.
+        random = np.random.RandomState(0)
+        m = random.normal(size=(5, 5))
+        self.fisher = (m.dot(m.T) + np.eye(5)).astype(np.float32)
+        self.policy_gradient = random.normal(size=5).astype(np.float32)
+
+    def fisher_vector_product(self, tangents):
+        return tf.reshape(tf.matmul(self.fisher, tf.reshape(tangents, (-1, 1))), (-1,))
+
+    def test_conjugate_gradient(self):
+        b = -self.policy_gradient
+        for iterations in [1, 3, 20]:
+            expected = np_conjugate_gradient(lambda p: self.fisher.dot(p), b.copy(), iterations)
+            with self.test_session():
+                x = conjugate_gradient(self.fisher_vector_product, tf.constant(b),
+                                       tf.constant(iterations)).eval()
+            self.assertAllClose(x, expected, rtol=1e-3, atol=1e-4)
+        self.assertAllClose(x, np.linalg.solve(self.fisher, b), rtol=1e-3, atol=1e-4)
+
+    def test_natural_gradient_step(self):
+        cg_damping, cg_iterations, max_kl_divergence = 0.1, 10, 0.01
+
+        # The update of `TRPOAgent` when the conjugate gradient runs in python.
+        def fisher_vector_product(p):
+            return self.fisher.dot(p) + cg_damping * p
+
+        direction = np_conjugate_gradient(fisher_vector_product, -self.policy_gradient,
+                                          cg_iterations)
+        shs = 0.5 * direction.dot(fisher_vector_product(direction))
+        lagrange_multiplier = np.sqrt(shs / max_kl_divergence)
+        expected_update_step = direction / (lagrange_multiplier + EPSILON)
+        expected_improve_rate = (-self.policy_gradient.dot(direction) /
+                                 (lagrange_multiplier + EPSILON))
+
+        with self.test_session() as sess:
+            update_step, expected_improve = sess.run(natural_gradient_step(
+                tf.constant(self.policy_gradient), self.fisher_vector_product,
+                tf.constant(cg_damping), tf.constant(cg_iterations),
+                tf.constant(max_kl_divergence)))
+        self.assertAllClose(update_step, expected_update_step, rtol=1e-3, atol=1e-5)
+        self.assertAllClose(expected_improve, expected_improve_rate, rtol=1e-3)
+        # The step satisfies the kl divergence constraint of the quadratic.
+        self.assertAllClose(0.5 * update_step.dot(fisher_vector_product(update_step)),
+                            max_kl_divergence, rtol=1e-3)
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, print_function
+
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import tensorflow as tf
+
+from tensorflow.python.platform import test
+
+from polyaxon.processing.buckets import (
+    estimate_bucket_boundaries,
+    get_length_histogram,
+    get_padding_efficiency,
+    get_text_length_histogram,
+    get_tfrecord_length_histogram
+)
+from polyaxon.processing.tfrecord_index import IndexedTFRecordWriter
+
+
+class BucketsTest(test.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_get_length_histogram(self):
+        histogram = get_length_histogram([1, 3, 3])
+        assert np.array_equal(histogram, [0, 1, 0, 2])
+        assert np.array_equal(get_length_histogram([5], histogram), [0, 1, 0, 2, 0, 1])
+
+    def test_get_text_length_histogram(self):
+        filename = os.path.join(self.directory, 'source.txt')
+        with open(filename, 'w') as f:
+            f.write('a b c\nd  e\n\nf\n')
+
+        histogram = get_text_length_histogram([filename], delimiter=' ', num_special_tokens=1)
+        assert np.array_equal(histogram, [0, 1, 1, 1, 1])
+        histogram = get_text_length_histogram([filename], chunk_size=2)
+        assert np.array_equal(histogram, [1, 1, 0, 0, 1, 1])
+
+    def test_get_tfrecord_length_histogram(self):
+        filename = os.path.join(self.directory, 'data.tfrecord')
+        texts = [b'a b', b'c', b'd e f']
+        with tf.python_io.TFRecordWriter(filename) as writer:
+            for text in texts:
+                example = tf.train.Example(features=tf.train.Features(feature={
+                    'source': tf.train.Feature(bytes_list=tf.train.BytesList(value=[text]))}))
+                writer.write(example.SerializeToString())
+        histogram = get_tfrecord_length_histogram([filename], 'source', delimiter=' ')
+        assert np.array_equal(histogram, [0, 1, 1, 1])
+
+        # The lengths are read from the index
+        with IndexedTFRecordWriter(filename) as writer:
+            for i, text in enumerate(texts):
+                writer.write(text, sequence_length=10 * (i + 1))
+        histogram = get_tfrecord_length_histogram([filename], 'source')
+        assert np.flatnonzero(histogram).tolist() == [10, 20, 30]
+
+    def test_estimate_bucket_boundaries(self):
+        lengths = [5] * 100 + [6] * 100 + [50] * 100 + [52] * 100
+        histogram = get_length_histogram(lengths)
+        assert estimate_bucket_boundaries(histogram, batch_size=10, num_buckets=2) == [7]
+        assert estimate_bucket_boundaries(histogram, batch_size=10, num_buckets=1) == []
+        # Buckets must hold a batch
+        assert estimate_bucket_boundaries(histogram, batch_size=300, num_buckets=2) == []
+
+        boundaries = estimate_bucket_boundaries(histogram, batch_size=10, num_buckets=4)
+        assert boundaries == [6, 7, 51]
+
+    def test_get_padding_efficiency(self):
+        efficiency = get_padding_efficiency(tf.constant([1, 3]), tf.zeros((2, 4)))
+        with self.test_session():
+            self.assertAllClose(efficiency.eval(), 0.5)
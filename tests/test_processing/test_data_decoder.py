@@ -18,7 +18,7 @@ from tensorflow.python.ops import math_ops
 from tensorflow.python.ops import parsing_ops
 from tensorflow.python.platform import test
 
-from polyaxon.processing.data_decoders import TFExampleDecoder
+from polyaxon.processing.data_decoders import RawImage, TFExampleDecoder
 
 
 class TFExampleDecoderTest(test.TestCase):
@@ -669,3 +669,58 @@ class TFExampleDecoderTest(test.TestCase):
             bboxes = tf_bboxes.eval()
 
         self.assertAllClose(np_bboxes, bboxes)
+
+    def run_decode_batch(self, serialized_examples, image_shape, image_format):
+        decoder = TFExampleDecoder(
+            keys_to_features={
+                'image/encoded': tf.FixedLenFeature((), dtypes.string, default_value=''),
+                'image/format': tf.FixedLenFeature((), dtypes.string, default_value=image_format),
+                'image/class/label': tf.FixedLenFeature(
+                    [1], dtypes.int64, default_value=array_ops.zeros([1], dtype=dtypes.int64)),
+            },
+            items_to_handlers={
+                'image': tfexample_decoder.Image(shape=image_shape),
+                'label': tfexample_decoder.Tensor('image/class/label', shape=[]),
+            })
+        tf_images, tf_labels = decoder.decode_batch(
+            constant_op.constant(serialized_examples), ['image', 'label'])
+
+        with self.test_session():
+            return tf_images.eval(), tf_labels.eval()
+
+    def test_decode_batch(self):
+        image_shape = (2, 3, 3)
+        for image_format in ['raw', 'png']:
+            images = []
+            serialized_examples = []
+            for i in range(4):
+                image, serialized_example = self.generate_image(
+                    image_format=image_format, image_shape=image_shape)
+                example = example_pb2.Example.FromString(serialized_example)
+                example.features.feature['image/class/label'].CopyFrom(
+                    self._encode_int64_feature(np.array([i])))
+                images.append(image)
+                serialized_examples.append(example.SerializeToString())
+
+            decoded_images, decoded_labels = self.run_decode_batch(
+                serialized_examples, image_shape, image_format)
+            self.assertAllEqual(np.stack(images), decoded_images)
+            self.assertAllEqual([0, 1, 2, 3], decoded_labels)
+
+    def test_decode_raw_image(self):
+        image_shape = (2, 3, 3)
+        image, serialized_example = self.generate_image(
+            image_format='raw', image_shape=image_shape)
+        decoded_image = self.run_decode_example(
+            serialized_example, RawImage(shape=image_shape), image_format='raw')
+        self.assertAllEqual(image, decoded_image)
+
+        serialized_examples = [serialized_example, serialized_example]
+        decoder = TFExampleDecoder(
+            keys_to_features={
+                'image/encoded': tf.FixedLenFeature((), dtypes.string, default_value=''),
+            },
+            items_to_handlers={'image': RawImage(shape=image_shape)})
+        [tf_images] = decoder.decode_batch(constant_op.constant(serialized_examples), ['image'])
+        with self.test_session():
+            self.assertAllEqual(np.stack([image, image]), tf_images.eval())
@@ -16,8 +16,16 @@ from tensorflow.python.ops import image_ops
 from tensorflow.python.platform import gfile
 from tensorflow.python.platform import test
 
-from polyaxon.processing.data_decoders import TFExampleDecoder
-from polyaxon.processing.data_providers import Dataset, DatasetDataProvider
+from polyaxon.processing.data_decoders import SplitTokensDecoder, TFExampleDecoder
+from polyaxon.processing.data_providers import (
+    Dataset,
+    DatasetDataProvider,
+    estimate_cache_size,
+    get_cache_filename,
+    get_worker_data_sources,
+    make_aligned_records,
+    make_tf_dataset
+)
 
 
 def _resize_image(image, height, width):
@@ -104,5 +112,141 @@ class DatasetDataProviderTest(test.TestCase):
                 DatasetDataProvider(_create_tfrecord_dataset(dataset_dir), record_key='image')
 
 
+class MakeTFDatasetTest(test.TestCase):
+    def test_TFRecordDataset(self):
+        dataset_dir = tempfile.mkdtemp(prefix=os.path.join(self.get_temp_dir(), 'tfrecord_dataset'))
+
+        height = 300
+        width = 280
+
+        with self.test_session() as sess:
+            dataset = make_tf_dataset(
+                [_create_tfrecord_dataset(dataset_dir)], num_epochs=1,
+                processing_fn=lambda items: {
+                    'image': _resize_image(items['image'], height, width),
+                    'label': items['label']})
+            items = dataset.batch(4).make_one_shot_iterator().get_next()
+            image, label = sess.run([items['image'], items['label']])
+
+            self.assertListEqual([4, height, width, 3], list(image.shape))
+            self.assertListEqual([4, 1], list(label.shape))
+
+
+    def test_cache(self):
+        dataset_dir = tempfile.mkdtemp(prefix=os.path.join(self.get_temp_dir(), 'tfrecord_dataset'))
+
+        with self.test_session() as sess:
+            dataset = make_tf_dataset(
+                [_create_tfrecord_dataset(dataset_dir)], num_epochs=2, shuffle=False,
+                processing_fn=lambda items: {
+                    'image': _resize_image(items['image'], 10, 10),
+                    'label': items['label']},
+                cache=True,
+                augmentation_fn=lambda items: {
+                    'image': tf.image.random_flip_left_right(items['image']),
+                    'label': items['label']})
+            items = dataset.batch(100).make_one_shot_iterator().get_next()
+            image, label = sess.run([items['image'], items['label']])
+
+            # The second epoch is read from the cache in the same order
+            num_records = len(label) // 2
+            self.assertListEqual([2 * num_records, 10, 10, 3], list(image.shape))
+            self.assertAllEqual(label[:num_records], label[num_records:])
+
+    def test_aligned_files(self):
+        dataset_dir = tempfile.mkdtemp(prefix=os.path.join(self.get_temp_dir(), 'parallel'))
+        datasets = []
+        for prefix in ['source', 'target']:
+            filenames = []
+            for i in range(3):
+                filename = os.path.join(dataset_dir, '{}-{}'.format(prefix, i))
+                with gfile.GFile(filename, 'w') as f:
+                    f.write('\n'.join('{}{}'.format(i, j) for j in range(i + 2)))
+                filenames.append(filename)
+            decoder = SplitTokensDecoder(tokens_feature_name='{}_tokens'.format(prefix),
+                                         length_feature_name='{}_len'.format(prefix))
+            datasets.append(Dataset(data_sources=filenames, reader=tf.TextLineReader,
+                                    decoder=decoder))
+
+        with self.test_session() as sess:
+            records = make_aligned_records(
+                datasets, [dataset.data_sources for dataset in datasets], num_readers=3,
+                shuffle=True, seed=1)
+            source, target = records.batch(100).make_one_shot_iterator().get_next()
+            source, target = sess.run([source, target])
+            assert list(source) == list(target)
+
+            dataset = make_tf_dataset(datasets, num_epochs=1, num_readers=3, aligned_files=True)
+            items = dataset.padded_batch(100, dataset.output_shapes)
+            items = items.make_one_shot_iterator().get_next()
+            source, target = sess.run([items['source_tokens'], items['target_tokens']])
+            self.assertAllEqual(source, target)
+            assert len(source) == 9
+
+        with self.assertRaises(ValueError):
+            make_aligned_records(datasets, [datasets[0].data_sources[:2],
+                                            datasets[1].data_sources])
+
+    def test_get_cache_filename(self):
+        data = tf.data.Dataset.from_tensor_slices({
+            'image': tf.zeros([4, 32, 32, 3], dtype=tf.float32),
+            'label': tf.zeros([4], dtype=tf.int64)})
+        size = (32 * 32 * 3 * 4 + 8) * 1000
+        assert estimate_cache_size(data, num_samples=1000) == size
+        assert estimate_cache_size(data, num_samples=None) is None
+
+        assert get_cache_filename(data, 1000) == ''
+        assert get_cache_filename(data, 1000, memory_budget=100) == ''
+        cache_dir = tempfile.mkdtemp(prefix=os.path.join(self.get_temp_dir(), 'cache'))
+        filename = get_cache_filename(data, 1000, memory_budget=1, cache_dir=cache_dir)
+        assert filename.startswith(cache_dir)
+
+        # The cache files of the same data are shared, no directory is created per call.
+        filename = get_cache_filename(data, 1000, memory_budget=1, cache_dir=cache_dir,
+                                      cache_key='data-0')
+        assert os.path.dirname(filename) == cache_dir
+        num_files = len(os.listdir(cache_dir))
+        assert get_cache_filename(data, 1000, memory_budget=1, cache_dir=cache_dir,
+                                  cache_key='data-0') == filename
+        assert len(os.listdir(cache_dir)) == num_files
+        assert get_cache_filename(data, 1000, memory_budget=1, cache_dir=cache_dir,
+                                  cache_key='data-1') != filename
+        other_data = data.map(lambda items: {'image': items['image']})
+        assert get_cache_filename(other_data, 1000, memory_budget=1, cache_dir=cache_dir,
+                                  cache_key='data-0') != filename
+
+        # The files of an interrupted first epoch are removed, a complete cache is kept.
+        for suffix in ['.lockfile', '.data-00000-of-00001']:
+            open(filename + suffix, 'w').close()
+        assert get_cache_filename(data, 1000, memory_budget=1, cache_dir=cache_dir,
+                                  cache_key='data-0') == filename
+        assert not [f for f in os.listdir(cache_dir) if f.startswith(os.path.basename(filename))]
+        for suffix in ['.index', '.data-00000-of-00001']:
+            open(filename + suffix, 'w').close()
+        get_cache_filename(data, 1000, memory_budget=1, cache_dir=cache_dir, cache_key='data-0')
+        assert os.path.exists(filename + '.index')
+        assert os.path.exists(filename + '.data-00000-of-00001')
+
+        # Without a cache directory, every call writes a new cache.
+        assert (get_cache_filename(data, 1000, memory_budget=1, cache_key='data-0') !=
+                get_cache_filename(data, 1000, memory_budget=1, cache_key='data-0'))
+
+
+class WorkerShardingTest(test.TestCase):
+    def test_get_worker_data_sources(self):
+        dataset_dir = tempfile.mkdtemp(prefix=os.path.join(self.get_temp_dir(), 'sharded'))
+        filenames = [os.path.join(dataset_dir, 'data-{}'.format(i)) for i in range(5)]
+        for filename in filenames:
+            with gfile.GFile(filename, 'w') as f:
+                f.write('')
+
+        data_sources = os.path.join(dataset_dir, 'data-*')
+        shards = [get_worker_data_sources(data_sources, 2, i) for i in range(2)]
+        assert shards == [filenames[0::2], filenames[1::2]]
+
+        with self.assertRaises(ValueError):
+            get_worker_data_sources(data_sources, 6, 0)
+
+
 if __name__ == '__main__':
     test.main()
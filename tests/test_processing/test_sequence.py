@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, print_function
+
+import numpy as np
+
+from tensorflow.python.platform import test
+
+from polyaxon.processing.sequence import (
+    pad_sequences,
+    process_sequences,
+    ragged_to_padded,
+    sequences_get_mask,
+    sequences_to_ragged
+)
+
+
+class SequenceTest(test.TestCase):
+    def test_pad_sequences(self):
+        sequences = [[1, 1, 1, 1, 1], [2, 2, 2], [3, 3]]
+        assert np.array_equal(
+            pad_sequences(sequences, padding='post'),
+            [[1, 1, 1, 1, 1], [2, 2, 2, 0, 0], [3, 3, 0, 0, 0]])
+        assert np.array_equal(
+            pad_sequences(sequences, maxlen=3, value=-1),
+            [[1, 1, 1], [2, 2, 2], [-1, 3, 3]])
+        assert np.array_equal(
+            pad_sequences([[1, 2, 3, 4], []], maxlen=2, truncating='post'),
+            [[1, 2], [0, 0]])
+
+        padded = pad_sequences([np.ones((3, 2)), np.zeros((1, 2))], maxlen=2, dtype='float32')
+        assert padded.shape == (2, 2, 2)
+        assert np.array_equal(padded[1], [[0, 0], [0, 0]])
+
+        with self.assertRaises(ValueError):
+            pad_sequences(sequences, padding='middle')
+        with self.assertRaises(ValueError):
+            pad_sequences([np.ones((3, 2)), np.ones((2, 3))])
+
+    def test_ragged(self):
+        values, row_splits = sequences_to_ragged([[1, 1, 1], [2], [], [3, 3]])
+        assert np.array_equal(values, [1, 1, 1, 2, 3, 3])
+        assert np.array_equal(row_splits, [0, 3, 4, 4, 6])
+
+        values, row_splits = sequences_to_ragged([[1, 2, 3], [4]], maxlen=2)
+        assert np.array_equal(values, [2, 3, 4])
+        assert np.array_equal(row_splits, [0, 2, 3])
+        assert np.array_equal(ragged_to_padded(values, row_splits, padding='post'),
+                              [[2, 3], [4, 0]])
+        with self.assertRaises(ValueError):
+            ragged_to_padded(values, row_splits, maxlen=1)
+
+    def test_process_sequences(self):
+        sequences = [[4, 3, 5, 3, 2, 2, 2, 2], [5, 3, 9, 4, 9, 2, 2, 3]]
+        assert process_sequences(sequences, end_token=2) == [[4, 3, 5, 3, 0],
+                                                            [5, 3, 9, 4, 9]]
+        assert process_sequences(sequences, end_token=2, remain_end_id=True) == [
+            [4, 3, 5, 3, 2, 0], [5, 3, 9, 4, 9, 2]]
+        assert np.array_equal(
+            process_sequences(np.array(sequences), end_token=2, is_shorten=False),
+            [[4, 3, 5, 3, 0, 0, 0, 0], [5, 3, 9, 4, 9, 0, 0, 0]])
+
+        values, row_splits = process_sequences([[1, 2, 3], [4, 5, 6, 2]], end_token=2,
+                                               ragged=True)
+        assert np.array_equal(values, [1, 0, 0, 4, 5, 6])
+        assert np.array_equal(row_splits, [0, 3, 6])
+
+        # The dtype doesn't depend on an empty first sequence.
+        processed = process_sequences([[], [4, 2, 3]], end_token=2)
+        assert processed == [[], [4]]
+        assert isinstance(processed[1][0], int)
+        values, row_splits = process_sequences([[], [4, 2, 3]], end_token=2, ragged=True)
+        assert values.dtype.kind == 'i'
+        assert np.array_equal(row_splits, [0, 0, 1])
+        assert process_sequences([[], []], end_token=2) == [[], []]
+
+    def test_sequences_get_mask(self):
+        sequences = [[4, 0, 5, 3, 0, 0], [5, 3, 9, 4, 9, 0]]
+        assert np.array_equal(sequences_get_mask(sequences),
+                              [[1, 1, 1, 1, 0, 0], [1, 1, 1, 1, 1, 0]])
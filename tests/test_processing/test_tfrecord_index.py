@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, print_function
+
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import tensorflow as tf
+
+from tensorflow.python.platform import test
+
+from polyaxon.processing.tfrecord_index import (
+    IndexedTFRecordWriter,
+    build_index,
+    count_records,
+    get_index_filename,
+    get_record_ranges,
+    read_index,
+    read_record,
+    read_records,
+    read_sequence_lengths
+)
+
+
+class TFRecordIndexTest(test.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filenames = []
+        for i, num_records in enumerate([3, 0, 5]):
+            filename = os.path.join(self.directory, 'data_{}.tfrecord'.format(i))
+            with IndexedTFRecordWriter(filename) as writer:
+                for j in range(num_records):
+                    writer.write(self.get_record(i, j))
+            self.filenames.append(filename)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    @staticmethod
+    def get_record(i, j):
+        return tf.compat.as_bytes('record {} {}'.format(i, j) * (j + 1))
+
+    def test_index(self):
+        assert [count_records(filename) for filename in self.filenames] == [3, 0, 5]
+        records = list(tf.python_io.tf_record_iterator(self.filenames[2]))
+        for j, record in enumerate(records):
+            assert record == self.get_record(2, j)
+            assert read_record(self.filenames[2], j) == record
+
+        index = read_index(self.filenames[2])
+        tf.gfile.Remove(get_index_filename(self.filenames[2]))
+        assert count_records(self.filenames[2]) == 5
+        assert np.array_equal(build_index(self.filenames[2]), index)
+
+    def test_read_records(self):
+        records = [self.get_record(2, j) for j in range(5)]
+        assert list(read_records(self.filenames[2])) == records
+        assert list(read_records(self.filenames[2], 2, 4)) == records[2:4]
+        assert list(read_records(self.filenames[2], 4)) == records[4:]
+        assert list(read_records(self.filenames[2], 3, 3)) == []
+        assert list(read_records(self.filenames[1])) == []
+
+        # The records are read from the offsets of the index.
+        index = read_index(self.filenames[2])
+        index[3, 1] += 1
+        with self.assertRaises(ValueError):
+            list(read_records(self.filenames[2], 1, index=index))
+
+    def test_get_record_ranges(self):
+        ranges = [get_record_ranges(self.filenames, 3, i) for i in range(3)]
+        assert ranges == [
+            [(self.filenames[0], 0, 2)],
+            [(self.filenames[0], 2, 3), (self.filenames[2], 0, 2)],
+            [(self.filenames[2], 2, 5)],
+        ]
+        with self.assertRaises(ValueError):
+            get_record_ranges(self.filenames, 3, 3)
+
+    def test_sequence_lengths(self):
+        assert read_sequence_lengths(self.filenames[0]) is None
+        filename = os.path.join(self.directory, 'sequences.tfrecord')
+        with IndexedTFRecordWriter(filename) as writer:
+            for j in range(3):
+                writer.write(self.get_record(0, j), sequence_length=j + 1)
+        assert read_sequence_lengths(filename).tolist() == [1, 2, 3]
+        assert read_record(filename, 1) == self.get_record(0, 1)
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, print_function
+
+import os
+import pickle
+import shutil
+import tempfile
+
+import numpy as np
+
+from tensorflow.python.platform import test
+
+from polyaxon.processing.categorical import CategoricalProcessor, CategoricalVocabulary
+from polyaxon.processing.text import VocabularyProcessor
+from polyaxon.processing.vocabulary import FrozenVocabulary, build_vocabulary, tokenizer
+
+
+class VocabularyTest(test.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.documents = [
+            ['a b c', 'b c d', 'c d e a', 'a'],
+            ['f a', 'b g', 'c'],
+        ]
+        self.filenames = []
+        for i, documents in enumerate(self.documents):
+            filename = os.path.join(self.directory, 'text_{}.txt'.format(i))
+            with open(filename, 'w') as f:
+                f.write('\n'.join(documents) + '\n')
+            self.filenames.append(filename)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def get_vocabulary(self, min_frequency):
+        vocabulary = CategoricalVocabulary()
+        for tokens in tokenizer(sum(self.documents, [])):
+            for token in tokens:
+                vocabulary.add(token)
+        if min_frequency > 0:
+            vocabulary.trim(min_frequency)
+        vocabulary.freeze()
+        return vocabulary
+
+    def test_build_vocabulary(self):
+        for min_frequency in [0, 1, 2]:
+            expected = self.get_vocabulary(min_frequency)
+            for chunk_size in [1, 3, 1024]:
+                vocabulary = build_vocabulary(self.filenames, min_frequency=min_frequency,
+                                              num_workers=1, chunk_size=chunk_size)
+                assert len(vocabulary) == len(expected)
+                for token in 'abcdefgh':
+                    assert vocabulary.get(token) == expected.get(token)
+                for class_id in range(len(expected)):
+                    assert vocabulary.reverse(class_id) == expected.reverse(class_id)
+
+        vocabulary = build_vocabulary(self.filenames, num_workers=2, chunk_size=4)
+        assert vocabulary.categories == ['a', 'b', 'c', 'd', 'e', 'f', 'g']
+        assert vocabulary.frequencies.tolist() == [4, 3, 4, 2, 1, 1, 1]
+
+    def test_frozen_vocabulary(self):
+        vocabulary = FrozenVocabulary.from_vocabulary(self.get_vocabulary(0))
+        assert [vocabulary.get(token) for token in ['<UNK>', 'c', 'a', 'z']] == [0, 3, 1, 0]
+        with self.assertRaises(ValueError):
+            vocabulary.add('z')
+
+        filename = os.path.join(self.directory, 'vocabulary.npz')
+        vocabulary.save(filename)
+        restored = FrozenVocabulary.restore(filename)
+        assert restored.categories == vocabulary.categories
+        assert restored.frequencies.tolist() == vocabulary.frequencies.tolist()
+        assert restored.get('e') == 5
+        assert pickle.loads(pickle.dumps(restored)).get('g') == 7
+
+        numbers = FrozenVocabulary.from_categories([3, 1, 2])
+        assert [numbers.get(value) for value in [1, 2, 3, 4]] == [2, 3, 1, 0]
+        numbers.save(filename)
+        assert FrozenVocabulary.restore(filename).reverse(1) == 3
+
+    def test_lookup(self):
+        vocabulary = FrozenVocabulary.from_categories(['b', 'a', 'c'])
+        ids = vocabulary.lookup([['a', 'z'], ['c', 'b']])
+        assert ids.dtype == np.int32
+        assert ids.tolist() == [[2, 0], [3, 1]]
+        assert vocabulary.lookup(np.array([1, None, 'a'], dtype=object)).tolist() == [0, 0, 2]
+
+        numbers = FrozenVocabulary.from_categories([3, 1, 2])
+        assert numbers.lookup(np.array([1, 5, 3, 0])).tolist() == [2, 0, 1, 0]
+        assert FrozenVocabulary.from_categories([]).lookup(['a']).tolist() == [0]
+
+    def test_transform_batch(self):
+        documents = sum(self.documents, []) + ['a z b', '']
+        processor = VocabularyProcessor(3)
+        processor.fit(documents[:4])
+        expected = np.array(list(processor.transform(documents)))
+        assert np.array_equal(processor.transform_batch(documents), expected)
+        values, row_splits = processor.transform_batch(documents, ragged=True)
+        assert values.tolist() == [1, 2, 3, 2, 3, 4, 3, 4, 5, 1, 0, 1, 2, 0, 3, 1, 0, 2]
+        assert row_splits.tolist() == [0, 3, 6, 9, 10, 12, 14, 15, 18, 18]
+
+        x = np.array([['a', 1], ['b', 2], ['a', float('nan')], ['c', 1]], dtype=object)
+        for share in [False, True]:
+            processor = CategoricalProcessor(share=share)
+            processor.fit(x[:2])
+            expected = np.array(list(processor.transform(x)))
+            assert np.array_equal(processor.transform_batch(x), expected)
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, print_function
+
+import numpy as np
+
+from tensorflow.python.platform import test
+
+from polyaxon.rl.environments import Environment, VectorEnvironment
+
+
+class CounterEnvironment(Environment):
+    """Environment whose state counts the steps, done after `episode_length` steps."""
+    def __init__(self, env_id, episode_length=3):
+        super(CounterEnvironment, self).__init__(env_id=env_id)
+        self._episode_length = episode_length
+        self._counter = 0
+
+    def close(self):
+        self._closed = True
+
+    def reset(self, return_spec=True):
+        self._counter = 0
+        return np.zeros(2)
+
+    def step(self, action, state, return_spec=True):
+        self._counter += 1
+        next_state = state + action[0]
+        return next_state, float(self._counter), self._counter == self._episode_length
+
+    @property
+    def num_states(self):
+        return 2
+
+    @property
+    def num_actions(self):
+        return 2
+
+    @property
+    def is_continuous(self):
+        return False
+
+
+class TestVectorEnvironment(test.TestCase):
+    def _test_vector_environment(self, use_processes):
+        env = VectorEnvironment('counter', num_envs=3, use_processes=use_processes,
+                                env_class=CounterEnvironment)
+        assert env.num_envs == 3
+        assert env.num_states == 2
+        assert env.num_actions == 2
+        assert not env.is_continuous
+
+        env_spec = env.reset()
+        assert env_spec.next_state.shape == (3, 2)
+        assert not np.any(env_spec.done)
+
+        for step in range(1, 4):
+            states = env.states
+            env_spec = env.step(np.array([1, 2, 3]), states)
+            assert np.allclose(env_spec.state, states)
+            assert np.allclose(env_spec.next_state[:, 0], [step, 2 * step, 3 * step])
+            assert np.allclose(env_spec.reward, step)
+
+        # The episodes are done and the copies were reset.
+        assert np.all(env_spec.done)
+        assert np.allclose(env.states, 0)
+
+        env_specs = env.unstack(env_spec)
+        assert len(env_specs) == 3
+        assert env_specs[1].action == 2
+        assert np.allclose(env_specs[1].next_state, [6, 6])
+        env.close()
+
+    def test_in_process(self):
+        self._test_vector_environment(use_processes=False)
+
+    def test_in_subprocesses(self):
+        self._test_vector_environment(use_processes=True)
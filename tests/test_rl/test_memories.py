@@ -0,0 +1,293 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, print_function
+
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from tensorflow.python.platform import test
+
+from polyaxon.rl.memories import (
+    Memory,
+    BatchMemory,
+    FrameMemory,
+    PrioritizedMemory,
+    MemmapMemory,
+    PrioritizedMemmapMemory,
+    SumSegmentTree,
+    MinSegmentTree
+)
+
+
+def _step(memory, i, num_states=4):
+    memory.step(state=np.ones(num_states) * i,
+                action=i % 2,
+                reward=float(i),
+                done=i % 5 == 0,
+                next_state=np.ones(num_states) * (i + 1))
+
+
+class TestMemory(test.TestCase):
+    def test_step_and_get_by_index(self):
+        memory = Memory(size=10, batch_size=4)
+        assert memory.get_by_index(-1) is None
+        for i in range(3):
+            _step(memory, i)
+
+        assert memory._counter == 3
+        assert memory.get_by_index(0)['reward'] == 0.
+        assert memory.get_by_index(-1)['reward'] == 2.
+        assert np.allclose(memory.get_by_index(-1)['next_state'], np.ones(4) * 3)
+
+    def test_ring_buffer_overwrites_oldest(self):
+        memory = Memory(size=5, batch_size=2)
+        for i in range(12):
+            _step(memory, i)
+
+        assert memory._counter == 5
+        assert [memory.get_by_index(i)['reward'] for i in range(5)] == [7., 8., 9., 10., 11.]
+        assert memory.get_by_index(-1)['reward'] == 11.
+
+    def test_check_step_values(self):
+        memory = Memory(size=5, batch_size=2)
+        _step(memory, 0)
+        with self.assertRaises(KeyError):
+            memory.step(state=np.ones(4), action=1)
+
+    def test_upcasts_columns(self):
+        memory = Memory(size=5, batch_size=2)
+        memory.step(reward=1, done=False)
+        memory.step(reward=0.5, done=True)
+        assert memory.get_by_index(0)['reward'] == 1.
+        assert memory.get_by_index(1)['reward'] == 0.5
+
+    def test_sample(self):
+        memory = Memory(size=100, batch_size=8)
+        for i in range(5):
+            _step(memory, i)
+        assert not memory.can_sample()
+        with self.assertRaises(ValueError):
+            memory.sample()
+
+        for i in range(5, 150):
+            _step(memory, i)
+        assert memory.can_sample()
+        sample = memory.sample()
+        assert sorted(sample.keys()) == ['action', 'done', 'next_state', 'reward', 'state']
+        assert sample['state'].shape == (8, 4)
+        assert sample['reward'].shape == (8,)
+        assert np.all(sample['reward'] >= 50)
+        assert np.allclose(sample['state'][:, 0], sample['reward'])
+        assert np.allclose(sample['next_state'][:, 0], sample['reward'] + 1)
+
+
+    def test_sample_without_replacement(self):
+        memory = Memory(size=100, batch_size=8)
+        for i in range(10):
+            _step(memory, i)
+        for _ in range(20):
+            assert len(np.unique(memory.sample()['reward'])) == 8
+
+        for i in range(10, 100):
+            _step(memory, i)
+        for _ in range(20):
+            assert len(np.unique(memory.sample()['reward'])) == 8
+
+
+class TestBatchMemory(test.TestCase):
+    def test_sample_in_order_and_clear(self):
+        memory = BatchMemory(batch_size=5)
+        for i in range(7):
+            _step(memory, i)
+
+        assert memory.can_sample()
+        sample = memory.sample()
+        assert np.allclose(sample['reward'], [2., 3., 4., 5., 6.])
+        assert not memory.can_sample()
+        assert memory.get_by_index(-1) is None
+
+        for i in range(5):
+            _step(memory, i)
+        assert np.allclose(memory.sample()['reward'], [0., 1., 2., 3., 4.])
+
+
+class TestPrioritizedMemory(test.TestCase):
+    def test_sum_segment_tree(self):
+        tree = SumSegmentTree(5)
+        assert tree.capacity == 8
+        tree.update([0, 1, 2, 3], [1., 2., 3., 4.])
+        assert tree.reduce() == 10.
+        tree.update([1, 1], [0., 0.])
+        assert tree.reduce() == 8.
+        assert np.all(tree.find_prefixsum_indices([0., 0.5, 1., 3.9, 4., 7.9]) ==
+                      [0, 0, 2, 2, 3, 3])
+
+    def test_min_segment_tree(self):
+        tree = MinSegmentTree(4)
+        assert tree.reduce() == np.inf
+        tree.update([0, 3], [2., 1.])
+        assert tree.reduce() == 1.
+        tree.update([3], [5.])
+        assert tree.reduce() == 2.
+
+    def test_sample_and_update_priorities(self):
+        memory = PrioritizedMemory(size=10, batch_size=4, alpha=1., beta=1.)
+        for i in range(10):
+            _step(memory, i)
+
+        sample = memory.sample()
+        assert sample['state'].shape == (4, 4)
+        assert np.allclose(sample['importance_weights'], 1.)
+
+        # Only the transition 3 has a non negligible priority.
+        memory.update_priorities(np.arange(10), np.zeros(10))
+        memory.update_priorities([3], [100.])
+        sample = memory.sample()
+        assert np.all(sample['indices'] == 3)
+        assert np.all(sample['reward'] == 3.)
+        assert np.allclose(sample['importance_weights'], sample['importance_weights'][0])
+        assert np.all(sample['importance_weights'] <= 1.)
+
+    def test_update_priorities_of_target_transitions(self):
+        memory = PrioritizedMemory(size=10, batch_size=4, alpha=1.)
+        for i in range(10):
+            _step(memory, i)
+        memory.update_priorities(np.arange(10), np.ones(10))
+
+        # The last sampled transition is only used as a target and has no td error.
+        memory.update_priorities([2, 5, 7, 9], [3., 3., 3.])
+        priorities = memory._sum_tree[np.arange(10)]
+        assert np.allclose(priorities[[2, 5, 7]], 3. + 1e-6)
+        assert np.allclose(priorities[9], 3. + 1e-6)
+        assert np.allclose(priorities[[0, 1, 3, 4, 6, 8]], 1. + 1e-6)
+
+        # A target transition also sampled with a td error keeps it.
+        memory.update_priorities([4, 4], [2.])
+        assert np.allclose(memory._sum_tree[[4]], 2. + 1e-6)
+
+    def test_new_transitions_get_max_priority(self):
+        memory = PrioritizedMemory(size=10, batch_size=2, alpha=1.)
+        _step(memory, 0)
+        memory.update_priorities([0], [4.])
+        _step(memory, 1)
+        assert np.allclose(memory._sum_tree[[0, 1]], [4. + 1e-6, 4. + 1e-6])
+
+
+class TestMemmapMemory(test.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_requires_directory(self):
+        memory = MemmapMemory(size=10, batch_size=4)
+        with self.assertRaises(ValueError):
+            _step(memory, 0)
+
+    def test_sample(self):
+        memory = MemmapMemory(size=10, batch_size=8, directory=self.directory)
+        for i in range(25):
+            _step(memory, i)
+
+        assert os.path.exists(os.path.join(self.directory, 'state.npy'))
+        sample = memory.sample()
+        assert isinstance(sample['state'], np.ndarray)
+        assert sample['state'].shape == (8, 4)
+        assert np.all(sample['reward'] >= 15)
+        assert np.allclose(sample['state'][:, 0], sample['reward'])
+
+    def test_restore(self):
+        memory = MemmapMemory(size=10, batch_size=4, directory=self.directory)
+        for i in range(13):
+            _step(memory, i)
+        memory.flush()
+
+        restored_memory = MemmapMemory(size=10, batch_size=4, directory=self.directory)
+        assert restored_memory.can_sample()
+        assert restored_memory.get_by_index(0)['reward'] == 3.
+        assert restored_memory.get_by_index(-1)['reward'] == 12.
+        _step(restored_memory, 13)
+        assert restored_memory.get_by_index(0)['reward'] == 4.
+
+        with self.assertRaises(ValueError):
+            MemmapMemory(size=20, batch_size=4, directory=self.directory)
+
+    def test_prioritized_restore(self):
+        memory = PrioritizedMemmapMemory(size=10, batch_size=4, alpha=1.,
+                                         directory=self.directory)
+        for i in range(10):
+            _step(memory, i)
+        memory.update_priorities(np.arange(10), np.zeros(10))
+        memory.update_priorities([3], [100.])
+        memory.flush()
+
+        restored_memory = PrioritizedMemmapMemory(size=10, batch_size=4, alpha=1.,
+                                                  directory=self.directory)
+        sample = restored_memory.sample()
+        assert np.all(sample['indices'] == 3)
+        assert np.all(sample['reward'] == 3.)
+
+
+class TestFrameMemory(test.TestCase):
+    @staticmethod
+    def _run_episodes(memory, num_episodes, episode_length, history_length):
+        """Simulates an environment returning the last `history_length` frames."""
+        transitions = []
+        frame = 0
+        for _ in range(num_episodes):
+            frames = [np.full((2, 2), frame, dtype=np.uint8)] * history_length
+            for t in range(episode_length):
+                frame += 1
+                state = np.stack(frames, axis=-1)
+                frames = frames[1:] + [np.full((2, 2), frame, dtype=np.uint8)]
+                next_state = np.stack(frames, axis=-1)
+                transition = dict(state=state, next_state=next_state, action=frame % 3,
+                                  reward=float(frame), done=t == episode_length - 1)
+                memory.step(**transition)
+                transitions.append(transition)
+            frame += 1
+        return transitions
+
+    def test_stacked_frames_are_stored_once(self):
+        memory = FrameMemory(size=50, batch_size=8, history_length=4)
+        transitions = self._run_episodes(memory, num_episodes=2, episode_length=10,
+                                         history_length=4)
+        assert memory._counter == 20
+        # 4 initial frames and one new frame per transition for every episode.
+        assert memory._frame_index == 2 * (4 + 10)
+        for i, transition in enumerate(transitions):
+            values = memory.get_by_index(i)
+            assert values['state'].shape == (2, 2, 4)
+            assert np.array_equal(values['state'], transition['state'])
+            assert np.array_equal(values['next_state'], transition['next_state'])
+
+        sample = memory.sample()
+        assert sample['state'].shape == (8, 2, 2, 4)
+        assert sample['state'].dtype == np.uint8
+        assert np.array_equal(sample['state'][..., 1:], sample['next_state'][..., :-1])
+
+    def test_unstacked_observations(self):
+        memory = FrameMemory(size=20, batch_size=4)
+        for i in range(30):
+            memory.step(state=np.ones(3) * i, next_state=np.ones(3) * (i + 1), reward=i)
+        assert memory._counter == 20
+        assert np.allclose(memory.get_by_index(0)['state'], np.ones(3) * 10)
+        assert np.allclose(memory.get_by_index(-1)['next_state'], np.ones(3) * 30)
+        sample = memory.sample()
+        assert sample['state'].shape == (4, 3)
+        assert np.allclose(sample['state'][:, 0], sample['reward'])
+        assert np.allclose(sample['next_state'][:, 0], sample['reward'] + 1)
+
+    def test_evicts_transitions_of_overwritten_frames(self):
+        memory = FrameMemory(size=20, batch_size=4, history_length=2, num_frames=12)
+        transitions = self._run_episodes(memory, num_episodes=4, episode_length=5,
+                                         history_length=2)
+        assert memory._counter < 20
+        for i in range(memory._counter):
+            transition = transitions[len(transitions) - memory._counter + i]
+            assert np.array_equal(memory.get_by_index(i)['state'], transition['state'])
+            assert np.array_equal(memory.get_by_index(i)['next_state'],
+                                  transition['next_state'])
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, print_function
+
+import numpy as np
+
+from tensorflow.python.platform import test
+
+from polyaxon.rl.stats import RunningStats, Stats, WindowStats
+
+
+class TestRunningStats(test.TestCase):
+    def test_running_stats(self):
+        stats = RunningStats()
+        assert stats.count == 0
+        assert np.isnan(stats.avg())
+        assert stats.total() == 0.
+
+        values = np.random.RandomState(0).randn(1000) * 3. + 10.
+        stats.extend(values)
+        assert stats.count == 1000
+        assert np.isclose(stats.max(), np.max(values))
+        assert np.isclose(stats.min(), np.min(values))
+        assert np.isclose(stats.avg(), np.mean(values))
+        assert np.isclose(stats.total(), np.sum(values))
+        assert np.isclose(stats.variance(), np.var(values))
+        assert np.isclose(stats.std(), np.std(values))
+
+    def test_stats(self):
+        stats = Stats()
+        for reward in [1., -2., 3.]:
+            stats.update(reward)
+        assert stats.max() == 3.
+        assert stats.min() == -2.
+        assert np.isclose(stats.avg(), 2. / 3)
+        assert stats.total() == 2.
+
+
+class TestWindowStats(test.TestCase):
+    def test_window_stats(self):
+        stats = WindowStats(window_size=5)
+        assert stats.count == 0
+        assert np.isnan(stats.max())
+
+        values = np.random.RandomState(0).randn(50)
+        for i, value in enumerate(values):
+            stats.update(value)
+            window = values[max(0, i - 4):i + 1]
+            assert stats.count == len(window)
+            assert np.isclose(stats.max(), np.max(window))
+            assert np.isclose(stats.min(), np.min(window))
+            assert np.isclose(stats.avg(), np.mean(window))
+            assert np.isclose(stats.total(), np.sum(window))
+            assert np.isclose(stats.variance(), np.var(window))
+
+    def test_window_variance_of_large_values(self):
+        # The variance of values with a large mean, e.g. total rewards, doesn't cancel out.
+        stats = WindowStats(window_size=10)
+        values = 1e8 + np.random.RandomState(0).randn(1000)
+        for value in values:
+            stats.update(value)
+        assert np.isclose(stats.variance(), np.var(values[-10:]), rtol=1e-6)
+
+    def test_window_size(self):
+        with self.assertRaises(ValueError):
+            WindowStats(window_size=0)
@@ -5,7 +5,11 @@ import numpy as np
 
 from tensorflow.python.platform import test
 
-from polyaxon.rl.utils import get_cumulative_rewards
+from polyaxon.rl.utils import (
+    discounted_cumsum,
+    get_cumulative_rewards,
+    get_generalized_advantages
+)
 
 
 class TestCumulativeRewards(test.TestCase):
@@ -39,3 +43,46 @@ class TestCumulativeRewards(test.TestCase):
                 0),
             [0, 0, 1, 2, 3, 4, 0])
         print("looks good!")
+
+    def test_blocked_cumulative_rewards(self):
+        def loop_cumulative_rewards(reward, done, discount):
+            cumulative_rewards = np.zeros(len(reward))
+            cumulative_reward = 0.
+            for i in reversed(range(len(reward))):
+                if done[i]:
+                    cumulative_reward = 0.
+                cumulative_reward = reward[i] + discount * cumulative_reward
+                cumulative_rewards[i] = cumulative_reward
+            return cumulative_rewards
+
+        rng = np.random.RandomState(0)
+        for num_steps in [1, 63, 64, 65, 1000]:
+            reward = rng.randn(num_steps)
+            done = rng.rand(num_steps) < 0.02
+            cumulative_rewards = discounted_cumsum(reward, done, 0.99, block_size=64)
+            assert cumulative_rewards.dtype == np.float32
+            assert cumulative_rewards.shape == (num_steps,)
+            assert np.allclose(cumulative_rewards,
+                               loop_cumulative_rewards(reward, done, 0.99), atol=1e-4)
+
+        assert discounted_cumsum([], [], 0.9).shape == (0,)
+
+
+class TestGeneralizedAdvantages(test.TestCase):
+    def test_generalized_advantages(self):
+        reward = [1., 0., 1., 1., 0.]
+        value = [0.5, 0.2, 0.1, 0.4, 0.3]
+        done = [False, False, True, False, False]
+
+        # lambda=1 gives the discounted returns minus the values.
+        advantages, returns = get_generalized_advantages(
+            reward, value, done, discount=0.9, gae_lambda=1., last_value=2.)
+        assert advantages.dtype == np.float32
+        assert np.allclose(returns, [1.81, 0.9, 1., 1. + 0.9 * 0.9 * 2., 0.9 * 2.])
+        assert np.allclose(advantages, returns - np.array(value))
+
+        # lambda=0 gives the one step TD errors.
+        advantages, returns = get_generalized_advantages(
+            reward, value, done, discount=0.9, gae_lambda=0., last_value=2.)
+        assert np.allclose(advantages, [1. + 0.9 * 0.2 - 0.5, 0.9 * 0.1 - 0.2, 1. - 0.1,
+                                        1. + 0.9 * 0.3 - 0.4, 0.9 * 2. - 0.3])